@@ -18,6 +18,7 @@ EXPORTED_PROJECT = "ExportedProject"
 
 class CfgKey(Enum):
     MULTIPROCESSING = "MULTIPROCESSING"
+    PROFILING = "PROFILING"
     RIPPER = "AS_RIPPER"
 
     STEAM_VS = "STEAM_APP"
@@ -39,7 +40,7 @@ class CfgKey(Enum):
 
     @classmethod
     def get_non_path_keys(cls) -> set[Self]:
-        return {cls.MULTIPROCESSING}
+        return {cls.MULTIPROCESSING, cls.PROFILING}
 
     @classmethod
     def get_path_keys(cls) -> set[Self]:
@@ -47,7 +48,8 @@ class CfgKey(Enum):
 
     @classmethod
     def get_assets_keys(cls) -> set[Self]:
-        return {*cls}.difference({CfgKey.MULTIPROCESSING, CfgKey.RIPPER, CfgKey.STEAM_VS, CfgKey.STEAM_VC})
+        return {*cls}.difference({CfgKey.MULTIPROCESSING, CfgKey.PROFILING, CfgKey.RIPPER, CfgKey.STEAM_VS,
+                                  CfgKey.STEAM_VC})
 
 
 class Game(Enum):
@@ -126,6 +128,8 @@ class DLCType(Enum):
 
 class Config(Objectless):
     __data: OrderedDict[CfgKey, Path | bool] = OrderedDict()
+    # values set for current run only (ex: by command line), they are not saved to config file
+    __overrides: dict[CfgKey, Path | bool] = {}
 
     _CONFIG_FILE: Final[Path] = CONFIG_FOLDER / "Config.json"
 
@@ -155,6 +159,7 @@ class Config(Objectless):
         data[CfgKey.STEAM_VC] = Path()
         data[CfgKey.RIPPER] = Path()
         data[CfgKey.MULTIPROCESSING] = False
+        data[CfgKey.PROFILING] = False
         return data
 
     @classmethod
@@ -182,8 +187,20 @@ class Config(Objectless):
         return cls.__data
 
     def __class_getitem__(cls, item: CfgKey) -> Path | bool:
+        if item in cls.__overrides:
+            return cls.__overrides[item]
         return cls.get_data().get(item)
 
+    @classmethod
+    def set_override(cls, key: CfgKey, value: Path | bool | None) -> None:
+        """
+        Overrides config value until exit without saving it, None removes override
+        """
+        if value is None:
+            cls.__overrides.pop(key, None)
+        else:
+            cls.__overrides[key] = value
+
     @classmethod
     def get_multiprocessing(cls) -> bool:
         return cls[CfgKey.MULTIPROCESSING]
@@ -254,7 +271,7 @@ class Config(Objectless):
                             info_text = f"VS steam folder. Folder must contain 'Vampire Survivors.exe'"
                         case CfgKey.STEAM_VC:
                             info_text = f"VC steam folder. Folder must contain 'Vampire Crawlers.exe'"
-                        case CfgKey.MULTIPROCESSING:
+                        case CfgKey.MULTIPROCESSING | CfgKey.PROFILING:
                             continue
 
                 tk.Label(self, text=info_text).pack()
@@ -277,6 +294,10 @@ class Config(Objectless):
             ttk.Checkbutton(frame, text="Enable multiprocessing for some generators",
                             variable=self.variables[CfgKey.MULTIPROCESSING]).pack()
 
+            self.variables[CfgKey.PROFILING] = tk.BooleanVar(self, Config[CfgKey.PROFILING])
+            ttk.Checkbutton(frame, text="Save profiling trace to unpacker.trace.json (from next launch)",
+                            variable=self.variables[CfgKey.PROFILING]).pack()
+
             ttk.Button(self, text="Check paths and/or Save", command=self.try_save).pack()
 
         def try_save(self):
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import NamedTuple, Iterable
+
+# Increase when schema or meaning of stored values changes, old index will be rebuilt
+INDEX_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    guid TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+
+class IndexedFile(NamedTuple):
+    path: Path
+    size: int
+    mtime_ns: int
+    # None - not read yet, "" - file has no guid
+    guid: str | None
+
+
+class AssetIndex:
+    """
+    Persistent index of .meta files under asset roots (sqlite database).
+
+    Directory is re-listed only when its mtime differs from the stored one,
+    otherwise stored subdirectories and files are used. Guids are stored on demand with 'set_guids'.
+    Editing file in place does not change mtime of directory, so such file is not re-validated.
+    Delete index file to rebuild it from scratch.
+    """
+
+    def __init__(self, db_path: Path | str):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            self._connection = sqlite3.connect(db_path)
+            self._prepare()
+        except sqlite3.Error as e:
+            print(f"! Asset index is not available ({e}), using temporary one")
+            self._connection = sqlite3.connect(":memory:")
+            self._prepare()
+
+        self.scanned_dirs = 0
+        self.changed_dirs = 0
+
+    def _prepare(self) -> None:
+        connection = self._connection
+        if connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            connection.executescript("DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS files;")
+            connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        connection.executescript(_SCHEMA)
+
+        self._dirs: dict[str, int] = {}
+        self._children: dict[str, list[str]] = {}
+        for path, parent, mtime_ns in connection.execute("SELECT path, parent, mtime_ns FROM dirs"):
+            self._dirs[path] = mtime_ns
+            self._children.setdefault(parent, []).append(path)
+
+        self._files: dict[str, list[IndexedFile]] = {}
+        for path, dir_path, size, mtime_ns, guid in connection.execute(
+                "SELECT path, dir, size, mtime_ns, guid FROM files"):
+            self._files.setdefault(dir_path, []).append(IndexedFile(Path(path), size, mtime_ns, guid))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self._connection.commit()
+        self._connection.close()
+
+    def _forget_dir(self, path: str) -> None:
+        for child in self._children.pop(path, []):
+            self._forget_dir(child)
+        self._dirs.pop(path, None)
+        self._files.pop(path, None)
+        self._connection.execute("DELETE FROM dirs WHERE path = ?", (path,))
+        self._connection.execute("DELETE FROM files WHERE dir = ?", (path,))
+
+    def _rescan_dir(self, path: str, parent: str | None, mtime_ns: int) -> None:
+        old_files = {str(f.path): f for f in self._files.get(path, [])}
+        subdirs = []
+        files = []
+
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(".meta") and entry.is_file():
+                    stat = entry.stat()
+                    old_file = old_files.get(entry.path)
+                    guid = None
+                    if old_file and old_file.size == stat.st_size and old_file.mtime_ns == stat.st_mtime_ns:
+                        guid = old_file.guid
+                    files.append(IndexedFile(Path(entry.path), stat.st_size, stat.st_mtime_ns, guid))
+
+        for child in set(self._children.get(path, [])).difference(subdirs):
+            self._forget_dir(child)
+
+        connection = self._connection
+        connection.execute("DELETE FROM files WHERE dir = ?", (path,))
+        connection.executemany(
+            "INSERT INTO files (path, dir, size, mtime_ns, guid) VALUES (?, ?, ?, ?, ?)",
+            [(str(f.path), path, f.size, f.mtime_ns, f.guid) for f in files]
+        )
+        connection.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                           (path, parent, mtime_ns))
+
+        self._dirs[path] = mtime_ns
+        self._files[path] = files
+        self._children[path] = subdirs
+        self.changed_dirs += 1
+
+    def _invalidate_dir(self, path: str) -> None:
+        self._dirs[path] = -1
+        self._connection.execute("UPDATE dirs SET mtime_ns = -1 WHERE path = ?", (path,))
+
+    def scan(self, root: Path, file_name: str = "") -> list[IndexedFile]:
+        """
+        Works as root.rglob(f"{file_name}*.meta") but takes directory listings from index when possible
+        """
+        if not root.is_dir():
+            return []
+
+        pattern = f"{file_name}*.meta"
+        found = []
+        stack: list[tuple[str, str | None]] = [(str(root), None)]
+
+        while stack:
+            path, parent = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                if self._dirs.get(path) != mtime_ns:
+                    self._rescan_dir(path, parent, mtime_ns)
+            except OSError as e:
+                print(f"! Cannot scan {path}: {e}")
+                if parent is not None:
+                    # parent will be re-listed next time, so this directory is not lost from index
+                    self._invalidate_dir(parent)
+                continue
+
+            self.scanned_dirs += 1
+            found.extend(f for f in self._files.get(path, []) if fnmatch(f.path.name, pattern))
+            stack.extend((child, path) for child in self._children.get(path, []))
+
+        return found
+
+    def set_guids(self, guids: Iterable[tuple[Path, str]]) -> None:
+        guids = dict(guids)
+        self._connection.executemany(
+            "UPDATE files SET guid = ? WHERE path = ?",
+            [(guid, str(path)) for path, guid in guids.items()]
+        )
+        for dir_path, files in self._files.items():
+            self._files[dir_path] = [
+                f._replace(guid=guids[f.path]) if f.path in guids else f for f in files
+            ]
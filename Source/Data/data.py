@@ -274,6 +274,24 @@ class DataHandler(Objectless):
         cls.load()
         return sum(len(dfs) for dfs in cls._loaded_data.values())
 
+    @classmethod
+    def get_source_paths(cls, data_types: set[DataType] | None = None) -> list[Path]:
+        """
+        Paths of assets which data files (of data_types, default: all) are loaded from, including data manifests
+        """
+        cls.load()
+        paths = [path.with_suffix("") for name, path in MetaDataHandler.filter_paths(
+            lambda name_path: DATA_MANAGER_SETTINGS.lower() in name_path[0] or
+                              BUNDLE_MANIFEST_DATA.lower() in name_path[0])]
+
+        for data_files in cls._loaded_data.values():
+            for data_type, data_file in data_files.items():
+                if data_types is None or data_type in data_types:
+                    if path := MetaDataHandler.get_path_by_guid_no_meta(data_file.guid):
+                        paths.append(path)
+
+        return sorted(paths)
+
 
 if __name__ == "__main__":
     DataHandler.load()
@@ -0,0 +1,83 @@
+import os
+import struct
+from pathlib import Path
+from typing import Final
+
+from Source.Utility.constants import CONFIG_FOLDER
+from Source.Utility.meta_parser import TextureMeta
+
+META_CACHE_FOLDER: Final[Path] = CONFIG_FOLDER / "MetaCache"
+
+# Increase when format or parsers change, old cache files will be ignored
+CACHE_VERSION: Final[int] = 1
+_MAGIC: Final[bytes] = b"VSMC"
+
+# magic, version, meta size, meta mtime_ns, has single sprite id, single sprite id, guid length, rows count
+_HEADER = struct.Struct("<4sHQq?qHI")
+# internal_id, rect (x, y, width, height), pivot (x, y), name length
+_ROW = struct.Struct("<q6dH")
+
+
+def _get_cache_path(guid: str, cache_folder: Path) -> Path:
+    return cache_folder / f"{guid}.bin"
+
+
+def save_cached_texture_meta(texture_meta: TextureMeta, stat: os.stat_result,
+                             cache_folder: Path = META_CACHE_FOLDER) -> None:
+    guid = texture_meta.guid.encode("UTF-8")
+    single_id = texture_meta.sprite_sheet_internal_id
+    parts = [_HEADER.pack(_MAGIC, CACHE_VERSION, stat.st_size, stat.st_mtime_ns,
+                          single_id is not None, single_id or 0, len(guid), len(texture_meta.rows)), guid]
+
+    for internal_id, name, rect, pivot in texture_meta.rows:
+        name_bytes = name.encode("UTF-8")
+        parts.append(_ROW.pack(internal_id, rect["x"], rect["y"], rect["width"], rect["height"],
+                               pivot["x"], pivot["y"], len(name_bytes)))
+        parts.append(name_bytes)
+
+    path = _get_cache_path(texture_meta.guid, cache_folder)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(b"".join(parts))
+        # files with the same guid can be saved by several processes
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"! Cannot save meta cache {path.name}: {e}")
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_cached_texture_meta(guid: str, stat: os.stat_result,
+                             cache_folder: Path = META_CACHE_FOLDER) -> TextureMeta | None:
+    """
+    Returns cached texture meta when it was saved for meta file with the same size and mtime, None otherwise
+    """
+    try:
+        data = _get_cache_path(guid, cache_folder).read_bytes()
+    except OSError:
+        return None
+
+    try:
+        magic, version, size, mtime_ns, has_single, single_id, guid_len, rows_count = _HEADER.unpack_from(data)
+        if (magic, version, size, mtime_ns) != (_MAGIC, CACHE_VERSION, stat.st_size, stat.st_mtime_ns):
+            return None
+
+        offset = _HEADER.size
+        cached_guid = data[offset:offset + guid_len].decode("UTF-8")
+        offset += guid_len
+
+        rows = []
+        for _ in range(rows_count):
+            internal_id, x, y, width, height, pivot_x, pivot_y, name_len = _ROW.unpack_from(data, offset)
+            offset += _ROW.size
+            name = data[offset:offset + name_len].decode("UTF-8")
+            offset += name_len
+            rows.append((internal_id, name,
+                         {"x": x, "y": y, "width": width, "height": height}, {"x": pivot_x, "y": pivot_y}))
+    except (struct.error, UnicodeDecodeError):
+        return None
+
+    if cached_guid != guid or offset != len(data):
+        return None
+
+    return TextureMeta(cached_guid, rows, single_id if has_single else None)
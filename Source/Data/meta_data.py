@@ -1,17 +1,24 @@
 from collections.abc import Callable
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
+from threading import RLock
 from tkinter import Image
 
-from PIL.Image import Image, open as image_open
+from PIL.Image import Image
 
 from Source.Config.config import DLCType, Config, Game
+from Source.Data.asset_index import AssetIndex, IndexedFile
+from Source.Data.meta_cache import load_cached_texture_meta, save_cached_texture_meta
 from Source.Utility.constants import RESOURCES, TEXTURE_2D, TEXT_ASSET, GAME_OBJECT, PREFAB_INSTANCE, AUDIO_CLIP, \
-    MONO_BEHAVIOUR, DATA_MANAGER_SETTINGS, BUNDLE_MANIFEST_DATA
-from Source.Utility.image_functions import crop_image_rect_left_bot, split_name_count, get_rects_by_sprite_list
-from Source.Utility.multirun import run_multiprocess_single
+    MONO_BEHAVIOUR, DATA_MANAGER_SETTINGS, BUNDLE_MANIFEST_DATA, CONFIG_FOLDER
+from Source.Utility.atlas import Atlas
+from Source.Utility.image_functions import split_name_count, get_rects_by_sprite_list
+from Source.Utility.meta_parser import TextureMeta, parse_texture_meta_file
+from Source.Utility.multirun import run_multiprocess_single, run_multiprocess, is_multiprocess_enabled, \
+    file_size_cost
 from Source.Utility.special_classes import Objectless
 from Source.Utility.sprite_data import SpriteData, AnimationData, SKIP_ANIM_NAMES_LIST
-from Source.Utility.timer import Timeit
+from Source.Utility.timer import Timeit, Profiler
 from Source.Utility.unityparser2 import UnityDoc
 from Source.Utility.utility import normalize_str
 
@@ -34,31 +41,32 @@ def _get_meta_guid(path: Path) -> tuple[str, Path] | None:
 
 
 class MetaData:
-    def __init__(self, name: str, real_name: str, guid: str, image: Image, data_name: dict[str, SpriteData],
+    def __init__(self, name: str, real_name: str, guid: str, atlas: Atlas, data_name: dict[str, SpriteData],
                  data_id: dict[int, SpriteData]):
         self.name: str = name
         self.real_name: str = real_name
         self.guid: str = guid
-        self.image: Image = image
+        self.atlas: Atlas = atlas
         self.data_name: dict[str, SpriteData] = data_name
         self.data_id: dict[int, SpriteData] = data_id
 
-        self.__added_sprites = False
         self.__added_animations = False
 
+    @property
+    def image(self) -> Image:
+        return self.atlas.image
+
     def init_sprites(self) -> None:
-        if not self.__added_sprites:
+        """
+        Decodes atlas. Sprites are cropped on first access of SpriteData.sprite
+        """
+        if not self.atlas.is_decoded():
             timeit = Timeit()
-
-            for entry in set(self.data_name.values()):
-                entry.sprite = crop_image_rect_left_bot(self.image, entry.rect)
-            self.__added_sprites = True
-
-            print(f"Generated sprites for {self.real_name} {timeit!r}")
+            _ = self.atlas.image
+            print(f"Decoded atlas for {self.real_name} {timeit!r}")
 
     def init_animations(self) -> None:
         if not self.__added_animations:
-            self.init_sprites()
             timeit = Timeit()
 
             anim_frames = {}
@@ -84,7 +92,7 @@ class MetaData:
                 anim_data = AnimationData(name,
                                           sprite_name_list,
                                           rect_list,
-                                          [s.sprite for s in sprite_list])
+                                          sprite_list)
 
                 if len(anim_data) > 1:
                     for sprite_name in sprite_name_list:
@@ -106,40 +114,76 @@ class MetaData:
         return f"<{self.__class__.__name__}: {self.name} ({self.real_name}) at {hex(id(self)).upper()}>"
 
 
+def _parse_texture_meta_yaml(meta_path: Path) -> TextureMeta:
+    doc = UnityDoc.yaml_parse_file(meta_path)
+    entry = doc.entry
+
+    internal_id_to_name_table = entry["TextureImporter"]["internalIDToNameTable"]
+    sprite_sheet = entry["TextureImporter"]["spriteSheet"]
+    sprites_data = sprite_sheet["sprites"]
+
+    rows = []
+    for i, data_entry in enumerate(sprites_data):
+        internal_id = list(internal_id_to_name_table[i]['first'].values())[0]  # not depends on key
+        rows.append((
+            internal_id,
+            str(data_entry['name']),
+            {k: float(data_entry['rect'][k]) for k in ("x", "y", "width", "height")},
+            {k: float(data_entry['pivot'][k]) for k in ("x", "y")},
+        ))
+
+    is_single = not internal_id_to_name_table and not sprites_data
+    sprite_sheet_internal_id = sprite_sheet['internalID'] if is_single else None
+    return TextureMeta(entry['guid'], rows, sprite_sheet_internal_id)
+
+
+def _parse_texture_meta(meta_path: Path) -> TextureMeta:
+    if texture_meta := parse_texture_meta_file(meta_path):
+        return texture_meta
+
+    print(f"! Unknown structure of {meta_path.name}, using full parser")
+    return _parse_texture_meta_yaml(meta_path)
+
+
+def _read_texture_meta(meta_path: Path) -> TextureMeta:
+    stat = meta_path.stat()
+    guid_path = _get_meta_guid(meta_path)
+
+    if guid_path and (texture_meta := load_cached_texture_meta(guid_path[0], stat)):
+        Profiler.count("meta_cache_hits")
+        return texture_meta
+
+    Profiler.count("meta_cache_misses")
+    Profiler.count("bytes_read", stat.st_size)
+    with Profiler.span("parse_meta", file=meta_path.name):
+        texture_meta = _parse_texture_meta(meta_path)
+    save_cached_texture_meta(texture_meta, stat)
+    return texture_meta
+
+
 def _get_meta(meta_path: Path) -> MetaData:
     timeit = Timeit()
 
     meta_path_name = meta_path.name
     print(f"Started parsing {meta_path_name}")
     image_path = meta_path.with_suffix("")
-    image = image_open(image_path)
+    atlas = Atlas(image_path)
 
-    doc = UnityDoc.yaml_parse_file(meta_path)
-    entry = doc.entry
-
-    internal_id_to_name_table = entry["TextureImporter"]["internalIDToNameTable"]
-    sprites_data = entry["TextureImporter"]["spriteSheet"]["sprites"]
+    texture_meta = _read_texture_meta(meta_path)
+    rows = texture_meta.rows
 
     # if single sprite
-    if not internal_id_to_name_table and not sprites_data:
-        sprite_sheet = entry["TextureImporter"]["spriteSheet"]
-        internal_id = sprite_sheet['internalID']
-        internal_id_to_name_table = [{'first': {0: internal_id}}]
-        sprites_data = [{
-            "name": normalize_str(image_path.stem),
-            'real_name': image_path.stem,
-            "internalID": internal_id,
-            "rect": {
-                "x": 0, "y": 0, "width": image.width, "height": image.height
-            },
-            "pivot": {"x": 0.5, "y": 0.5}
-        }]
+    if texture_meta.sprite_sheet_internal_id is not None:
+        rows = [(
+            texture_meta.sprite_sheet_internal_id,
+            normalize_str(image_path.stem),
+            {"x": 0, "y": 0, "width": atlas.width, "height": atlas.height},
+            {"x": 0.5, "y": 0.5},
+        )]
 
     prepared_data_name = dict()
     prepared_data_id = dict()
-    for i, data_entry in enumerate(sprites_data):
-        internal_id = list(internal_id_to_name_table[i]['first'].values())[0]  # not depends on key
-        data_name = str(data_entry['name'])
+    for internal_id, data_name, rect, pivot in rows:
         norm_name = normalize_str(data_name)
 
         if prepared_data_entry := prepared_data_name.get(norm_name):
@@ -149,12 +193,9 @@ def _get_meta(meta_path: Path) -> MetaData:
                 name=norm_name,
                 real_name=data_name,
                 internal_id_set={internal_id},
-                rect={
-                    k: float(v) for k, v in data_entry['rect'].items()
-                },
-                pivot={
-                    k: float(v) for k, v in data_entry['pivot'].items()
-                }
+                rect=rect,
+                pivot=pivot,
+                atlas=atlas
             )
 
             prepared_data_name.update({
@@ -166,22 +207,64 @@ def _get_meta(meta_path: Path) -> MetaData:
             internal_id: prepared_data_entry
         })
 
-    guid = entry['guid']
+    guid = texture_meta.guid
     name = normalize_str(meta_path_name)
 
     print(f"Finished parsing {meta_path_name} [{guid=}] {timeit!r}")
 
-    return MetaData(name, meta_path_name, guid, image, prepared_data_name, prepared_data_id)
+    return MetaData(name, meta_path_name, guid, atlas, prepared_data_name, prepared_data_id)
+
+
+def _get_meta_to_shared(meta_path: Path, shm_name: str | None) -> tuple[MetaData, bool]:
+    meta_data = _get_meta(meta_path)
+    is_decoded = bool(shm_name) and meta_data.atlas.get_shared_size() is not None \
+        and meta_data.atlas.decode_to_shared(shm_name)
+    return meta_data, is_decoded
+
+
+def _get_metas_decoded(paths: list[Path]) -> list[MetaData]:
+    """
+    Parses metas and decodes their atlases in worker processes.
+    Pixels are passed back through shared memory, so only sprite tables are pickled.
+    """
+    shared_memories = []
+    try:
+        for path in paths:
+            size = Atlas(path.with_suffix("")).get_shared_size()
+            shared_memories.append(SharedMemory(create=True, size=size) if size else None)
+
+        loaded_data = run_multiprocess(_get_meta_to_shared,
+                                       [(path, shm and shm.name) for path, shm in zip(paths, shared_memories)],
+                                       cost_func=lambda arg: file_size_cost(arg[0].with_suffix("")))
+
+        for (meta_data, is_decoded), shm in zip(loaded_data, shared_memories):
+            if is_decoded:
+                meta_data.atlas.load_from_shared(shm)
+            else:
+                meta_data.init_sprites()
+    finally:
+        for shm in filter(None, shared_memories):
+            shm.close()
+            shm.unlink()
+
+    return [meta_data for meta_data, _ in loaded_data]
 
 
 class MetaDataHandler(Objectless):
+    _asset_index_path: Path = CONFIG_FOLDER / "AssetIndex.sqlite"
+
     _found_files: list[Path] = []
+    _found_indexed_files: list[IndexedFile] = []
+    _assets_size: dict[Path, int] = {}
 
     _assets_name_path: dict[str, Path] = {}
     _assets_guid_path: dict[str, Path] = {}
 
     loaded_game: Game = None
     loaded_assets_meta: dict[str, MetaData] = {}
+    # generators run in parallel threads (ex: build tasks) and share atlases, so check of loaded metas
+    # and loading of missing ones is done by one thread at a time and every meta is loaded once
+    _load_lock: RLock = RLock()
 
     @classmethod
     def load(cls, game: Game):
@@ -196,6 +279,8 @@ class MetaDataHandler(Objectless):
     @classmethod
     def unload(cls):
         cls._found_files.clear()
+        cls._found_indexed_files.clear()
+        cls._assets_size.clear()
         cls._assets_name_path.clear()
         cls._assets_guid_path.clear()
         cls.loaded_assets_meta.clear()
@@ -236,11 +321,16 @@ class MetaDataHandler(Objectless):
                     (MONO_BEHAVIOUR, ""),
                 ])
 
-        for dlc in DLCType.get_all_types_by_game(cls.loaded_game):
-            for root, file_name in path_roots:
-                path = Config.get_assets_dir(dlc) and Config.get_assets_dir(dlc).joinpath(root)
-                if path and path.exists():
-                    cls._found_files.extend(path.rglob(f"{file_name}*.meta"))
+        with Profiler.span("asset_scan"), AssetIndex(cls._asset_index_path) as index:
+            for dlc in DLCType.get_all_types_by_game(cls.loaded_game):
+                for root, file_name in path_roots:
+                    path = Config.get_assets_dir(dlc) and Config.get_assets_dir(dlc).joinpath(root)
+                    if path and path.exists():
+                        cls._found_indexed_files.extend(index.scan(path, file_name))
+            print(f"Asset index: {index.changed_dirs}/{index.scanned_dirs} directories changed")
+
+        cls._found_files.extend(f.path for f in cls._found_indexed_files)
+        cls._assets_size.update((f.path, f.size) for f in cls._found_indexed_files)
 
         ### deduplication
         files_by_stem = {}
@@ -254,7 +344,7 @@ class MetaDataHandler(Objectless):
         for f_list in files_by_stem.values():
             if len(f_list) > 1:
                 biggest_files.append(
-                    list(sorted(f_list, key=lambda x: 1e10 * int("png" in x.name) + x.stat().st_size, reverse=True))[0])
+                    list(sorted(f_list, key=lambda x: 1e10 * int("png" in x.name) + cls._assets_size[x], reverse=True))[0])
             else:
                 biggest_files.append(f_list[0])
         ###
@@ -269,10 +359,30 @@ class MetaDataHandler(Objectless):
         if not cls._assets_guid_path:
             print("Started collecting guid of every asset")
             timeit = Timeit()
-            # guid_path = run_concurrent_sync(_get_meta_guid, self._found_files)
-            guid_path = run_multiprocess_single(_get_meta_guid, cls._found_files)
-            cls._assets_guid_path.update(guid_path)
-            print(f"Finished collecting guid of every asset ({timeit:.2f} sec)")
+            not_indexed = [f.path for f in cls._found_indexed_files if f.guid is None]
+            if not_indexed:
+                Profiler.count("guids_read", len(not_indexed))
+                # guid_path = run_concurrent_sync(_get_meta_guid, not_indexed)
+                with Profiler.span("guid_scan", files=len(not_indexed)):
+                    guid_path = run_multiprocess_single(_get_meta_guid, not_indexed)
+                read_guids = {path: "" for path in not_indexed}
+                read_guids.update((path, guid) for guid, path in filter(None, guid_path))
+                with AssetIndex(cls._asset_index_path) as index:
+                    index.set_guids(read_guids.items())
+            else:
+                read_guids = {}
+
+            cls._assets_guid_path.update(
+                (read_guids.get(f.path, f.guid), f.path) for f in cls._found_indexed_files
+                if read_guids.get(f.path, f.guid)
+            )
+            print(f"Finished collecting guid of every asset, {len(not_indexed)} read from files ({timeit:.2f} sec)")
+
+    @classmethod
+    def _get_size(cls, path: Path) -> int:
+        if (size := cls._assets_size.get(path)) is None:
+            size = path.stat().st_size
+        return size
 
     @classmethod
     def add_meta_data_by_path(cls, path: Path) -> None:
@@ -326,23 +436,39 @@ class MetaDataHandler(Objectless):
         return set(filter(f_filter, cls._assets_name_path.items()))
 
     @classmethod
-    def get_meta_by_name_set(cls, name_set: set, is_multiprocess=True) -> set[MetaData]:
+    def _load_metas(cls, paths: list[Path], is_multiprocess: bool, is_decode_atlas: bool) -> None:
+        if is_decode_atlas and is_multiprocess_enabled(is_multiprocess):
+            loaded_data = _get_metas_decoded(paths)
+        else:
+            # cost of parsing depends on size of .meta file
+            loaded_data: list[MetaData] = run_multiprocess_single(_get_meta, paths, is_multiprocess=is_multiprocess,
+                                                                  cost_func=file_size_cost)
+            if is_decode_atlas:
+                for data_file in loaded_data:
+                    data_file.init_sprites()
+
+        for data_file in loaded_data:
+            cls.loaded_assets_meta.update({
+                data_file.name: data_file,
+                data_file.guid: data_file,
+            })
+
+    @classmethod
+    def get_meta_by_name_set(cls, name_set: set, is_multiprocess=True, is_decode_atlas=False) -> set[MetaData]:
+        """
+        :param is_decode_atlas: Decode atlases right away (in worker processes if multiprocessing is enabled)
+        """
         cls.assert_loaded_game()
 
         normalized_set = {normalize_str(name) for name in name_set}
-        not_loaded_name_set = {name for name in normalized_set if name not in cls.loaded_assets_meta}
+        with cls._load_lock:
+            not_loaded_name_set = {name for name in normalized_set if name not in cls.loaded_assets_meta}
 
-        if not_loaded_name_set:
-            paths = [cls.get_path_by_name(name) for name in not_loaded_name_set]
-            loaded_data: list[MetaData] = run_multiprocess_single(_get_meta, paths, is_multiprocess=is_multiprocess)
+            if not_loaded_name_set:
+                paths = [cls.get_path_by_name(name) for name in not_loaded_name_set]
+                cls._load_metas(paths, is_multiprocess, is_decode_atlas)
 
-            for data_file in loaded_data:
-                cls.loaded_assets_meta.update({
-                    data_file.name: data_file,
-                    data_file.guid: data_file,
-                })
-
-        return {cls.loaded_assets_meta.get(name) for name in normalized_set}
+            return {cls.loaded_assets_meta.get(name) for name in normalized_set}
 
     @classmethod
     def get_meta_dict_by_name_set(cls, name_set: set, is_multiprocess=True) -> dict[str, MetaData]:
@@ -356,22 +482,17 @@ class MetaDataHandler(Objectless):
         return meta_dict
 
     @classmethod
-    def get_meta_by_guid_set(cls, guid_set: set, is_multiprocess=True) -> set[MetaData]:
+    def get_meta_by_guid_set(cls, guid_set: set, is_multiprocess=True, is_decode_atlas=False) -> set[MetaData]:
         cls.assert_loaded_game()
 
-        not_loaded_guid_set = {guid for guid in guid_set if guid not in cls.loaded_assets_meta}
-
-        if not_loaded_guid_set:
-            paths = [cls.get_path_by_guid(guid) for guid in not_loaded_guid_set]
-            loaded_data: list[MetaData] = run_multiprocess_single(_get_meta, paths, is_multiprocess=is_multiprocess)
+        with cls._load_lock:
+            not_loaded_guid_set = {guid for guid in guid_set if guid not in cls.loaded_assets_meta}
 
-            for data_file in loaded_data:
-                cls.loaded_assets_meta.update({
-                    data_file.name: data_file,
-                    data_file.guid: data_file,
-                })
+            if not_loaded_guid_set:
+                paths = [cls.get_path_by_guid(guid) for guid in not_loaded_guid_set]
+                cls._load_metas(paths, is_multiprocess, is_decode_atlas)
 
-        return {cls.loaded_assets_meta.get(guid) for guid in guid_set}
+            return {cls.loaded_assets_meta.get(guid) for guid in guid_set}
 
     @classmethod
     def get_meta_dict_by_guid_set(cls, guid_set: set, is_multiprocess=True) -> dict[str, MetaData]:
@@ -391,7 +512,8 @@ class MetaDataHandler(Objectless):
         return meta_data.pop() if meta_data else None
 
     @classmethod
-    def get_meta_dict_by_name_set_fullest(cls, name_set: set, is_multiprocess=True) -> dict[str, MetaData]:
+    def get_meta_dict_by_name_set_fullest(cls, name_set: set, is_multiprocess=True,
+                                          is_decode_atlas=False) -> dict[str, MetaData]:
         fullest_set = {}
 
         for name in name_set:
@@ -399,10 +521,10 @@ class MetaDataHandler(Objectless):
             filtered = cls.filter_paths(
                 lambda name_path: name_path[0].startswith(norm_name+"_") or name_path[0] == norm_name
             )
-            fullest = list(sorted(filtered, key=lambda name_path: name_path[-1].stat().st_size, reverse=True))[0]
+            fullest = list(sorted(filtered, key=lambda name_path: cls._get_size(name_path[-1]), reverse=True))[0]
             fullest_set[fullest[0]] = name
 
-        datas = cls.get_meta_by_name_set(set(fullest_set.keys()), is_multiprocess)
+        datas = cls.get_meta_by_name_set(set(fullest_set.keys()), is_multiprocess, is_decode_atlas)
 
         meta_dict = {
             data.real_name.replace(".png", "").replace(".meta", ""): data
@@ -425,6 +547,26 @@ class MetaDataHandler(Objectless):
 
 
 if __name__ == "__main__":
+    def __benchmark_meta_parser(names=("enemies", "UI")):
+        MetaDataHandler.load(Game.VS)
+        for meta_name in names:
+            path = MetaDataHandler.get_path_by_name(meta_name)
+
+            timeit = Timeit()
+            yaml_meta = _parse_texture_meta_yaml(path)
+            yaml_time = timeit.get_sec()
+
+            timeit = Timeit()
+            fast_meta = parse_texture_meta_file(path)
+            fast_time = timeit.get_sec()
+
+            assert fast_meta == yaml_meta
+            print(f"{meta_name}: {len(fast_meta.rows)} sprites, yaml {yaml_time:.3f} sec, "
+                  f"fast {fast_time:.3f} sec, x{yaml_time / fast_time:.1f}")
+
+
+    # __benchmark_meta_parser()
+
     # a = MetaDataHandler.get_meta_by_name_fullest("character_chulareh")
     a = MetaDataHandler.get_meta_by_name_fullest("ThosePeople")
     # a = MetaDataHandler.get_meta_by_name("enemies")
@@ -0,0 +1,68 @@
+import itertools
+from pathlib import Path
+
+import Source.Images.transparent_save as tr_save
+from PIL.Image import Image
+
+from Source.Utility.constants import PROGRESS_BAR_FUNC_TYPE
+from Source.Utility.image_functions import get_anim_sprites_ready, resize_list_images
+from Source.Utility.multirun import BoundedTaskQueue
+from Source.Utility.sprite_data import AnimationData
+from Source.Utility.timer import Profiler
+
+
+def _encode_animation(save_data_index: int, frames: list[Image], duration: int, path: Path) -> Path:
+    # index is passed instead of function, because some of SAVE_DATA functions cannot be pickled
+    _, folder, func = tr_save.SAVE_DATA[save_data_index]
+    with Profiler.span("encode", format=folder, frames=len(frames)):
+        func(frames, duration, path)
+    return path
+
+
+class AnimationExporter:
+    """
+    Saves animations in every selected format of 'tr_save.SAVE_DATA'.
+    Frames of animation are prepared once in current process, encoders are run in process pool (when enabled)
+    with bounded number of unfinished tasks, so only few animations are kept in memory at once.
+
+    Usage: 'add' every animation, then 'join' to wait for all files.
+    """
+
+    def __init__(self, selected_anim_types: list[bool],
+                 func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0, is_multiprocess=True):
+        self._save_data = list(itertools.compress(enumerate(tr_save.SAVE_DATA), selected_anim_types))
+        self._func_progress = func_progress_bar_set_percent
+        self._queue: BoundedTaskQueue[Path] = BoundedTaskQueue(self._on_done, is_multiprocess=is_multiprocess)
+        self._created_folders: set[Path] = set()
+
+        self.expected_total: int | None = None
+        self.submitted = 0
+
+    def get_formats_count(self) -> int:
+        return len(self._save_data)
+
+    def _on_done(self, _path: Path) -> None:
+        total = self.expected_total or self.submitted
+        self._func_progress(self._queue.done_count, total)
+
+    def add_frames(self, frames: list[Image], duration: int, save_folder: Path, file_name: str) -> None:
+        """
+        Saves frames to 'save_folder/<format folder>/<file_name><ext>' for every selected format
+        """
+        for index, (ext, folder, _) in self._save_data:
+            path = save_folder / folder
+            if path not in self._created_folders:
+                path.mkdir(parents=True, exist_ok=True)
+                self._created_folders.add(path)
+
+            self.submitted += 1
+            self._queue.submit(_encode_animation, index, frames, duration, path / f"{file_name}{ext}")
+
+    def add(self, animation: AnimationData, duration: int, save_folder: Path, file_name: str | None = None,
+            scale_factor: int = 1) -> None:
+        frames = resize_list_images(get_anim_sprites_ready(animation), scale_factor)
+        # same as path.with_suffix(ext) on animation name
+        self.add_frames(frames, duration, save_folder, file_name or Path(str(animation.name)).with_suffix("").name)
+
+    def join(self) -> None:
+        self._queue.join()
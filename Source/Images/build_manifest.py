@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Final
+
+MANIFEST_NAME: Final[str] = ".manifest.json"
+# Increase when format or digest inputs change, old manifests will be ignored
+MANIFEST_VERSION: Final[int] = 1
+
+
+def get_digest(inputs: Any) -> str:
+    """
+    Digest of json-like inputs, dict keys order does not matter
+    """
+    data = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode("UTF-8"), digest_size=16).hexdigest()
+
+
+class BuildManifest:
+    """
+    Record of generated files of output folder with digests of inputs they were made from.
+    Lets generator skip files which inputs did not change since the previous run.
+
+    Usage: 'need_rebuild' for every output file, then 'remove_stale' and 'save'.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.path = folder / MANIFEST_NAME
+
+        # relative path -> (group, digest)
+        self._old: dict[str, tuple[str, str]] = self._load()
+        self._new: dict[str, tuple[str, str]] = {}
+
+        self.rebuilt = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def _load(self) -> dict[str, tuple[str, str]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="UTF-8"))
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        return {rel: (group, digest) for rel, (group, digest) in data.get("files", {}).items()}
+
+    def _get_key(self, path: Path) -> str:
+        return path.relative_to(self.folder).as_posix()
+
+    def need_rebuild(self, path: Path, digest: str, group: str = "") -> bool:
+        """
+        Registers output file of this run, returns False when file exists and was made from the same inputs
+        """
+        key = self._get_key(path)
+        self._new[key] = (group, digest)
+
+        if self._old.get(key) == (group, digest) and path.exists():
+            self.skipped += 1
+            return False
+
+        self.rebuilt += 1
+        return True
+
+    def discard(self, path: Path) -> None:
+        """
+        Forgets output file (ex: it was not saved), so it is rebuilt next time
+        """
+        self._new.pop(self._get_key(path), None)
+
+    def remove_stale(self, groups: set[str]) -> list[Path]:
+        """
+        Removes files of given groups that were made by previous run, but not by this one.
+        Files of other groups (not generated in this run) are kept in manifest.
+        """
+        removed = []
+        for key, (group, digest) in self._old.items():
+            if key in self._new:
+                continue
+            if group not in groups:
+                self._new[key] = (group, digest)
+                continue
+
+            path = self.folder / key
+            try:
+                path.unlink()
+                removed.append(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"! Cannot remove stale file {path}: {e}")
+
+        self.removed += len(removed)
+        return removed
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "files": {key: list(value) for key, value in sorted(self._new.items())},
+        }
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="UTF-8")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"! Cannot save build manifest {self.path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def get_summary(self) -> str:
+        return f"rebuilt: {self.rebuilt}, skipped: {self.skipped}, removed: {self.removed}"
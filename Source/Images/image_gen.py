@@ -7,7 +7,7 @@ from enum import Enum
 from PIL import ImageFont, ImageDraw
 from PIL.Image import Image, Resampling, open as image_open, new as image_new
 
-import Source.Images.transparent_save as tr_save
+from Source.Images.anim_export import AnimationExporter
 from Source.Translations.language import LangType
 from Source.Utility.constants import DEFAULT_ANIMATION_FRAME_RATE, IMAGES_FOLDER, to_source_path
 from Source.Utility.image_functions import get_anim_sprites_ready, resize_list_images
@@ -90,6 +90,8 @@ class IGFactory:
 
 
 class ImageGenerator:
+    _anim_exporter: AnimationExporter | None = None
+
     def __init__(self):
         self.fontFilePath = to_source_path(IMAGES_FOLDER) / "Courier.ttf"
 
@@ -305,10 +307,17 @@ class ImageGenerator:
 
         name = self.change_name(name)
 
-        for ext, folder, func in itertools.compress(tr_save.SAVE_DATA, add_data["selected_anim_types"]):
-            path = sf_text.joinpath(folder)
-            path.mkdir(exist_ok=True, parents=True)
-            func(sprites, duration, path.joinpath(f"{prefix_name}{name}{postfix_name}{ext}"))
+        if self._anim_exporter is None:
+            self._anim_exporter = AnimationExporter(add_data["selected_anim_types"])
+        self._anim_exporter.add_frames(sprites, duration, sf_text, f"{prefix_name}{name}{postfix_name}")
+
+    def join_animations(self) -> None:
+        """
+        Waits until every animation passed to 'save_anim' is saved
+        """
+        if self._anim_exporter is not None:
+            self._anim_exporter.join()
+            self._anim_exporter = None
 
 
 class SimpleGenerator(ImageGenerator):
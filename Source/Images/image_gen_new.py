@@ -1,10 +1,12 @@
+import hashlib
 import os
 import re
 import sys
 import tkinter as tk
 import tkinter.ttk as ttk
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from functools import cached_property
 from pathlib import Path
 from typing import Any, Callable
 
@@ -13,6 +15,8 @@ from PIL.Image import Image, open as image_open, new as image_new
 
 from Source.Config.config import DLCType
 from Source.Data.data import DataHandler, DataType, DataFile
+from Source.Images.build_manifest import BuildManifest, get_digest
+from Source.Images.image_sink import ImageSink
 from Source.Translations.language import LangHandler, LangType, Lang
 from Source.Utility.constants import to_source_path, IMAGES_FOLDER, COMPOUND_DATA_TYPE, GENERATED, \
     PROGRESS_BAR_FUNC_TYPE, COMPOUND_DATA
@@ -80,15 +84,17 @@ class GenType(Enum):
 
 @dataclass
 class EntryToSave:
-    image: Image
+    # image is rendered on first access, so build digest is checked before any pixel work
+    render: Callable[[], Image]
     name: str
     name_wrapper: Callable[[str], str]
     add_to_path: str | None = None
+    # sprites the image is made from, their rects and atlases are part of build digest
+    sources: list[SpriteData] = field(default_factory=list)
 
-    def save_entry(self, save_path: Path,
-                   entry: dict[str, Any],
-                   scale: int,
-                   add_to_path: os.PathLike[str] | str = None) -> None:
+    def get_save_path(self, save_path: Path,
+                      entry: dict[str, Any],
+                      add_to_path: os.PathLike[str] | str = None) -> Path:
         entry_save_path = save_path / entry.get("contentGroup", "BASE_GAME")
         key_id = entry.get(KEY_ID)
         if self.name == key_id:
@@ -102,10 +108,38 @@ class EntryToSave:
         if self.add_to_path:
             entry_save_path /= self.add_to_path
 
-        entry_save_path.mkdir(parents=True, exist_ok=True)
+        return entry_save_path / self.name_wrapper(self.name)
+
+    @cached_property
+    def image(self) -> Image:
+        return self.render()
+
+    def save_entry(self, save_path: Path,
+                   entry: dict[str, Any],
+                   scale: int,
+                   add_to_path: os.PathLike[str] | str = None,
+                   sink: ImageSink | None = None) -> None:
+        path = self.get_save_path(save_path, entry, add_to_path)
+
+        if sink is not None:
+            sink.save(self.image, path, scale)
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
 
         image = resize_image(self.image, scale)
-        image.save(entry_save_path / self.name_wrapper(self.name))
+        image.save(path)
+
+    def get_digest_sources(self) -> list[list[Any]]:
+        sources = []
+        for sprite_data in self.sources:
+            rect = sprite_data.rect
+            if sprite_data.atlas is not None:
+                content_hash = sprite_data.atlas.get_content_hash()
+            else:
+                content_hash = hashlib.blake2b(sprite_data.sprite.tobytes(), digest_size=16).hexdigest()
+            sources.append([rect.x, rect.y, rect.width, rect.height, content_hash])
+        return sources
 
 
 @dataclass
@@ -114,9 +148,10 @@ class SpriteEntryToSave(EntryToSave):
 
     def __init__(self, sprite_data: SpriteData, name: str, name_wrapper: Callable[[str], str]) -> None:
         self.sprite_data = sprite_data
-        self.image = sprite_data.sprite
+        self.render = lambda: sprite_data.sprite
         self.name = name
         self.name_wrapper = name_wrapper
+        self.sources = [sprite_data]
 
 
 class ImageGeneratorManager:
@@ -186,11 +221,31 @@ class ImageGeneratorManager:
         if not req_gens:
             return None
 
+        return ImageGeneratorManager.run_generator(dlc_type, data_type, req_gens, func_progress_bar_set_percent)
+
+    @staticmethod
+    def run_generator(dlc_type: DLCType | COMPOUND_DATA_TYPE, data_type: DataType,
+                      req_gens: dict[GenType, int | bool],
+                      func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path | None:
+        """
+        Runs generator of data type with selected settings without dialog, gens which are not available are ignored
+        """
+        gen_class: BaseImageGenerator.__class__ = ImageGeneratorManager.get_gen(data_type)
+
+        if not gen_class:
+            return None
+
+        available_gens = gen_class.get_available_gens()
+        req_gens = {gen_type: value for gen_type, value in req_gens.items() if gen_type in available_gens}
+
         print(f"Selected settings for {gen_class.__name__}: {req_gens}")
 
         gen: BaseImageGenerator = gen_class(dlc_type, data_type, req_gens)
 
-        save_path = gen.main_generator(dlc_type, data_type, func_progress_bar_set_percent)
+        with gen.image_sink:
+            save_path = gen.main_generator(dlc_type, data_type, func_progress_bar_set_percent)
+
+        gen.finish_build()
 
         return save_path
 
@@ -215,6 +270,9 @@ class BaseImageGenerator:
 
     default_frame_name = None
 
+    # Increase when generated images change for the same inputs, all files will be rebuilt
+    generator_version = 1
+
     def __init__(self, dlc_type: DLCType | COMPOUND_DATA_TYPE, data_type: DataType,
                  requested_gen_types: dict[GenType, int | bool]):
         self.data_file: DataFile | None = DataHandler.get_data(dlc_type, data_type)
@@ -223,14 +281,14 @@ class BaseImageGenerator:
         self.lang_data = lang_data_full and lang_data_full.get_lang(Lang.EN) or {}
 
         self.requested_gens = requested_gen_types
+        self.image_sink = ImageSink()
+        self.build_manifest: BuildManifest | None = None
         self._set_entries()
+        # atlases are decoded on first sprite access, unchanged entries never touch pixels
         self.meta_data = MetaDataHandler.get_meta_dict_by_name_set_fullest(self.get_textures_set())
 
         print(self.meta_data)
 
-        for texture_name, meta_data in self.meta_data.items():
-            meta_data.init_sprites()
-
     def _set_entries(self):
         self.entries = [
             self.get_unit(key_id, entry.copy()) for key_id, entry in self.data_file.data().items()
@@ -242,6 +300,7 @@ class BaseImageGenerator:
 
         save_path = IMAGES_FOLDER / GENERATED / data_type.value / DLCType.string(dlc_type)
         save_path.mkdir(parents=True, exist_ok=True)
+        self.build_manifest = BuildManifest(save_path)
 
         total_len = len(self.entries)
 
@@ -249,7 +308,7 @@ class BaseImageGenerator:
             for i, entry in enumerate(self.entries):
                 out_entry = self.gen_image(entry)
                 if out_entry:
-                    out_entry.save_entry(save_path, entry, scale)
+                    self.save_out_entry(out_entry, save_path, entry, scale, GenType.IMAGE)
 
                 func_progress_bar_set_percent(i + 1, total_len)
 
@@ -257,12 +316,47 @@ class BaseImageGenerator:
             for i, entry in enumerate(self.entries):
                 out_entry = self.gen_image_with_frame(entry)
                 if out_entry:
-                    out_entry.save_entry(save_path, entry, scale, add_to_path="Icon")
+                    self.save_out_entry(out_entry, save_path, entry, scale, GenType.IMAGE_FRAME, add_to_path="Icon")
 
                 func_progress_bar_set_percent(i + 1, total_len)
 
         return save_path
 
+    def save_out_entry(self, out_entry: EntryToSave, save_path: Path, entry: dict[str, Any], scale: int,
+                       gen_type: GenType, add_to_path: str | None = None) -> None:
+        """
+        Renders and saves generated entry, unless the same file was generated from the same inputs by previous run.
+        Digest is built from entry, rects of sources and hashes of their texture files, so atlases are not decoded
+        """
+        path = out_entry.get_save_path(save_path, entry, add_to_path)
+        digest = get_digest({
+            "generator": self.__class__.__name__,
+            "generator_version": self.generator_version,
+            "gen_type": gen_type.name,
+            "entry": entry,
+            "name": out_entry.name,
+            "scale": scale,
+            "sources": out_entry.get_digest_sources(),
+        })
+
+        if self.build_manifest.need_rebuild(path, digest, gen_type.name):
+            out_entry.save_entry(save_path, entry, scale, add_to_path, sink=self.image_sink)
+
+    def finish_build(self) -> None:
+        """
+        Should be called after all images are saved: removes files of entries which are not generated anymore
+        and saves build manifest
+        """
+        for path, error in self.image_sink.errors:
+            print(f"!!! Image not saved '{path}': {error}", file=sys.stderr)
+            self.build_manifest.discard(path)
+
+        run_gens = {gen_type.name for gen_type in self.get_available_gens() if self.requested_gens.get(gen_type)}
+        self.build_manifest.remove_stale(run_gens)
+        self.build_manifest.save()
+
+        print(f"{self.__class__.__name__} files {self.build_manifest.get_summary()}")
+
     @classmethod
     def get_available_gens(cls) -> list[GenType]:
         return cls._available_gens
@@ -343,17 +437,19 @@ class BaseImageGenerator:
             print(f"!!! Image frame skipped '{frame_name}': not found for texture '{UI}'", file=sys.stderr)
             return None
 
-        rects = get_rects_by_sprite_list([image_data, frame_data])
-        image, frame = get_adjusted_sprites_to_rect(zip([image_data.sprite, frame_data.sprite], rects))
-
-        frame.alpha_composite(image)
+        def render() -> Image:
+            rects = get_rects_by_sprite_list([image_data, frame_data])
+            image, frame = get_adjusted_sprites_to_rect(zip([image_data.sprite, frame_data.sprite], rects))
+            frame.alpha_composite(image)
+            return frame
 
         save_icon_prefix = self.get_save_icon_prefix(entry)
 
         return EntryToSave(
-            frame,
+            render,
             eng_name,
-            lambda x: f"{save_icon_prefix}-{self.get_save_name(x)}.png"
+            lambda x: f"{save_icon_prefix}-{self.get_save_name(x)}.png",
+            sources=[image_data, frame_data]
         )
 
     # def gen_anim(self, entry: dict[str, Any]):
@@ -447,7 +543,8 @@ class ArcanaImageGenerator(BaseImageGenerator):
             for i, entry in enumerate(self.entries):
                 out_entry: EntryToSave | None = self.gen_arcana_picture(entry)
                 if out_entry:
-                    out_entry.save_entry(save_path, entry, scale, add_to_path="Picture")
+                    self.save_out_entry(out_entry, save_path, entry, scale, GenType.ARCANA_PICTURE,
+                                        add_to_path="Picture")
 
                 func_progress_bar_set_percent(i + 1, total_len)
 
@@ -472,9 +569,10 @@ class ArcanaImageGenerator(BaseImageGenerator):
         save_image_prefix = self.get_save_image_prefix(entry)
 
         return EntryToSave(
-            sprite_data.sprite,
+            lambda: sprite_data.sprite,
             eng_name,
-            lambda x: f"{save_image_prefix}-{self.get_save_name(x)}.png"
+            lambda x: f"{save_image_prefix}-{self.get_save_name(x)}.png",
+            sources=[sprite_data]
         )
 
 
@@ -677,8 +775,8 @@ class CharacterImageGenerator(ListBaseImageGenerator):
         image_data = out_image_data.sprite_data
         eng_name = out_image_data.name
 
-        char_sprite = resize_image(image_data.sprite, 3.8)
-        frame_image = self.frame_image.copy()
+        sources = [image_data]
+        weapon_entry: SpriteEntryToSave | None = None
 
         if (weapon_id := entry.get("startingWeapon")) and weapon_id not in ["VOID", "0", 0, None]:
             weapon_data = self.weapon_image_gen.data_file.data().get(weapon_id)
@@ -687,42 +785,51 @@ class CharacterImageGenerator(ListBaseImageGenerator):
             if weapon_entry is None:
                 return None
 
-            weapon_image = resize_image(weapon_entry.image, 4)
-            weapon_image_shadow = make_image_black(weapon_image)
+            sources.append(weapon_entry.sprite_data)
+
+        def render() -> Image:
+            char_sprite = resize_image(image_data.sprite, 3.8)
+            frame_image = self.frame_image.copy()
 
-            weapon_offset = {
-                "x": frame_image.width - weapon_image.width - 10, "y": frame_image.height - weapon_image.height - 12
-            }
+            if weapon_entry is not None:
+                weapon_image = resize_image(weapon_entry.image, 4)
+                weapon_image_shadow = make_image_black(weapon_image)
 
-            frame_image.alpha_composite(weapon_image_shadow, (weapon_offset["x"], weapon_offset["y"]))
-            frame_image.alpha_composite(weapon_image, (weapon_offset["x"] - 8, weapon_offset["y"] - 4))
+                weapon_offset = {
+                    "x": frame_image.width - weapon_image.width - 10, "y": frame_image.height - weapon_image.height - 12
+                }
 
-        frame_image.alpha_composite(char_sprite, (12, frame_image.height - char_sprite.height - 11))
+                frame_image.alpha_composite(weapon_image_shadow, (weapon_offset["x"], weapon_offset["y"]))
+                frame_image.alpha_composite(weapon_image, (weapon_offset["x"] - 8, weapon_offset["y"] - 4))
 
-        text = entry.get(CHAR_NAME)
-        font = ImageFont.truetype(FONT_FILE_PATH, 30)
+            frame_image.alpha_composite(char_sprite, (12, frame_image.height - char_sprite.height - 11))
 
-        if font.getbbox(text)[2] > frame_image.size[0] - 8:
-            small_size = 28
-            if "lolo,".lower() in text.lower():
-                small_size = 24
-                text = text.replace(", ", ",\n", 2).replace(",\n", ", ", 1)
-            elif " " in text:
-                text = text[::-1].replace(" ", "\n", 1)[::-1]
+            text = entry.get(CHAR_NAME)
+            font = ImageFont.truetype(FONT_FILE_PATH, 30)
 
-            font = ImageFont.truetype(FONT_FILE_PATH, small_size)
+            if font.getbbox(text)[2] > frame_image.size[0] - 8:
+                small_size = 28
+                if "lolo,".lower() in text.lower():
+                    small_size = 24
+                    text = text.replace(", ", ",\n", 2).replace(",\n", ", ", 1)
+                elif " " in text:
+                    text = text[::-1].replace(" ", "\n", 1)[::-1]
 
-        canvas = image_new('RGBA', frame_image.size)
+                font = ImageFont.truetype(FONT_FILE_PATH, small_size)
 
-        draw = ImageDraw.Draw(canvas)
-        draw.text((3, 5), text, "#ffffff", font, stroke_width=0.6)
+            canvas = image_new('RGBA', frame_image.size)
 
-        frame_image.alpha_composite(canvas, (14, 10))
+            draw = ImageDraw.Draw(canvas)
+            draw.text((3, 5), text, "#ffffff", font, stroke_width=0.6)
+
+            frame_image.alpha_composite(canvas, (14, 10))
+            return frame_image
 
         return EntryToSave(
-            frame_image,
+            render,
             eng_name,
-            lambda x: f"{self.save_icon_prefix}-{self.get_save_name(x)}.png"
+            lambda x: f"{self.save_icon_prefix}-{self.get_save_name(x)}.png",
+            sources=sources
         )
 
 
@@ -771,7 +878,8 @@ class StageImageGenerator(ListBaseImageGenerator):
             for i, entry in enumerate(self.entries):
                 out_entry = self.gen_image_with_name(entry)
                 if out_entry:
-                    out_entry.save_entry(save_path, entry, scale, add_to_path="With name")
+                    self.save_out_entry(out_entry, save_path, entry, scale, GenType.STAGE_WITH_NAME,
+                                        add_to_path="With name")
 
                 func_progress_bar_set_percent(i + 1, total_len)
 
@@ -785,36 +893,39 @@ class StageImageGenerator(ListBaseImageGenerator):
         image_data = out_image_data.sprite_data
         eng_name = out_image_data.name
 
-        stage_image = resize_image(image_data.sprite, 4)
-
-        text = eng_name.strip()
-        base_scale = 50
-        while True:
-            font = ImageFont.truetype(FONT_FILE_PATH, base_scale)
-            w = font.getbbox(text)[2] + 4
-            h = font.getbbox(text + "|")[3]
-            if w + 40 > stage_image.size[0]:
-                base_scale -= 2
-            else:
-                break
-
-        canvas = image_new('RGBA', (int(w), int(h)))
-
-        draw = ImageDraw.Draw(canvas)
-        draw.text((3, -5), text, "#eef92b", font, stroke_width=1)
-
-        crx, cry = stage_image.size
-        crx //= 2
-        cry //= 5
-        frx, fry = canvas.size
-        frx //= 2
-        fry //= 2
-        stage_image.alpha_composite(canvas, (crx - frx, cry - fry))
+        def render() -> Image:
+            stage_image = resize_image(image_data.sprite, 4)
+
+            text = eng_name.strip()
+            base_scale = 50
+            while True:
+                font = ImageFont.truetype(FONT_FILE_PATH, base_scale)
+                w = font.getbbox(text)[2] + 4
+                h = font.getbbox(text + "|")[3]
+                if w + 40 > stage_image.size[0]:
+                    base_scale -= 2
+                else:
+                    break
+
+            canvas = image_new('RGBA', (int(w), int(h)))
+
+            draw = ImageDraw.Draw(canvas)
+            draw.text((3, -5), text, "#eef92b", font, stroke_width=1)
+
+            crx, cry = stage_image.size
+            crx //= 2
+            cry //= 5
+            frx, fry = canvas.size
+            frx //= 2
+            fry //= 2
+            stage_image.alpha_composite(canvas, (crx - frx, cry - fry))
+            return stage_image
 
         return EntryToSave(
-            stage_image,
+            render,
             eng_name,
-            lambda x: f"{self.save_image_prefix}-{self.get_save_name(x)}.png"
+            lambda x: f"{self.save_image_prefix}-{self.get_save_name(x)}.png",
+            sources=[image_data]
         )
 
 
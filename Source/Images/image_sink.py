@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from pathlib import Path
+from threading import Lock, BoundedSemaphore
+from typing import Any
+
+from PIL.Image import Image
+
+from Source.Utility.image_functions import resize_image
+from Source.Utility.timer import Profiler
+
+
+class ImageSink:
+    """
+    Write-behind saver of images. 'save' only queues the image, resize, PNG compression and writing are done
+    by thread pool (PIL releases GIL while encoding). Writes to the same path are done in order of 'save' calls.
+    Errors of writes are collected and returned by 'join'.
+
+    Usage:
+        with ImageSink() as sink:
+            sink.save(image, path)
+        errors = sink.errors
+    """
+
+    def __init__(self, max_workers: int | None = None, max_pending: int | None = None):
+        max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ImageSink")
+        # every pending write keeps its image, so producer waits when too many of them are queued
+        self._pending_semaphore = BoundedSemaphore(max_pending or max_workers * 4)
+
+        self._lock = Lock()
+        self._last_writes: dict[Path, Future] = {}
+        self._created_dirs: set[Path] = set()
+        self.errors: list[tuple[Path, BaseException]] = []
+
+    def _make_dir(self, path: Path) -> None:
+        if path in self._created_dirs:
+            return
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._created_dirs.add(path)
+
+    def _write(self, previous: Future | None, image: Image, path: Path, scale: int, save_kwargs: dict[str, Any]):
+        try:
+            if previous is not None:
+                # tasks are started in submission order, so previous write is already running or done
+                wait([previous])
+
+            self._make_dir(path.parent)
+            # PIL encodes and writes in one call
+            if scale != 1:
+                image = resize_image(image, scale)
+            with Profiler.span("encode", file=path.name):
+                image.save(path, **save_kwargs)
+            Profiler.count("images_written")
+        except Exception as e:
+            with self._lock:
+                self.errors.append((path, e))
+        finally:
+            self._pending_semaphore.release()
+
+    def _forget(self, path: Path, future: Future) -> None:
+        with self._lock:
+            if self._last_writes.get(path) is future:
+                del self._last_writes[path]
+
+    def save(self, image: Image, path: Path, scale: int = 1, **save_kwargs) -> None:
+        """
+        Queues saving of image resized by scale to path. save_kwargs are passed to 'PIL.Image.save'
+        (ex: compress_level=9). Image must not be changed after this call.
+        """
+        self._pending_semaphore.acquire()
+        with self._lock:
+            previous = self._last_writes.get(path)
+            future = self._executor.submit(self._write, previous, image, path, scale, save_kwargs)
+            self._last_writes[path] = future
+        future.add_done_callback(lambda f: self._forget(path, f))
+
+    def join(self) -> list[tuple[Path, BaseException]]:
+        """
+        Waits for all queued writes and returns errors of writes since last 'join'
+        """
+        with self._lock:
+            futures = list(self._last_writes.values())
+        # the last write of each path waits for all previous ones
+        wait(futures)
+
+        with self._lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def close(self) -> list[tuple[Path, BaseException]]:
+        errors = self.join()
+        self._executor.shutdown()
+        self.errors = errors
+        return errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,187 @@
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Final, NamedTuple
+
+from PIL.Image import Image
+
+from Source.Utility.timer import Profiler
+
+_PNG_SIGNATURE: Final[bytes] = b"\x89PNG\r\n\x1a\n"
+# width, height, bit depth, color type (6 = RGBA), compression, filter method, interlace
+_IHDR = struct.Struct(">IIBBBBB")
+_UINT = struct.Struct(">I")
+# deflate with 32K window and default compression
+_ZLIB_HEADER: Final[bytes] = b"\x78\x9c"
+_ADLER_BASE: Final[int] = 65521
+
+_FILTER_NONE: Final[bytes] = b"\x00"
+_FILTER_UP: Final[bytes] = b"\x02"
+
+IDAT_SIZE: Final[int] = 1 << 20
+
+
+class EncodedBand(NamedTuple):
+    """
+    Rows of PNG band compressed as independent deflate segment, so bands can be encoded by different processes
+    """
+    data: bytes
+    adler32: int
+    raw_size: int
+    rows: int
+
+
+def encode_png_band(band: Image, compress_level: int = 6) -> EncodedBand:
+    """
+    Filters and compresses rows of RGBA band. First row is not filtered, other rows use 'Up' filter
+    (difference with previous row, computed for whole row at once with big int arithmetic),
+    it compresses tilemaps almost as well as PIL adaptive filtering.
+    """
+    if band.mode != "RGBA":
+        raise ValueError(f"Expected RGBA band, got {band.mode}")
+
+    with Profiler.span("encode", rows=band.size[1]):
+        data = band.tobytes()
+        stride = band.size[0] * 4
+        # masks to subtract bytes of rows lane by lane without borrow between bytes
+        high_bits = int.from_bytes(b"\x80" * stride, "big")
+        low_bits = int.from_bytes(b"\x7f" * stride, "big")
+
+        rows = memoryview(data)
+        filtered = []
+        previous = None
+        for start in range(0, len(data), stride):
+            row_bytes = rows[start:start + stride]
+            row = int.from_bytes(row_bytes, "big")
+            if previous is None:
+                filtered.append(_FILTER_NONE)
+                filtered.append(row_bytes)
+            else:
+                filtered.append(_FILTER_UP)
+                up = ((row | high_bits) - (previous & low_bits)) ^ ((row ^ previous ^ high_bits) & high_bits)
+                filtered.append(up.to_bytes(stride, "big"))
+            previous = row
+
+        raw = b"".join(filtered)
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    return EncodedBand(compressed, zlib.adler32(raw), len(raw), band.size[1])
+
+
+def _adler32_combine(adler1: int, adler2: int, size2: int) -> int:
+    """
+    Adler-32 of concatenated data by checksums of parts (same as adler32_combine of zlib)
+    """
+    remainder = size2 % _ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = (remainder * sum1) % _ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xffff) + _ADLER_BASE - 1) % _ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + _ADLER_BASE - remainder) % _ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+class PngStreamWriter:
+    """
+    Writes RGBA PNG by horizontal bands of rows, so whole image is never kept in memory.
+    Bands are encoded by 'write' or beforehand with 'encode_png_band' (ex: in worker process) and added
+    with 'write_encoded'. File is written to temporary path and replaces destination on successful 'close'.
+
+    Usage:
+        with PngStreamWriter(path, (width, height)) as writer:
+            for band in bands:
+                writer.write(band)
+    """
+
+    def __init__(self, path: Path, size: tuple[int, int], compress_level: int = 6):
+        self.path = path
+        self.size = size
+        self.compress_level = compress_level
+        self._tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        self._rows_written = 0
+        self._adler32 = 1
+
+        self._pending: list[bytes] = []
+        self._pending_size = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(_PNG_SIGNATURE)
+        self._write_chunk(b"IHDR", _IHDR.pack(size[0], size[1], 8, 6, 0, 0, 0))
+        self._add_compressed(_ZLIB_HEADER)
+
+    def _write_chunk(self, tag: bytes, data: bytes) -> None:
+        self._file.write(_UINT.pack(len(data)))
+        self._file.write(tag)
+        self._file.write(data)
+        self._file.write(_UINT.pack(zlib.crc32(data, zlib.crc32(tag))))
+
+    def _add_compressed(self, data: bytes) -> None:
+        if not data:
+            return
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= IDAT_SIZE:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        if self._pending:
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+        self._pending.clear()
+        self._pending_size = 0
+
+    def write(self, band: Image) -> None:
+        """
+        Appends rows of RGBA band, its width must be the same as width of image
+        """
+        if band.size[0] != self.size[0]:
+            raise ValueError(f"Expected band with width {self.size[0]}, got {band.size}")
+        self.write_encoded(encode_png_band(band, self.compress_level))
+
+    def write_encoded(self, encoded: EncodedBand) -> None:
+        """
+        Appends rows encoded by 'encode_png_band' from band with width of image
+        """
+        if self._rows_written + encoded.rows > self.size[1]:
+            raise ValueError(f"Too many rows for {self.path.name}")
+        if encoded.raw_size != encoded.rows * (self.size[0] * 4 + 1):
+            raise ValueError(f"Band width does not match width of {self.path.name}")
+
+        self._add_compressed(encoded.data)
+        self._adler32 = _adler32_combine(self._adler32, encoded.adler32, encoded.raw_size)
+        self._rows_written += encoded.rows
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        try:
+            if self._rows_written != self.size[1]:
+                raise ValueError(f"Written {self._rows_written} rows of {self.size[1]} for {self.path.name}")
+            # empty final block of deflate stream
+            self._add_compressed(zlib.compressobj(self.compress_level, zlib.DEFLATED, -zlib.MAX_WBITS).flush())
+            self._add_compressed(_UINT.pack(self._adler32))
+            self._flush_pending()
+            self._write_chunk(b"IEND", b"")
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+            Profiler.count("images_written")
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """
+        Closes file without saving image
+        """
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,177 @@
+"""
+Compact export of tilemap: unique transformed tiles of every layer are packed once into atlas PNG and every
+cell of layer refers to them by id in binary grid. Index JSON describes files, tiles and their transforms.
+
+Grid file: header (magic, version, width, height, depth, item size) and 'depth' planes of width * height
+little-endian ids, rows from top of image. Id 0 is empty cell, id N is N-th tile of atlas (from 1).
+Tiles of the same cell are in planes in order of compositing, so cell is rebuilt by pasting tile of first plane
+and compositing tiles of next planes over it.
+"""
+import json
+import math
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Final, Iterator
+
+from PIL import Image as PILImage
+from PIL.Image import Image, new as image_new
+
+from Source.Data.meta_data import MetaData
+from Source.Images.tilemap_data import Tilemap
+from Source.Images.tilemap_render import create_tile_images
+from Source.Utility.timer import Profiler
+
+ATLAS_FOLDER: Final[str] = "Atlas"
+ATLAS_VERSION: Final[int] = 1
+
+_GRID_MAGIC: Final[bytes] = b"VSTG"
+# magic, version, width, height, depth, item size
+_GRID_HEADER = struct.Struct("<4sHIIHB")
+
+
+def _get_grid_typecode(count_tiles: int) -> str:
+    return "H" if count_tiles < 1 << 16 else "I"
+
+
+def _build_grid(tilemap: Tilemap, tile_ids: dict[tuple[int, int], int], size_map: tuple[int, int],
+                typecode: str) -> tuple[array, int]:
+    """
+    Returns planes of tile ids of cells and count of planes. Tiles outside of map and without sprite are skipped
+    """
+    width, height = size_map
+    cells = array("i")
+    ids = array(typecode)
+    for x, y, tile_index, matrix_index in zip(tilemap.xs, tilemap.ys, tilemap.tile_indexes, tilemap.matrix_indexes):
+        row = abs(y)
+        tile_id = tile_ids.get((tile_index, matrix_index))
+        if tile_id and 0 <= x < width and row < height:
+            cells.append(row * width + x)
+            ids.append(tile_id)
+
+    # tiles of the same cell go to next planes in order of tilemap
+    counts = array("H", bytes(2 * width * height))
+    planes = array("H")
+    for cell in cells:
+        planes.append(counts[cell])
+        counts[cell] += 1
+    depth = max(counts, default=0)
+
+    grid = array(typecode, bytes(array(typecode).itemsize * width * height * depth))
+    for cell, plane, tile_id in zip(cells, planes, ids):
+        grid[plane * width * height + cell] = tile_id
+    return grid, depth
+
+
+def _pack_atlas(tiles: list[Image], size_tile: tuple[int, int]) -> tuple[Image, int]:
+    columns = math.ceil(math.sqrt(len(tiles)))
+    atlas = image_new(mode="RGBA", size=(columns * size_tile[0], math.ceil(len(tiles) / columns) * size_tile[1]))
+    for i, tile in enumerate(tiles):
+        atlas.paste(tile, (i % columns * size_tile[0], i // columns * size_tile[1]))
+    return atlas, columns
+
+
+def export_tilemap_atlas(tilemaps: list[Tilemap], data_by_guid: dict[str: MetaData], size_map: tuple[int, int],
+                         save_folder: Path, save_file: str, exclude_layers: set[int] = frozenset()) -> Path:
+    """
+    Writes atlas PNG and grid of every layer and index JSON into save_folder. Returns path of index
+    """
+    size_tile = Tilemap.get_size_tile()
+    save_folder.mkdir(parents=True, exist_ok=True)
+
+    layers = []
+    for layer, tilemap in enumerate(tilemaps):
+        with Profiler.span("atlas", layer=layer):
+            tile_images = create_tile_images(tilemap, data_by_guid)
+            keys = sorted(key for key, tile_image in tile_images.items() if tile_image)
+            tile_ids = {key: i + 1 for i, key in enumerate(keys)}
+            typecode = _get_grid_typecode(len(keys))
+            grid, depth = _build_grid(tilemap, tile_ids, size_map, typecode)
+
+            layer_info = {"atlas": None, "columns": 0, "grid": f"{save_file}-Layer-{layer}-grid.bin", "depth": depth}
+            if keys:
+                atlas, layer_info["columns"] = _pack_atlas([tile_images[key] for key in keys], size_tile)
+                layer_info["atlas"] = f"{save_file}-Layer-{layer}-atlas.png"
+                atlas.save(save_folder / layer_info["atlas"])
+                Profiler.count("images_written")
+
+            if sys.byteorder != "little":
+                grid.byteswap()
+            header = _GRID_HEADER.pack(_GRID_MAGIC, ATLAS_VERSION, *size_map, depth, grid.itemsize)
+            (save_folder / layer_info["grid"]).write_bytes(header + grid.tobytes())
+
+            layer_info["tiles"] = [
+                {
+                    "guid": tilemap.sprite_guids[tile_index],
+                    "sprite_id": tilemap.sprite_ids[tile_index],
+                    "matrix": list(tilemap.get_matrix(matrix_index)),
+                }
+                for tile_index, matrix_index in keys
+            ]
+            layers.append(layer_info)
+
+    index = {
+        "version": ATLAS_VERSION,
+        "size_map": list(size_map),
+        "size_tile": list(size_tile),
+        "exclude_layers": sorted(exclude_layers),
+        "layers": layers,
+    }
+    index_path = save_folder / f"{save_file}-atlas.json"
+    index_path.write_text(json.dumps(index, indent=2), encoding="UTF-8")
+    return index_path
+
+
+def read_grid(path: Path) -> tuple[array, tuple[int, int], int]:
+    """
+    Returns planes of tile ids, size of map and count of planes from grid file
+    """
+    data = path.read_bytes()
+    magic, version, width, height, depth, itemsize = _GRID_HEADER.unpack_from(data)
+    if magic != _GRID_MAGIC or version != ATLAS_VERSION:
+        raise ValueError(f"Unsupported grid file {path.name}")
+
+    grid = array("H" if itemsize == 2 else "I")
+    grid.frombytes(data[_GRID_HEADER.size:])
+    if sys.byteorder != "little":
+        grid.byteswap()
+    if len(grid) != width * height * depth:
+        raise ValueError(f"Unexpected size of grid file {path.name}")
+    return grid, (width, height), depth
+
+
+def rebuild_layers(index_path: Path) -> Iterator[Image]:
+    """
+    Yields full image of every layer rebuilt from atlas export
+    """
+    index = json.loads(index_path.read_text(encoding="UTF-8"))
+    size_tile_x, size_tile_y = index["size_tile"]
+
+    for layer_info in index["layers"]:
+        grid, (width, height), depth = read_grid(index_path.parent / layer_info["grid"])
+        image = image_new(mode="RGBA", size=(width * size_tile_x, height * size_tile_y))
+        if not layer_info["atlas"]:
+            yield image
+            continue
+
+        with PILImage.open(index_path.parent / layer_info["atlas"]) as atlas:
+            columns = layer_info["columns"]
+            tiles = [
+                atlas.crop((i % columns * size_tile_x, i // columns * size_tile_y,
+                            (i % columns + 1) * size_tile_x, (i // columns + 1) * size_tile_y))
+                for i in range(len(layer_info["tiles"]))
+            ]
+
+        for plane in range(depth):
+            offset = plane * width * height
+            for cell in range(width * height):
+                tile_id = grid[offset + cell]
+                if not tile_id:
+                    continue
+                position = (cell % width * size_tile_x, cell // width * size_tile_y)
+                if plane:
+                    image.alpha_composite(tiles[tile_id - 1], position)
+                else:
+                    image.paste(tiles[tile_id - 1], position)
+        yield image
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Final, Self
+
+from Source.Utility.constants import CONFIG_FOLDER
+from Source.Utility.unityparser2 import UnityYAMLEntry
+
+TILEMAP_CACHE_FOLDER: Final[Path] = CONFIG_FOLDER / "TilemapCache"
+
+# Increase when format or parser change, old cache files will be ignored
+CACHE_VERSION: Final[int] = 1
+_MAGIC: Final[bytes] = b"VSTC"
+_BYTE_ORDER: Final[bytes] = sys.byteorder[0].encode()
+
+# magic, version, prefab size, prefab mtime_ns, byte order of arrays, layers count
+_HEADER = struct.Struct("<4sHQqcI")
+# size x, size y, sprites count, matrices count, tiles count
+_LAYER = struct.Struct("<iiIII")
+_GUID_LEN = struct.Struct("<H")
+
+IDENTITY_MATRIX: Final[tuple[float, float, float, float]] = (1.0, 0.0, 0.0, 1.0)
+
+
+class Tilemap:
+    """
+    Tiles of one tilemap layer as columns of typed arrays (x, y, tile index, matrix index).
+    Sprites (fileID, guid) and matrices (e00, e10, e01, e11) are small lookup tables indexed by columns.
+    """
+
+    def __init__(self, size: tuple[int, int],
+                 sprite_ids: array, sprite_guids: list[str], matrices: array,
+                 xs: array, ys: array, tile_indexes: array, matrix_indexes: array):
+        self.size = size
+        self.sprite_ids = sprite_ids
+        self.sprite_guids = sprite_guids
+        self.matrices = matrices
+        self.xs = xs
+        self.ys = ys
+        self.tile_indexes = tile_indexes
+        self.matrix_indexes = matrix_indexes
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Tilemap):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    @classmethod
+    def from_entry(cls, doc: UnityYAMLEntry) -> Self:
+        size = doc.get("m_Size") or {}
+
+        sprite_ids, sprite_guids = array("q"), []
+        for sprite in doc.get("m_TileSpriteArray") or []:
+            sprite_ids.append(int(sprite["m_Data"]["fileID"]))
+            sprite_guids.append(sprite["m_Data"].get("guid"))
+
+        matrices = array("d")
+        for matrix in doc.get("m_TileMatrixArray") or []:
+            data = matrix["m_Data"]
+            if int(matrix["m_RefCount"]) > 0:
+                matrices.extend(float(data[k]) for k in ("e00", "e10", "e01", "e11"))
+            else:
+                matrices.extend(IDENTITY_MATRIX)
+
+        xs, ys, tile_indexes, matrix_indexes = array("i"), array("i"), array("i"), array("i")
+        for tile in doc.get("m_Tiles") or []:
+            pos, second = tile["first"], tile["second"]
+            xs.append(int(pos["x"]))
+            ys.append(int(pos["y"]))
+            tile_indexes.append(int(second["m_TileIndex"]))
+            matrix_indexes.append(int(second.get("m_TileMatrixIndex", 0)))
+
+        return cls((int(size.get("x", 0)), int(size.get("y", 0))), sprite_ids, sprite_guids, matrices,
+                   xs, ys, tile_indexes, matrix_indexes)
+
+    def get_matrix(self, index: int) -> tuple[float, float, float, float]:
+        if 4 * index + 4 > len(self.matrices):
+            return IDENTITY_MATRIX
+        return tuple(self.matrices[4 * index:4 * index + 4])
+
+    def get_nbytes(self) -> int:
+        columns = (self.sprite_ids, self.matrices, self.xs, self.ys, self.tile_indexes, self.matrix_indexes)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    @staticmethod
+    def get_size_tile() -> tuple[int, int]:
+        return 32, 32
+
+
+def _get_cache_path(path: Path, cache_folder: Path) -> Path:
+    path_hash = hashlib.sha1(str(path.absolute()).encode("UTF-8")).hexdigest()[:16]
+    return cache_folder / f"{path.stem}-{path_hash}.bin"
+
+
+def save_cached_tilemaps(path: Path, tilemaps: list[Tilemap], stat: os.stat_result,
+                         cache_folder: Path = TILEMAP_CACHE_FOLDER) -> None:
+    parts = [_HEADER.pack(_MAGIC, CACHE_VERSION, stat.st_size, stat.st_mtime_ns, _BYTE_ORDER, len(tilemaps))]
+
+    for tilemap in tilemaps:
+        parts.append(_LAYER.pack(*tilemap.size, len(tilemap.sprite_ids), len(tilemap.matrices) // 4, len(tilemap)))
+        parts.append(tilemap.sprite_ids.tobytes())
+        for guid in tilemap.sprite_guids:
+            guid_bytes = (guid or "").encode("UTF-8")
+            parts.append(_GUID_LEN.pack(len(guid_bytes)))
+            parts.append(guid_bytes)
+        parts.append(tilemap.matrices.tobytes())
+        for column in (tilemap.xs, tilemap.ys, tilemap.tile_indexes, tilemap.matrix_indexes):
+            parts.append(column.tobytes())
+
+    cache_path = _get_cache_path(path, cache_folder)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(b"".join(parts))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"! Cannot save tilemap cache {cache_path.name}: {e}")
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_cached_tilemaps(path: Path, stat: os.stat_result,
+                         cache_folder: Path = TILEMAP_CACHE_FOLDER) -> list[Tilemap] | None:
+    """
+    Returns cached tilemaps when they were saved for prefab with the same size and mtime, None otherwise
+    """
+    try:
+        data = _get_cache_path(path, cache_folder).read_bytes()
+    except OSError:
+        return None
+
+    def read_array(typecode: str, count: int) -> array:
+        nonlocal offset
+        column = array(typecode)
+        end = offset + column.itemsize * count
+        if end > len(data):
+            raise ValueError("Unexpected end of cache")
+        column.frombytes(data[offset:end])
+        offset = end
+        return column
+
+    try:
+        magic, version, size, mtime_ns, byte_order, layers_count = _HEADER.unpack_from(data)
+        if (magic, version, size, mtime_ns, byte_order) != (_MAGIC, CACHE_VERSION, stat.st_size, stat.st_mtime_ns,
+                                                            _BYTE_ORDER):
+            return None
+
+        offset = _HEADER.size
+        tilemaps = []
+        for _ in range(layers_count):
+            size_x, size_y, sprites_count, matrices_count, tiles_count = _LAYER.unpack_from(data, offset)
+            offset += _LAYER.size
+
+            sprite_ids = read_array("q", sprites_count)
+            sprite_guids = []
+            for _ in range(sprites_count):
+                (guid_len,) = _GUID_LEN.unpack_from(data, offset)
+                offset += _GUID_LEN.size
+                sprite_guids.append(data[offset:offset + guid_len].decode("UTF-8") or None)
+                offset += guid_len
+            matrices = read_array("d", 4 * matrices_count)
+            columns = [read_array("i", tiles_count) for _ in range(4)]
+
+            tilemaps.append(Tilemap((size_x, size_y), sprite_ids, sprite_guids, matrices, *columns))
+    except (struct.error, UnicodeDecodeError, ValueError):
+        return None
+
+    if offset != len(data):
+        return None
+
+    return tilemaps
@@ -1,104 +1,123 @@
 import itertools
+import math
+import shutil
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Final
 from tkinter.messagebox import showerror, askyesno
 
-from PIL.Image import Image, new as image_new
+from PIL.Image import Image, new as image_new, alpha_composite
 
 from Source.Config.config import Config
 from Source.Utility.constants import IMAGES_FOLDER, GENERATED, TILEMAPS, PROGRESS_BAR_FUNC_TYPE
-from Source.Utility.image_functions import affine_transform, crop_image_rect_left_bot
+from Source.Utility.image_functions import affine_transform
 from Source.Data.meta_data import MetaData, MetaDataHandler
-from Source.Utility.multirun import run_multiprocess, run_concurrent_sync
+from Source.Images.image_sink import ImageSink
+from Source.Images.png_stream import PngStreamWriter
+from Source.Images.tilemap_atlas import ATLAS_FOLDER, export_tilemap_atlas
+from Source.Images.tilemap_data import Tilemap, load_cached_tilemaps, save_cached_tilemaps
+from Source.Images.tilemap_pyramid import PYRAMID_FOLDER, PyramidWriter
+from Source.Images.tilemap_render import render_layers, render_streaming, resize_sprite_for_tile
 from Source.Utility.special_classes import Objectless
-from Source.Utility.sprite_data import SpriteData, SpriteRect
-from Source.Utility.timer import Timeit
-from Source.Utility.unityparser2 import UnityDoc, UnityYAMLEntry
+from Source.Utility.timer import Timeit, Profiler
+from Source.Utility.unityparser2 import UnityDoc
 from Source.Utility.utility import CheckBoxes, write_in_file_end, clear_file
 
-
-class Tilemap:
-    def __init__(self, doc: UnityYAMLEntry):
-        self.m_Size = doc.get("m_Size")
-        self.m_TileMatrixArray = doc.get("m_TileMatrixArray")
-        self.m_TileSpriteArray = doc.get("m_TileSpriteArray")
-        self.m_Tiles = doc.get("m_Tiles")
-
-    def extend_tilemap(self, other: "Tilemap"):
-        self.m_Tiles.extend(other.m_Tiles)
-
-    @staticmethod
-    def get_size_tile() -> tuple[int, int]:
-        return 32, 32
+# maps with more tiles are rendered by bands with streaming PNG writers, unless mode is set explicitly
+STREAMING_MAP_SIZE: Final[int] = 100_000
+# pixels of one band in streaming mode (32 MB for RGBA band)
+STREAMING_BAND_PIXELS: Final[int] = 1 << 23
+# layers and composites that are saved at once in full mode (every one is image of whole map)
+WRITE_QUEUE_SIZE: Final[int] = 4
 
 
 class TilemapDataHandler(Objectless):
     loaded_prefabs: dict[Path, tuple[list[Tilemap | None], int]] = dict()
 
 
-def __resize_sprite_for_tile(image: Image, sprite_data: SpriteData, size_tile: tuple[int, int]) -> Image:
-    shift_x = int(sprite_data.rect.width * sprite_data.pivot.x)
-    shift_y = int(sprite_data.rect.height * sprite_data.pivot.y)
-
-    rect = SpriteRect(shift_x, shift_y, size_tile[0], size_tile[1])
-    return crop_image_rect_left_bot(image, rect)
+def __load_cached_tilemaps(path: Path) -> tuple[list[Tilemap], int] | None:
+    tilemaps = load_cached_tilemaps(path, path.stat())
+    if not tilemaps:
+        return None
+    Profiler.count("tilemap_cache_hits")
+    return tilemaps, len(tilemaps)
 
 
-def __load_unity_document(path: Path) -> tuple[list[Tilemap | None], int]:
-    doc = UnityDoc.yaml_parse_file_smart(path, lambda x: "Tilemap:" in x)
-    tilemaps = [Tilemap(tilemap) for tilemap in doc.entries]
+def __load_unity_document(path: Path) -> tuple[list[Tilemap], int]:
+    stat = path.stat()
+    Profiler.count("bytes_read", stat.st_size)
+    if Config.get_multiprocessing():
+        doc = UnityDoc.yaml_parse_file_smart(path, lambda x: "Tilemap:" in x)
+    else:
+        doc = UnityDoc.yaml_parse_file_stream(path, lambda x: "Tilemap:" in x)
+    tilemaps = [Tilemap.from_entry(tilemap) for tilemap in doc.entries]
+    save_cached_tilemaps(path, tilemaps, stat)
     return tilemaps, len(tilemaps)
 
 
-def __create_tilemap_image(tilemap: Tilemap, new_image: Image, data_by_guid: dict[str: MetaData],
-                           save_path: Path) -> Image:
+def __gen_tilemap_streaming(tilemaps: list[Tilemap], data_by_guid: dict[str: MetaData], save_folder: Path,
+                            save_file: str, size_map: tuple[int, int], exclude_layers: set[int],
+                            func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE, is_pyramid: bool) -> list[str]:
+    """
+    Renders layers and their composites by horizontal bands and streams rows of every band to PNG writers
+    (and last composite to pyramid), so memory depends on width of map and STREAMING_BAND_PIXELS instead of size of map
+    """
     size_tile_x, size_tile_y = Tilemap.get_size_tile()
+    size_image = (size_map[0] * size_tile_x, size_map[1] * size_tile_y)
+    band_rows = max(1, STREAMING_BAND_PIXELS // max(1, size_image[0] * size_tile_y))
+    print(f"Streaming by {math.ceil(size_map[1] / band_rows)} bands of {band_rows} rows")
 
-    tile_sprite_array = [(int(x["m_Data"]["fileID"]), x["m_Data"]["guid"]) for x in tilemap.m_TileSpriteArray]
-    tile_matrix_array = [{k: float(v) for k, v in x["m_Data"].items()} if int(x["m_RefCount"]) > 0 else {} for x in
-                         tilemap.m_TileMatrixArray]
-    tiles = ({
-        "pos": {k: int(v) for k, v in tile["first"].items()},
-        "tile_index": int(tile["second"]["m_TileIndex"]),
-        "matrix_index": int(tile["second"]["m_TileMatrixIndex"])
-    } for tile in tilemap.m_Tiles)
-
-    log_list = []
-    for tile in tiles:
-        tile_inner_id, texture_guid = tile_sprite_array[tile["tile_index"]]
-
-        data: MetaData = data_by_guid.get(texture_guid)
-        sprite_data = data.data_id.get(tile_inner_id)
-        sprite = sprite_data.sprite
-
-        if not sprite:
-            line = f"Sprite error: {texture_guid=} {tile_inner_id=}\n"
-            log_list.append(line)
-            continue
-
-        sprite = __resize_sprite_for_tile(sprite, sprite_data, (size_tile_x, size_tile_y))
-
-        matrix = tile_matrix_array[tile["matrix_index"]]
-        if matrix["e00"] != 1 or matrix["e11"] != 1:
-            affine = (matrix["e00"], matrix["e10"], matrix["e01"], matrix["e11"])
-            sprite = affine_transform(sprite, affine)
+    with ExitStack() as stack:
+        layer_writers = [
+            stack.enter_context(PngStreamWriter(save_folder / f"{save_file}-Layer-{i}.png", size_image))
+            for i in range(len(tilemaps))
+        ]
+        composite_writers = [
+            stack.enter_context(PngStreamWriter(save_folder / f"{save_file}-{i}.png", size_image))
+            for i in range(len(tilemaps)) if i not in exclude_layers
+        ]
+        pyramid = stack.enter_context(__open_pyramid(save_folder, save_file, size_image)) if is_pyramid else None
+        log_list = render_streaming(tilemaps, data_by_guid, size_map, band_rows, exclude_layers,
+                                    layer_writers, composite_writers, func_progress_bar_set_percent,
+                                    pyramid and pyramid.write)
 
-        new_image.alpha_composite(sprite, (tile['pos']['x'] * size_tile_x, abs(tile['pos']['y']) * size_tile_y))
+    if pyramid:
+        print(f"Pyramid: {pyramid.get_summary()}")
+    return log_list
 
-    write_in_file_end(save_path.with_name("errors.log"), log_list)
 
-    return new_image
+def __open_pyramid(save_folder: Path, save_file: str, size_image: tuple[int, int]) -> PyramidWriter:
+    return PyramidWriter(save_folder / PYRAMID_FOLDER / f"{save_file}.dzi", size_image)
 
 
-def __save_image(image: Image, path: Path) -> None:
-    image.save(path)
+def __gen_pyramid(image: Image, save_folder: Path, save_file: str) -> None:
+    band_rows = max(1, STREAMING_BAND_PIXELS // max(1, image.size[0]))
+    with __open_pyramid(save_folder, save_file, image.size) as pyramid:
+        for top in range(0, image.size[1], band_rows):
+            pyramid.write(image.crop((0, top, image.size[0], min(top + band_rows, image.size[1]))))
+    print(f"Pyramid: {pyramid.get_summary()}")
 
 
 def gen_tilemap(path: Path, __is_full_auto=True,
-                func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path | None:
+                func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0,
+                is_streaming: bool | None = None, is_atlas: bool = False, is_images: bool = True,
+                is_pyramid: bool = False, exclude_layers: set[int] = frozenset()) -> Path | None:
+    """
+    Generates image of every layer and composites of layers from prefab.
+    exclude_layers: layers to skip when run without dialogs (not full auto), otherwise they are selected in dialog
+    is_streaming: render by bands without keeping whole layers in memory, None selects it for big maps
+    is_atlas: also export unique tiles and grids of layers (see 'tilemap_atlas') into ATLAS_FOLDER
+    is_images: render images of layers and composites, can be disabled to get only atlas export
+    is_pyramid: also cut last composite into deep zoom tiles (see 'tilemap_pyramid') in PYRAMID_FOLDER
+    """
     p_file = path.name
     save_file = path.with_suffix("").name
     save_folder = Path(IMAGES_FOLDER, GENERATED, TILEMAPS, save_file)
 
+    if path not in TilemapDataHandler.loaded_prefabs and (cached := __load_cached_tilemaps(path)):
+        print(f"Loaded {p_file} from cache")
+        TilemapDataHandler.loaded_prefabs[path] = cached
+
     if path not in TilemapDataHandler.loaded_prefabs:
         _text = path.read_text(encoding="UTF-8")
         count_layers = _text.count("Tilemap:")
@@ -122,7 +141,7 @@ def gen_tilemap(path: Path, __is_full_auto=True,
         exclude_data = exclude_cbs.return_data
         exclude_layers = set(itertools.compress(range(count_layers), exclude_data))
     else:
-        exclude_layers = set()
+        exclude_layers = set(exclude_layers)
 
     print(f"Multiprocessing: {Config.get_multiprocessing()}")
     print(f"Excluded layers: {exclude_layers}")
@@ -135,11 +154,13 @@ def gen_tilemap(path: Path, __is_full_auto=True,
         })
         print(f"Finished {p_file} parsing ({timeit:.2f} sec)")
     else:
-        print(f"Already parsed {p_file}")
+        print(f"Already loaded {p_file}")
 
     tilemaps, _ = TilemapDataHandler.loaded_prefabs[path]
+    print(f"Tiles: {sum(map(len, tilemaps))} in {len(tilemaps)} layers "
+          f"({sum(tilemap.get_nbytes() for tilemap in tilemaps) / 2 ** 20:.2f} MB)")
 
-    guid_set = {sprite["m_Data"]["guid"] for tilemap in tilemaps for sprite in tilemap.m_TileSpriteArray}
+    guid_set = {guid for tilemap in tilemaps for guid in tilemap.sprite_guids if guid}
 
     print(f"Required guids: {guid_set}")
 
@@ -156,62 +177,81 @@ def gen_tilemap(path: Path, __is_full_auto=True,
 
     size_map_x, size_map_y = 0, 0
     for tilemap in tilemaps:
-        _size = tilemap.m_Size
-        size_map_x = max(size_map_x, int(_size['x']))
-        size_map_y = max(size_map_y, int(_size['y']))
+        size_map_x = max(size_map_x, tilemap.size[0])
+        size_map_y = max(size_map_y, tilemap.size[1])
 
     size_tile_x, size_tile_y = Tilemap.get_size_tile()
 
+    log_list = []
+
     def get_transparent_image():
         return image_new(mode="RGBA", size=(size_map_x * size_tile_x, size_map_y * size_tile_y))
 
     total_map_size = size_map_x * size_map_y
-    is_concurrent = total_map_size < 100_000
-    print(f"Tilemap size: x={size_map_x}, y={size_map_y}; total={total_map_size}, {is_concurrent=}")
+    if is_streaming is None:
+        is_streaming = total_map_size >= STREAMING_MAP_SIZE
+    print(f"Tilemap size: x={size_map_x}, y={size_map_y}; total={total_map_size}, {is_streaming=}")
 
-    args_create_tilemap = (
-        (tilemap, get_transparent_image(), meta_data, save_folder / f"{save_file}-Layer-{i}.png")
-        for i, tilemap in enumerate(tilemaps)
-    )
+    if is_atlas:
+        index_path = export_tilemap_atlas(tilemaps, meta_data, (size_map_x, size_map_y), save_folder / ATLAS_FOLDER,
+                                          save_file, exclude_layers)
+        print(f"Exported tile atlas {index_path.name} ({timeit:.2f} sec)")
 
-    tilemap_layers = run_multiprocess(__create_tilemap_image, args_create_tilemap,
-                                      is_multiprocess=False, is_generator=not is_concurrent)
+    if not is_images:
+        print(f"Finished generation for tilemap {p_file} ({timeit:.2f} sec)")
+        return save_folder
 
-    if is_concurrent:
-        args_save_tilemap_layers = (
-            (tilemap_layer, save_folder / f"{save_file}-Layer-{i}.png")
-            for i, tilemap_layer in enumerate(tilemap_layers)
-        )
-        run_concurrent_sync(__save_image, args_save_tilemap_layers)
+    if is_streaming:
+        log_list = __gen_tilemap_streaming(tilemaps, meta_data, save_folder, save_file, (size_map_x, size_map_y),
+                                           exclude_layers, func_progress_bar_set_percent, is_pyramid)
+        write_in_file_end(save_folder / "errors.log", log_list)
+        print(f"Finished generation for tilemap {p_file} ({timeit:.2f} sec)")
+        return save_folder
 
-    print(f"Finished generation for tilemap layers {p_file} ({timeit:.2f} sec)")
+    # layers are rendered by worker processes when multiprocessing is enabled, otherwise one by one
+    tilemap_layers = render_layers(tilemaps, meta_data, (size_map_x, size_map_y), log_list)
 
     print(f"Started composing layers for {p_file}")
-    timeit = Timeit()
 
+    # every composite is a new image, so it is saved by image sink while next layer is composited,
+    # at most WRITE_QUEUE_SIZE layers and composites are waiting for write
     im_map = get_transparent_image()
-
-    if is_concurrent:
-        save_composite = []
+    last_composite_path = None
+    copied_composites = []
+    with ImageSink(max_pending=WRITE_QUEUE_SIZE) as sink:
         for i, layer in enumerate(tilemap_layers):
             func_progress_bar_set_percent(i, count_layers - 1)
 
+            sink.save(layer, save_folder / f"{save_file}-Layer-{i}.png")
             if i in exclude_layers:
                 continue
-            im_map.alpha_composite(layer)
-            save_composite.append((im_map.copy(), save_folder / f"{save_file}-{i}.png"))
-
-        run_concurrent_sync(__save_image, save_composite)
-    else:
-        for i, layer in enumerate(tilemap_layers):
-            func_progress_bar_set_percent(i, count_layers - 1)
 
-            __save_image(layer.copy(), save_folder / f"{save_file}-Layer-{i}.png")
-            if i in exclude_layers:
+            composite_path = save_folder / f"{save_file}-{i}.png"
+            if last_composite_path and layer.getbbox() is None:
+                # transparent layer does not change composite, previous file is copied when it is written
+                copied_composites.append((last_composite_path, composite_path))
                 continue
-            im_map.alpha_composite(layer)
-            __save_image(im_map.copy(), save_folder / f"{save_file}-{i}.png")
 
+            with Profiler.span("composite", layer=i):
+                im_map = alpha_composite(im_map, layer)
+            sink.save(im_map, composite_path)
+            last_composite_path = composite_path
+
+    failed_paths = set()
+    for failed_path, error in sink.errors:
+        print(f"! Cannot save tilemap image {failed_path}: {error}")
+        failed_paths.add(failed_path)
+
+    for source, destination in copied_composites:
+        if source in failed_paths:
+            continue
+        shutil.copyfile(source, destination)
+        Profiler.count("images_copied")
+
+    if is_pyramid:
+        __gen_pyramid(im_map, save_folder, save_file)
+
+    write_in_file_end(save_folder / "errors.log", log_list)
     print(f"Finished generation for tilemap {p_file} ({timeit:.2f} sec)")
 
     return save_folder
@@ -247,8 +287,8 @@ if __name__ == "__main__":
             sprite1 = sprite.copy()
             sprite2 = sprite.copy()
 
-            sprite1 = __resize_sprite_for_tile(sprite1, sprite_data, size_tile)
-            sprite2 = __resize_sprite_for_tile(sprite2, sprite_data, size_tile)
+            sprite1 = resize_sprite_for_tile(sprite1, sprite_data, size_tile)
+            sprite2 = resize_sprite_for_tile(sprite2, sprite_data, size_tile)
 
             sprite1 = affine_transform(sprite1, aff1)
             sprite2 = affine_transform(sprite2, aff2)
@@ -271,10 +311,9 @@ if __name__ == "__main__":
             return
         full_path = Path(full_path)
 
-        import cProfile
         print("Started")
-        with cProfile.Profile() as pr:
-            gen_tilemap(full_path, False)
-            pr.print_stats('time')
+        Profiler.start(is_sampling=True)
+        gen_tilemap(full_path, False)
+        Profiler.save()
 
     # __profile()
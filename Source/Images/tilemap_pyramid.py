@@ -0,0 +1,165 @@
+"""
+Deep zoom pyramid (DZI) of tilemap for viewers that cannot open huge images: image is cut into tiles
+at every power-of-two scale. Level 'max' is full image, every lower level is half of previous one (up to 1x1 px).
+Files: <name>.dzi and <name>_files/<level>/<column>_<row>.png
+"""
+import hashlib
+import math
+from pathlib import Path
+from typing import Final
+
+from PIL.Image import Image, new as image_new
+
+from Source.Images.build_manifest import BuildManifest
+from Source.Images.image_sink import ImageSink
+from Source.Utility.timer import Profiler
+
+PYRAMID_FOLDER: Final[str] = "Pyramid"
+PYRAMID_TILE_SIZE: Final[int] = 256
+# group of tiles in build manifest
+_PYRAMID_GROUP: Final[str] = "pyramid"
+
+_DZI_TEMPLATE: Final[str] = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tile_size}" Overlap="0" Format="png">\n'
+    '  <Size Width="{width}" Height="{height}"/>\n'
+    '</Image>\n'
+)
+
+
+def _concat_rows(top: Image | None, bottom: Image) -> Image:
+    if top is None:
+        return bottom
+    image = image_new(mode="RGBA", size=(bottom.size[0], top.size[1] + bottom.size[1]))
+    image.paste(top, (0, 0))
+    image.paste(bottom, (0, top.size[1]))
+    return image
+
+
+def _get_tile_digest(tile: Image) -> str:
+    digest = hashlib.blake2b(repr(tile.size).encode(), digest_size=16)
+    digest.update(tile.tobytes())
+    return digest.hexdigest()
+
+
+class _Level:
+    def __init__(self, level: int, size: tuple[int, int]):
+        self.level = level
+        self.size = size
+        self.rows_added = 0
+        # rows which are not cut into tiles yet and index of their row of tiles
+        self.tile_rows: Image | None = None
+        self.tile_row = 0
+        # last row of odd band, it is downscaled together with first row of next band
+        self.odd_row: Image | None = None
+
+
+class PyramidWriter:
+    """
+    Builds pyramid from horizontal bands of RGBA image (like PngStreamWriter), so whole image is never needed:
+    every level keeps only rows of not finished row of tiles, bands are downscaled to next level by pairs of rows.
+    Tiles of all levels are saved in parallel by ImageSink. Tiles with the same pixels as in previous run
+    are not written again (see BuildManifest in files folder).
+
+    Usage:
+        with PyramidWriter(path, (width, height)) as writer:
+            for band in bands:
+                writer.write(band)
+    """
+
+    def __init__(self, path: Path, size: tuple[int, int], tile_size: int = PYRAMID_TILE_SIZE):
+        self.path = path
+        self.size = size
+        self.tile_size = tile_size
+        self.files_folder = path.with_name(f"{path.stem}_files")
+
+        max_level = math.ceil(math.log2(max(size))) if max(size) > 1 else 0
+        self._levels = [
+            _Level(level, (-(-size[0] // 2 ** (max_level - level)), -(-size[1] // 2 ** (max_level - level))))
+            for level in range(max_level + 1)
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._manifest = BuildManifest(self.files_folder)
+        self._sink = ImageSink()
+        self._is_closed = False
+
+    def get_summary(self) -> str:
+        return f"levels: {len(self._levels)}, tiles {self._manifest.get_summary()}"
+
+    def write(self, band: Image) -> None:
+        """
+        Appends rows of RGBA band, its width must be the same as width of image
+        """
+        if band.mode != "RGBA" or band.size[0] != self.size[0]:
+            raise ValueError(f"Expected RGBA band with width {self.size[0]}, got {band.mode} {band.size}")
+        self._add_rows(self._levels[-1], band)
+
+    def _add_rows(self, level: _Level, band: Image) -> None:
+        if level.rows_added + band.size[1] > level.size[1]:
+            raise ValueError(f"Too many rows for level {level.level} of {self.path.name}")
+        level.rows_added += band.size[1]
+        is_last = level.rows_added == level.size[1]
+        width = level.size[0]
+
+        rows = _concat_rows(level.tile_rows, band)
+        top = 0
+        while rows.size[1] - top >= self.tile_size or (is_last and top < rows.size[1]):
+            height = min(self.tile_size, rows.size[1] - top)
+            self._save_tile_row(level, rows, top, height)
+            top += height
+        level.tile_rows = rows.crop((0, top, width, rows.size[1])) if top < rows.size[1] else None
+
+        if level.level == 0:
+            return
+        rows = _concat_rows(level.odd_row, band)
+        count_rows = rows.size[1] if is_last else rows.size[1] - rows.size[1] % 2
+        level.odd_row = rows.crop((0, count_rows, width, rows.size[1])) if count_rows < rows.size[1] else None
+        if count_rows:
+            if count_rows < rows.size[1]:
+                rows = rows.crop((0, 0, width, count_rows))
+            with Profiler.span("pyramid_reduce", level=level.level):
+                reduced = rows.reduce(2)
+            self._add_rows(self._levels[level.level - 1], reduced)
+
+    def _save_tile_row(self, level: _Level, rows: Image, top: int, height: int) -> None:
+        for column, left in enumerate(range(0, level.size[0], self.tile_size)):
+            tile = rows.crop((left, top, min(left + self.tile_size, level.size[0]), top + height))
+            path = self.files_folder / str(level.level) / f"{column}_{level.tile_row}.png"
+            if self._manifest.need_rebuild(path, _get_tile_digest(tile), _PYRAMID_GROUP):
+                self._sink.save(tile, path)
+            else:
+                Profiler.count("pyramid_tiles_skipped")
+        level.tile_row += 1
+
+    def close(self) -> None:
+        if self._is_closed:
+            return
+        if self._levels[-1].rows_added != self.size[1]:
+            self.abort()
+            raise ValueError(f"Written {self._levels[-1].rows_added} rows of {self.size[1]} for {self.path.name}")
+
+        self._is_closed = True
+        for path, error in self._sink.close():
+            print(f"! Cannot save pyramid tile {path}: {error}")
+            self._manifest.discard(path)
+        self._manifest.remove_stale({_PYRAMID_GROUP})
+        self._manifest.save()
+        self.path.write_text(_DZI_TEMPLATE.format(tile_size=self.tile_size, width=self.size[0], height=self.size[1]),
+                             encoding="UTF-8")
+
+    def abort(self) -> None:
+        """
+        Stops writing, already written tiles are kept but will be written again by next run
+        """
+        self._is_closed = True
+        self._sink.close()
+        self._manifest.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,317 @@
+"""
+Rendering of tilemap layers by horizontal bands of tile rows. Bands do not depend on each other, so with
+multiprocessing they are rendered by worker processes: unique tiles are sent once through shared memory
+and every job gets only compact columns of its own tiles.
+"""
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Iterator
+
+from PIL.Image import Image, new as image_new
+
+from Source.Data.meta_data import MetaData
+from Source.Images.png_stream import EncodedBand, encode_png_band
+from Source.Images.tilemap_data import Tilemap
+from Source.Utility.constants import PROGRESS_BAR_FUNC_TYPE
+from Source.Utility.image_functions import affine_transform, crop_image_rect_left_bot
+from Source.Utility.multirun import BoundedTaskQueue, MultiprocessHandler, is_multiprocess_enabled, run_multiprocess
+from Source.Utility.sprite_data import SpriteData, SpriteRect
+from Source.Utility.timer import Profiler
+
+# tile sheet attached by this (worker) process: shared memory name and tiles
+_attached_sheet: tuple[str | None, list[Image]] = (None, [])
+
+
+def resize_sprite_for_tile(image: Image, sprite_data: SpriteData, size_tile: tuple[int, int]) -> Image:
+    shift_x = int(sprite_data.rect.width * sprite_data.pivot.x)
+    shift_y = int(sprite_data.rect.height * sprite_data.pivot.y)
+
+    rect = SpriteRect(shift_x, shift_y, size_tile[0], size_tile[1])
+    return crop_image_rect_left_bot(image, rect)
+
+
+def create_tile_images(tilemap: Tilemap, data_by_guid: dict[str: MetaData]) -> dict[tuple[int, int], Image | None]:
+    """
+    Crops and transforms sprite once for every unique pair of tile and matrix indexes used by tilemap.
+    Tiles are composited on transparent image, so pasting them into empty cell gives the same pixels as compositing
+    """
+    size_tile = Tilemap.get_size_tile()
+
+    tile_images = {}
+    for tile_index, matrix_index in set(zip(tilemap.tile_indexes, tilemap.matrix_indexes)):
+        data: MetaData = data_by_guid.get(tilemap.sprite_guids[tile_index])
+        sprite_data = data.data_id.get(tilemap.sprite_ids[tile_index]) if data else None
+        sprite = sprite_data and sprite_data.sprite
+
+        if not sprite:
+            tile_images[tile_index, matrix_index] = None
+            continue
+
+        sprite = resize_sprite_for_tile(sprite, sprite_data, size_tile)
+
+        affine = tilemap.get_matrix(matrix_index)
+        if affine[0] != 1 or affine[3] != 1:
+            sprite = affine_transform(sprite, affine)
+
+        tile_image = image_new(mode="RGBA", size=sprite.size)
+        tile_image.alpha_composite(sprite)
+        tile_images[tile_index, matrix_index] = tile_image
+
+    return tile_images
+
+
+class TileSheet:
+    """
+    Unique tiles of every layer, referenced by slot index. When shared, tiles are packed into shared memory
+    which worker attaches once, only name of memory is pickled with jobs. Must be released by creator.
+    """
+
+    def __init__(self, tiles: list[Image], size_tile: tuple[int, int], is_shared: bool = False):
+        self.size_tile = size_tile
+        self.count = len(tiles)
+        self.name: str | None = None
+        self._tiles: list[Image] | None = tiles
+        self._shm: SharedMemory | None = None
+
+        if is_shared and tiles:
+            tile_bytes = size_tile[0] * size_tile[1] * 4
+            self._shm = SharedMemory(create=True, size=tile_bytes * len(tiles))
+            for i, tile in enumerate(tiles):
+                self._shm.buf[i * tile_bytes:(i + 1) * tile_bytes] = tile.tobytes()
+            self.name = self._shm.name
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        if self.name is not None:
+            state["_tiles"] = None
+        return state
+
+    def get_tiles(self) -> list[Image]:
+        global _attached_sheet
+        if self._tiles is None:
+            name, tiles = _attached_sheet
+            if name != self.name:
+                tile_bytes = self.size_tile[0] * self.size_tile[1] * 4
+                shm = SharedMemory(self.name)
+                try:
+                    tiles = [image_new("RGBA", self.size_tile) for _ in range(self.count)]
+                    for i, tile in enumerate(tiles):
+                        tile.frombytes(bytes(shm.buf[i * tile_bytes:(i + 1) * tile_bytes]))
+                finally:
+                    shm.close()
+                _attached_sheet = (self.name, tiles)
+            self._tiles = tiles
+        return self._tiles
+
+    def release(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+@dataclass
+class LayerTiles:
+    """
+    Tiles of one layer in band: x and row of cell, slot of tile in TileSheet. Tiles of the same cell keep their order
+    """
+    layer: int
+    xs: array
+    rows: array
+    slots: array
+
+
+@dataclass
+class BandJob:
+    band: int
+    top_row: int
+    size: tuple[int, int]
+    layers: list[LayerTiles]
+
+
+def prepare_jobs(tilemaps: list[Tilemap], data_by_guid: dict[str: MetaData], size_map: tuple[int, int],
+                 band_rows: int, is_shared: bool = False) -> tuple[TileSheet, list[BandJob], list[str]]:
+    """
+    Creates tiles of every layer and splits tiles into bands of band_rows rows. Tiles below map are dropped.
+    Returns sheet of tiles (must be released), jobs of bands and lines of errors
+    """
+    size_tile_x, size_tile_y = size_tile = Tilemap.get_size_tile()
+    band_rows = max(1, band_rows)
+    count_bands = -(-size_map[1] // band_rows)
+    width = size_map[0] * size_tile_x
+    jobs = [
+        BandJob(band, band * band_rows, (width, (min(band_rows * (band + 1), size_map[1]) - band * band_rows)
+                                         * size_tile_y), [])
+        for band in range(count_bands)
+    ]
+
+    tiles = []
+    log_list = []
+    for layer, tilemap in enumerate(tilemaps):
+        tile_images = create_tile_images(tilemap, data_by_guid)
+        Profiler.count("unique_tiles", len(tile_images))
+
+        slot_by_key = {}
+        for key, tile_image in tile_images.items():
+            slot_by_key[key] = len(tiles) if tile_image else -1
+            if tile_image:
+                tiles.append(tile_image)
+
+        slots = array("i", map(slot_by_key.__getitem__, zip(tilemap.tile_indexes, tilemap.matrix_indexes)))
+        rows = array("i", map(abs, tilemap.ys))
+
+        missing = [i for i, slot in enumerate(slots) if slot < 0]
+        for i in missing:
+            tile_index = tilemap.tile_indexes[i]
+            tile_inner_id, texture_guid = tilemap.sprite_ids[tile_index], tilemap.sprite_guids[tile_index]
+            log_list.append(f"Sprite error: {texture_guid=} {tile_inner_id=}\n")
+        missing_set = set(missing)
+
+        # stable sort keeps order of tiles in the same cell
+        order = sorted((i for i in range(len(tilemap)) if i not in missing_set) if missing else range(len(tilemap)),
+                       key=rows.__getitem__)
+        sorted_xs = array("i", map(tilemap.xs.__getitem__, order))
+        sorted_rows = array("i", map(rows.__getitem__, order))
+        sorted_slots = array("i", map(slots.__getitem__, order))
+
+        for job in jobs:
+            start = bisect_left(sorted_rows, job.top_row)
+            end = bisect_left(sorted_rows, job.top_row + band_rows)
+            job.layers.append(LayerTiles(layer, sorted_xs[start:end], sorted_rows[start:end], sorted_slots[start:end]))
+
+    return TileSheet(tiles, size_tile, is_shared), jobs, log_list
+
+
+def render_band(sheet: TileSheet, job: BandJob) -> list[Image]:
+    """
+    Returns images of band for every layer of job
+    """
+    size_tile_x, size_tile_y = sheet.size_tile
+    tiles = sheet.get_tiles()
+
+    images = []
+    for layer in job.layers:
+        image = image_new(mode="RGBA", size=job.size)
+        with Profiler.span("render_band", layer=layer.layer, band=job.band):
+            # tiles have size of cell, so only tiles in the same cell overlap and must be composited in order
+            filled_cells = set()
+            for x, row, slot in zip(layer.xs, layer.rows, layer.slots):
+                cell = (x * size_tile_x, (row - job.top_row) * size_tile_y)
+                if cell in filled_cells:
+                    image.alpha_composite(tiles[slot], cell)
+                else:
+                    filled_cells.add(cell)
+                    image.paste(tiles[slot], cell)
+        Profiler.count("tiles_drawn", len(layer.xs))
+        images.append(image)
+    return images
+
+
+def _render_band_to_shared(sheet: TileSheet, job: BandJob, shm_name: str) -> None:
+    """
+    Writes rows of band of the only layer of job into shared memory of full layer image
+    """
+    offset = job.top_row * sheet.size_tile[1] * job.size[0] * 4
+    image, = render_band(sheet, job)
+    shm = SharedMemory(shm_name)
+    try:
+        data = image.tobytes()
+        shm.buf[offset:offset + len(data)] = data
+    finally:
+        shm.close()
+
+
+def _render_band_encoded(sheet: TileSheet, job: BandJob, exclude_layers: set[int],
+                         is_composite_band: bool = False) -> tuple[list[EncodedBand], Image | None]:
+    """
+    Returns encoded band of every layer followed by encoded band of composite after every not excluded layer,
+    and band of last composite when is_composite_band
+    """
+    images = render_band(sheet, job)
+    encoded = [encode_png_band(image) for image in images]
+
+    im_band = image_new(mode="RGBA", size=job.size)
+    for layer, image in zip(job.layers, images):
+        if layer.layer in exclude_layers:
+            continue
+        with Profiler.span("composite", layer=layer.layer, band=job.band):
+            im_band.alpha_composite(image)
+        encoded.append(encode_png_band(im_band))
+    return encoded, im_band if is_composite_band else None
+
+
+def render_layers(tilemaps: list[Tilemap], data_by_guid: dict[str: MetaData], size_map: tuple[int, int],
+                  log_list: list[str]) -> Iterator[Image]:
+    """
+    Yields full image of every layer. With multiprocessing bands of layer are rendered by workers into shared memory
+    of one layer, which is reused by next layer after image is yielded, otherwise layers are rendered one by one.
+    So only one layer is kept by renderer at a time
+    """
+    is_multiprocess = is_multiprocess_enabled()
+    band_rows = size_map[1]
+    if is_multiprocess:
+        band_rows = max(1, -(-size_map[1] // (MultiprocessHandler.get_processes() * 4)))
+
+    sheet, jobs, errors = prepare_jobs(tilemaps, data_by_guid, size_map, band_rows, is_multiprocess)
+    log_list.extend(errors)
+    size_image = (size_map[0] * sheet.size_tile[0], size_map[1] * sheet.size_tile[1])
+
+    try:
+        if not is_multiprocess:
+            for job in jobs:
+                for layer in job.layers:
+                    yield render_band(sheet, replace(job, layers=[layer]))[0]
+            return
+
+        image_bytes = size_image[0] * size_image[1] * 4
+        shm = SharedMemory(create=True, size=max(image_bytes, 1))
+        try:
+            for i in range(len(tilemaps)):
+                # every band writes all its rows, so buffer does not need clearing between layers
+                run_multiprocess(_render_band_to_shared,
+                                 [(sheet, replace(job, layers=[job.layers[i]]), shm.name) for job in jobs], chunksize=1)
+
+                image = image_new(mode="RGBA", size=size_image)
+                image.frombytes(shm.buf[:image_bytes])
+                yield image
+        finally:
+            shm.close()
+            shm.unlink()
+    finally:
+        sheet.release()
+
+
+def render_streaming(tilemaps: list[Tilemap], data_by_guid: dict[str: MetaData], size_map: tuple[int, int],
+                     band_rows: int, exclude_layers: set[int], layer_writers: list, composite_writers: list,
+                     func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0,
+                     func_composite_band: Callable[[Image], None] | None = None) -> list[str]:
+    """
+    Renders, composites and encodes bands of layers (by workers with multiprocessing), encoded bands are appended
+    to PngStreamWriter of every layer and of composite after every not excluded layer in order of bands.
+    func_composite_band is called with every band of last composite in order of bands (ex: PyramidWriter.write).
+    Returns lines of errors
+    """
+    is_multiprocess = is_multiprocess_enabled()
+    sheet, jobs, log_list = prepare_jobs(tilemaps, data_by_guid, size_map, band_rows, is_multiprocess)
+    writers = [*layer_writers, *composite_writers]
+
+    def on_done(result: tuple[list[EncodedBand], Image | None]) -> None:
+        encoded_bands, composite_band = result
+        for writer, encoded in zip(writers, encoded_bands):
+            writer.write_encoded(encoded)
+        if func_composite_band is not None:
+            func_composite_band(composite_band)
+        func_progress_bar_set_percent(queue.done_count, len(jobs))
+
+    try:
+        queue = BoundedTaskQueue(on_done)
+        for job in jobs:
+            queue.submit(_render_band_encoded, sheet, job, exclude_layers, func_composite_band is not None)
+        queue.join()
+    finally:
+        sheet.release()
+
+    return log_list
@@ -12,6 +12,8 @@ from typing import Union, Callable
 
 from PIL.Image import Image
 
+from Source.Utility.image_ops import threshold_mask
+
 
 class TransparentAnimatedGifConverter(object):
     _PALETTE_SLOTSET = set(range(256))
@@ -21,18 +23,15 @@ class TransparentAnimatedGifConverter(object):
         self._alpha_threshold = alpha_threshold
 
     def _process_pixels(self):
-        """Set the transparent pixels to the color 0."""
-        self._transparent_pixels = set(
-            idx for idx, alpha in enumerate(
-                self._img_rgba.getchannel(channel='A').getdata())
-            if alpha <= self._alpha_threshold)
+        """Masks of the pixels, transparent ones are set to the color 0."""
+        self._opaque_mask = threshold_mask(self._img_rgba, "A", self._alpha_threshold)
+        self._transparent_mask = self._opaque_mask.point(lambda x: 255 - x)
 
     def _set_parsed_palette(self):
         """Parse the RGB palette color `tuple`s from the palette."""
         palette = self._img_p.getpalette()
-        self._img_p_used_palette_idxs = set(
-            idx for pal_idx, idx in enumerate(self._img_p_data)
-            if pal_idx not in self._transparent_pixels)
+        histogram = self._img_p.histogram(mask=self._opaque_mask)
+        self._img_p_used_palette_idxs = set(idx for idx, count in enumerate(histogram) if count)
         self._img_p_parsedpalette = dict(
             (idx, tuple(palette[idx * 3:idx * 3 + 3]))
             for idx in self._img_p_used_palette_idxs)
@@ -86,9 +85,8 @@ class TransparentAnimatedGifConverter(object):
                 bytes(self._palette_replaces['idx_from']),
                 bytes(self._palette_replaces['idx_to']))
             self._img_p_data = self._img_p_data.translate(trans_table)
-        for idx_pixel in self._transparent_pixels:
-            self._img_p_data[idx_pixel] = 0
         self._img_p.frombytes(data=bytes(self._img_p_data))
+        self._img_p.paste(0, mask=self._transparent_mask)
 
     def _adjust_palette(self):
         """Modify the palette in the new `Image`."""
@@ -201,3 +199,28 @@ ANIM_SAVE_TYPES: list[str] = [
     "webp",
     "apng"
 ]
+
+
+if __name__ == "__main__":
+    def __benchmark_gif(sizes=(32, 64, 128, 256, 512, 1024), frames=8):
+        import os
+        from io import BytesIO
+
+        from PIL import Image as PILImage
+
+        from Source.Utility.timer import Timeit
+
+        for size in sizes:
+            images = []
+            for _ in range(frames):
+                image = PILImage.frombytes("RGBA", (size, size), os.urandom(size * size * 4))
+                # half of pixels are transparent
+                image.putalpha(image.getchannel("A").point(lambda a: 0 if a < 128 else 255))
+                images.append(image)
+
+            timeit = Timeit()
+            save_transparent_gif(images, 100, BytesIO())
+            print(f"{size}x{size}, {frames} frames: {timeit!r}")
+
+
+    # __benchmark_gif()
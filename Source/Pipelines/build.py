@@ -0,0 +1,388 @@
+"""
+Build orchestrator: runs pipelines as tasks of dependency graph.
+
+Tasks declare dependencies, input paths and parameters. Tasks without inputs only load shared state
+(MetaDataHandler, DataHandler, LangHandler) and always run, so every following task uses already loaded handlers.
+Other tasks are skipped when digest of their inputs, parameters and dependencies did not change since the last
+successful run. Independent tasks are run concurrently in threads.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Final, Iterable
+
+from Source.Config.config import Config, DLCType, Game
+from Source.Data.data import DataHandler, DataType
+from Source.Data.meta_data import MetaDataHandler
+from Source.Pipelines.errors import PipelineError
+from Source.Translations.language import LangHandler, LangType, I2_LANGUAGES
+from Source.Utility.constants import CONFIG_FOLDER, COMPOUND_DATA, COMPOUND_DATA_TYPE, PROGRESS_BAR_FUNC_TYPE, \
+    TEXTURE_2D, RESOURCES, AUDIO_CLIP
+from Source.Utility.timer import Timeit, Profiler
+
+BUILD_STATE_PATH: Final[Path] = CONFIG_FOLDER / "BuildState.json"
+# Increase when digest inputs change, every task will be rebuilt
+BUILD_STATE_VERSION: Final[int] = 1
+
+TaskFunc = Callable[[PROGRESS_BAR_FUNC_TYPE], Path | None]
+
+
+class TaskStatus(Enum):
+    # plan
+    RUN = "run"
+    SKIP = "skip"
+    # result
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    BLOCKED = "blocked"
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass
+class BuildTask:
+    name: str
+    func: TaskFunc
+    deps: tuple[str, ...] = ()
+    # paths (files or folders) which content is used by task, None means task is always run
+    inputs: Callable[[], Iterable[Path]] | None = None
+    # settings of task that change its outputs (json-like)
+    params: Any = None
+    # increase when task produces different outputs for the same inputs
+    version: int = 1
+
+
+@dataclass
+class TaskResult:
+    name: str
+    status: TaskStatus
+    seconds: float = 0
+    output: Path | None = None
+    error: str | None = None
+
+
+def get_path_signature(path: Path) -> list[Any]:
+    """
+    Size and mtime of file or of every file in folder (recursively), content is not read
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return [str(path), None]
+
+    if not path.is_dir():
+        return [str(path), stat.st_size, stat.st_mtime_ns]
+
+    files = []
+    folders = [path]
+    while folders:
+        folder = folders.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(Path(entry.path))
+                    else:
+                        entry_stat = entry.stat()
+                        files.append((os.path.relpath(entry.path, path), entry_stat.st_size, entry_stat.st_mtime_ns))
+        except OSError:
+            continue
+    files.sort()
+    return [str(path), hashlib.blake2b(json.dumps(files).encode("UTF-8"), digest_size=16).hexdigest()]
+
+
+class BuildOrchestrator:
+    """
+    Usage: BuildOrchestrator(tasks).plan() to see what will be run, .run() to run tasks and get results.
+    """
+
+    def __init__(self, tasks: list[BuildTask], state_path: Path = BUILD_STATE_PATH, max_workers: int | None = None,
+                 is_force: bool = False):
+        self.tasks: dict[str, BuildTask] = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"Task '{task.name}' is added twice")
+            self.tasks[task.name] = task
+
+        self.state_path = state_path
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.is_force = is_force
+
+        self._order = self._get_order()
+        self._state: dict[str, dict[str, Any]] = self._load_state()
+        self._state_lock = Lock()
+
+    def _get_order(self) -> list[BuildTask]:
+        """
+        Tasks sorted so every task is after its dependencies, order of adding is kept otherwise
+        """
+        for task in self.tasks.values():
+            for dep in task.deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+
+        order = []
+        visited: set[str] = set()
+        visiting: set[str] = set()
+
+        def visit(task: BuildTask):
+            if task.name in visited:
+                return
+            if task.name in visiting:
+                raise ValueError(f"Dependency cycle at task '{task.name}'")
+            visiting.add(task.name)
+            for dep in task.deps:
+                visit(self.tasks[dep])
+            visiting.discard(task.name)
+            visited.add(task.name)
+            order.append(task)
+
+        for t in self.tasks.values():
+            visit(t)
+        return order
+
+    def _load_state(self) -> dict[str, dict[str, Any]]:
+        try:
+            data = json.loads(self.state_path.read_text(encoding="UTF-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != BUILD_STATE_VERSION:
+            return {}
+        return data.get("tasks", {})
+
+    def _save_state(self) -> None:
+        # tasks finish in parallel: lock is held until file is replaced, so temp file is not shared by threads
+        with self._state_lock:
+            data = {"version": BUILD_STATE_VERSION, "tasks": dict(sorted(self._state.items()))}
+            tmp_path = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                self.state_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="UTF-8")
+                os.replace(tmp_path, self.state_path)
+            except OSError as e:
+                print(f"! Cannot save build state {self.state_path}: {e}")
+                tmp_path.unlink(missing_ok=True)
+
+    def _get_digest(self, task: BuildTask, digests: dict[str, str | None]) -> str | None:
+        if task.inputs is None:
+            return None
+
+        data = {
+            "name": task.name,
+            "version": task.version,
+            "params": task.params,
+            "inputs": [get_path_signature(path) for path in task.inputs()],
+            # tasks without inputs do not change digest of dependents
+            "deps": {dep: digests.get(dep) for dep in task.deps},
+        }
+        return hashlib.blake2b(json.dumps(data, sort_keys=True, default=str).encode("UTF-8"),
+                               digest_size=16).hexdigest()
+
+    def _is_up_to_date(self, task: BuildTask, digest: str | None) -> bool:
+        if self.is_force or digest is None:
+            return False
+
+        with self._state_lock:
+            state = self._state.get(task.name)
+        if not state or state.get("digest") != digest:
+            return False
+
+        output = state.get("output")
+        return output is None or Path(output).exists()
+
+    def plan(self) -> list[tuple[BuildTask, TaskStatus]]:
+        """
+        Statuses of tasks as if they were run now, nothing is generated (handlers may be loaded to read inputs)
+        """
+        digests: dict[str, str | None] = {}
+        plan = []
+        for task in self._order:
+            digest = digests[task.name] = self._get_digest(task, digests)
+            plan.append((task, TaskStatus.SKIP if self._is_up_to_date(task, digest) else TaskStatus.RUN))
+        return plan
+
+    def _run_task(self, task: BuildTask, digests: dict[str, str | None],
+                  func_progress: PROGRESS_BAR_FUNC_TYPE) -> TaskResult:
+        timeit = Timeit()
+        digest = self._get_digest(task, digests)
+        digests[task.name] = digest
+
+        if self._is_up_to_date(task, digest):
+            with self._state_lock:
+                output = self._state[task.name].get("output")
+            return TaskResult(task.name, TaskStatus.SKIPPED, timeit.get_sec(), output and Path(output))
+
+        print(f"[build] Started '{task.name}'")
+        with Profiler.span(f"task:{task.name}"):
+            output = task.func(func_progress)
+
+        if digest is not None:
+            with self._state_lock:
+                self._state[task.name] = {"digest": digest, "output": output and str(output)}
+            self._save_state()
+
+        print(f"[build] Finished '{task.name}' {timeit!r}")
+        return TaskResult(task.name, TaskStatus.DONE, timeit.get_sec(), output)
+
+    def run(self, func_progress_factory: Callable[[str], PROGRESS_BAR_FUNC_TYPE] = lambda name: lambda c, t: 0) \
+            -> list[TaskResult]:
+        """
+        Runs tasks, each one after its dependencies. If task fails, its dependents are not run, other tasks are.
+        """
+        results: dict[str, TaskResult] = {}
+        digests: dict[str, str | None] = {}
+        waiting = list(self._order)
+        running: dict[Future, BuildTask] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="Build") as executor:
+            while waiting or running:
+                for task in list(waiting):
+                    dep_statuses = [results[dep].status for dep in task.deps if dep in results]
+                    if any(status in (TaskStatus.FAILED, TaskStatus.BLOCKED) for status in dep_statuses):
+                        waiting.remove(task)
+                        results[task.name] = TaskResult(task.name, TaskStatus.BLOCKED)
+                    elif len(dep_statuses) == len(task.deps):
+                        waiting.remove(task)
+                        future = executor.submit(self._run_task, task, digests, func_progress_factory(task.name))
+                        running[future] = task
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        results[task.name] = future.result()
+                    except Exception as e:
+                        print(f"!!! [build] Task '{task.name}' failed: {e.__class__.__name__}: {e}")
+                        with self._state_lock:
+                            self._state.pop(task.name, None)
+                        self._save_state()
+                        results[task.name] = TaskResult(task.name, TaskStatus.FAILED, error=f"{e}")
+
+        return [results[task.name] for task in self._order]
+
+    @staticmethod
+    def get_plan_report(plan: list[tuple[BuildTask, TaskStatus]]) -> str:
+        width = max((len(task.name) for task, _ in plan), default=0)
+        return "\n".join(f"{task.name:<{width}}  {str(status):<5}  after: {", ".join(task.deps) or "-"}"
+                         for task, status in plan)
+
+    @staticmethod
+    def get_timing_report(results: list[TaskResult]) -> str:
+        width = max((len(result.name) for result in results), default=0)
+        lines = [f"{result.name:<{width}}  {str(result.status):<7}  {result.seconds:8.2f} sec"
+                 + (f"  {result.error}" if result.error else "")
+                 for result in results]
+        counts = {status: sum(result.status == status for result in results) for status in TaskStatus}
+        lines.append(", ".join(f"{status}: {count}" for status, count in counts.items() if count))
+        return "\n".join(lines)
+
+
+def _get_dlc_types(dlc_type: DLCType | COMPOUND_DATA_TYPE) -> list[DLCType]:
+    return DLCType.get_all_types_by_game(Game.VS) if dlc_type == COMPOUND_DATA else [dlc_type]
+
+
+def _get_assets_folders(dlc_type: DLCType | COMPOUND_DATA_TYPE, folders: Iterable[str]) -> list[Path]:
+    return [Config.get_assets_dir(dlc) / folder for dlc in _get_dlc_types(dlc_type) for folder in folders]
+
+
+def _get_lang_paths() -> list[Path]:
+    path = MetaDataHandler.get_path_by_name_no_meta(I2_LANGUAGES)
+    return [path] if path else []
+
+
+def get_full_rebuild_tasks(dlc_type: DLCType | COMPOUND_DATA_TYPE = COMPOUND_DATA,
+                           data_types: Iterable[DataType] | None = None,
+                           req_gens: dict | None = None,
+                           lang_split_types: Iterable | None = None,
+                           audio_save_types: set | None = None,
+                           tilemaps: Iterable[Path] = ()) -> list[BuildTask]:
+    """
+    Tasks of full rebuild after game update: data, concatenated data, languages, unified images of every
+    data type (default: all supported), audio (if audio_save_types is not None) and tilemaps of given prefabs.
+    """
+    from Source.Images.image_gen_new import ImageGeneratorManager, GenType
+    from Source.Pipelines import data_pipeline, lang_pipeline
+
+    if data_types is None:
+        data_types = sorted(ImageGeneratorManager.get_supported_gen_types(), key=lambda x: x.value)
+    req_gens = req_gens or {GenType.IMAGE: 1}
+    lang_split_types = list(lang_split_types or [lang_pipeline.SplitType.AS_IS])
+
+    def load_meta(progress: PROGRESS_BAR_FUNC_TYPE) -> None:
+        MetaDataHandler.load(Game.VS)
+
+    def load_data(progress: PROGRESS_BAR_FUNC_TYPE) -> None:
+        DataHandler.load()
+
+    def load_lang(progress: PROGRESS_BAR_FUNC_TYPE) -> None:
+        # loads I2Languages and splits it to lang types
+        LangHandler.get_lang_file(LangType.GENERAL)
+
+    tasks = [
+        BuildTask("load_meta", load_meta),
+        BuildTask("load_data", load_data, ("load_meta",)),
+        BuildTask("load_lang", load_lang, ("load_meta",)),
+        BuildTask("data", data_pipeline.copy_data_files, ("load_data",),
+                  inputs=DataHandler.get_source_paths),
+        BuildTask("concat", data_pipeline.concatenate_data_files, ("load_data",),
+                  inputs=DataHandler.get_source_paths),
+        BuildTask("lang_copy", lang_pipeline.copy_i2language, ("load_lang",), inputs=_get_lang_paths),
+        BuildTask("lang_json", lang_pipeline.convert_i2language_to_json, ("load_lang",), inputs=_get_lang_paths),
+    ]
+
+    for split_type in lang_split_types:
+        tasks.append(BuildTask(
+            f"lang_split:{split_type.name.lower()}",
+            lambda progress, _split_type=split_type: lang_pipeline.split_languages(_split_type, None, progress),
+            ("load_lang",), inputs=_get_lang_paths, params=split_type.name))
+
+    textures_inputs = _get_assets_folders(dlc_type, [TEXTURE_2D, RESOURCES])
+    for data_type in data_types:
+        tasks.append(BuildTask(
+            f"images:{data_type.value}",
+            lambda progress, _data_type=data_type: ImageGeneratorManager.run_generator(dlc_type, _data_type,
+                                                                                       req_gens, progress),
+            ("load_data", "load_lang"),
+            inputs=lambda: [*DataHandler.get_source_paths(), *_get_lang_paths(), *textures_inputs],
+            params={"dlc": DLCType.string(dlc_type), "data_type": data_type.value,
+                    "gens": {gen_type.name: value for gen_type, value in req_gens.items()}}))
+
+    if audio_save_types is not None:
+        def gen_audio(progress: PROGRESS_BAR_FUNC_TYPE) -> Path | None:
+            from Source.Utility.defer_constants import DeferConstants
+            if not DeferConstants.is_pydub():
+                raise PipelineError("FFmpeg not found")
+
+            import Source.Audio.audio_unified_gen as audio_gen
+            save_path, error = audio_gen.gen_music_tracks(COMPOUND_DATA, set(audio_save_types), progress)
+            if error:
+                raise PipelineError(error)
+            return save_path and Path(save_path)
+
+        tasks.append(BuildTask(
+            "audio", gen_audio, ("load_data", "load_lang"),
+            inputs=lambda: [*DataHandler.get_source_paths({DataType.MUSIC}),
+                            *_get_assets_folders(COMPOUND_DATA, [AUDIO_CLIP])],
+            params=sorted(str(save_type) for save_type in audio_save_types)))
+
+    for prefab in tilemaps:
+        def gen_tilemap(progress: PROGRESS_BAR_FUNC_TYPE, _prefab=prefab) -> Path | None:
+            from Source.Images.tilemap_gen import gen_tilemap as _gen_tilemap
+            return _gen_tilemap(_prefab, False, progress)
+
+        tasks.append(BuildTask(
+            f"tilemap:{prefab.stem}", gen_tilemap, ("load_meta",),
+            inputs=lambda _prefab=prefab: [_prefab, *_get_assets_folders(COMPOUND_DATA, [TEXTURE_2D, RESOURCES])],
+            params=str(prefab)))
+
+    return tasks
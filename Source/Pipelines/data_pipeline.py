@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from Source.Config.config import DLCType, Config, Game
+from Source.Data.data import DataHandler, DataType
+from Source.Pipelines.errors import PipelineError
+from Source.Utility.constants import DATA_FOLDER, GENERATED, COMPOUND_DATA, PROGRESS_BAR_FUNC_TYPE
+from Source.Utility.timer import Timeit
+
+
+def copy_data_files(func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path:
+    """
+    Copies data files of every VS DLC from assets to 'Data/<DLC>'
+    """
+    if not Config.get_assets_dir().exists():
+        raise PipelineError("VS assets folder must be entered.")
+
+    _time = Timeit()
+    print("Copying data files.")
+
+    total_amount = DataHandler.get_total_amount()
+    i = 0
+
+    dlc_types = DLCType.get_all_types_by_game(Game.VS)
+    for dlc_type in dlc_types:
+        save_path = DATA_FOLDER / dlc_type.value.full_name
+        save_path.mkdir(parents=True, exist_ok=True)
+
+        data_files = DataHandler.get_dict_by_dlc_type(dlc_type)
+        for data_type, data_file in data_files.items():
+            with open((save_path / data_type.value).with_suffix(".json"), mode="w", encoding="UTF-8") as f:
+                f.write(data_file.raw_text_cleaned_commas())
+
+            func_progress_bar_set_percent(i := i + 1, total_amount)
+
+    print(f"Finished copying data files. {_time!r}")
+    return DATA_FOLDER
+
+
+def concatenate_data_files(func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path:
+    """
+    Merges data of every DLC into 'Data/Generated'
+    """
+    _time = Timeit()
+    print("Concatenating data files.")
+    data_types = DataType.get_all_types()
+    i = 0
+
+    save_path = DATA_FOLDER / GENERATED
+    save_path.mkdir(parents=True, exist_ok=True)
+
+    for data_type in data_types:
+        func_progress_bar_set_percent(i := i + 1, len(data_types))
+
+        data_file = DataHandler.get_data(COMPOUND_DATA, data_type)
+        with open((save_path / data_type.value).with_suffix(".json"), mode="w", encoding="UTF-8") as f:
+            f.write(data_file.raw_text())
+
+    print(f"Finished concatenating data files. {_time!r}")
+    return save_path
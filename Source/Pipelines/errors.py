@@ -0,0 +1,5 @@
+class PipelineError(Exception):
+    """
+    Pipeline cannot be run with given input (missing assets, meta data, etc.), message is shown to user as is
+    """
+    pass
@@ -0,0 +1,134 @@
+import itertools
+from pathlib import Path
+
+from PIL.Image import open as image_open
+
+import Source.Images.transparent_save as tr_save
+from Source.Config.config import Game
+from Source.Data.meta_data import MetaDataHandler
+from Source.Images.anim_export import AnimationExporter
+from Source.Pipelines.errors import PipelineError
+from Source.Utility.constants import ROOT_FOLDER, DEFAULT_ANIMATION_FRAME_RATE, PROGRESS_BAR_FUNC_TYPE
+from Source.Utility.image_functions import resize_image, apply_tint
+
+
+def generate_images_by_meta(image_path: Path, scale_factor: int = 1,
+                            func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path:
+    """
+    Saves every sprite of texture to 'Images/Generated/_By meta Image'
+    """
+    file = image_path.name
+
+    print(f"Generating {file} by meta")
+
+    MetaDataHandler.loaded_game = Game.SPECIAL
+
+    full_path_meta = image_path.with_name(file + ".meta")
+    if not MetaDataHandler.has_meta_by_path(full_path_meta):
+        if not full_path_meta.exists():
+            raise PipelineError(f"MetaData not found for {file}")
+        MetaDataHandler.add_meta_data_by_path(full_path_meta)
+
+    data = MetaDataHandler.get_meta_by_name(file)
+
+    data.init_sprites()
+
+    total_len = len(data.data_name)
+
+    folder_to_save = ROOT_FOLDER.joinpath("Images", "Generated", "_By meta Image")
+    if total_len > 1:
+        folder_to_save = folder_to_save.joinpath(image_path.stem)
+    else:
+        folder_to_save = folder_to_save.joinpath("_SingeSprites")
+
+    folder_to_save.mkdir(parents=True, exist_ok=True)
+
+    print(f"Files out of {total_len}:")
+    func_progress_bar_set_percent(0, total_len)
+    for i, (_, sprite_data) in enumerate(data.data_name.items()):
+        sprite = resize_image(sprite_data.sprite, scale_factor)
+        sprite.save(folder_to_save.joinpath(str(sprite_data.real_name)).with_suffix(".png"))
+
+        print(f"\r{i + 1}", end="")
+        func_progress_bar_set_percent(i + 1, total_len)
+
+    print()
+    return folder_to_save.absolute()
+
+
+def generate_animations_by_meta(image_path: Path, selected_anim_types: list[bool], scale_factor: int = 1,
+                                frame_rate: int = DEFAULT_ANIMATION_FRAME_RATE,
+                                func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path | None:
+    """
+    Saves every animation of texture to 'Images/Generated/_By meta Anim' in selected formats of tr_save.ANIM_SAVE_TYPES.
+    Returns None if texture has no animations.
+    """
+    file = image_path.name
+
+    print(f"Generating {file} by meta")
+
+    if not any(selected_anim_types):
+        raise PipelineError("Not selected any animation extension")
+
+    data = MetaDataHandler.get_meta_by_name(file)
+
+    if not data:
+        raise PipelineError(f"MetaData not found for {file}")
+
+    animations = data.get_animations()
+
+    total_len = len(animations)
+
+    if not total_len:
+        print(f"Not found animations for {file}")
+        return None
+
+    selected_types = list(itertools.compress(tr_save.ANIM_SAVE_TYPES, selected_anim_types))
+    print(f"Selected {scale_factor=}, {frame_rate=}, selected extensions={selected_types}")
+
+    folder_to_save = ROOT_FOLDER.joinpath("Images", "Generated", "_By meta Anim")
+    if total_len > 1:
+        folder_to_save = folder_to_save.joinpath(image_path.stem)
+    else:
+        folder_to_save = folder_to_save.joinpath("_SingeAnimations")
+
+    folder_to_save.mkdir(parents=True, exist_ok=True)
+
+    duration = 1000 // frame_rate
+
+    exporter = AnimationExporter(selected_anim_types, func_progress_bar_set_percent)
+    exporter.expected_total = total_len * exporter.get_formats_count()
+
+    print(f"Animations out of {total_len}:")
+    func_progress_bar_set_percent(0, exporter.expected_total)
+
+    for i, anim in enumerate(animations):
+        exporter.add(anim, duration, folder_to_save, scale_factor=scale_factor)
+        print(f"\r{i + 1}", end="")
+
+    exporter.join()
+
+    print()
+    return folder_to_save.absolute()
+
+
+def create_inverse_tilemap(image_path: Path, tint_dec_int: int) -> Path:
+    """
+    Saves tilemap tinted by color (0xRRGGBB) and its 180 degree rotation to 'Inverse' folder next to image
+    """
+    tint = (
+        (tint_dec_int >> 16) & 0xff,
+        (tint_dec_int >> 8) & 0xff,
+        tint_dec_int & 0xff
+    )
+
+    save_path = image_path.parent / "Inverse"
+
+    image = image_open(image_path)
+
+    save_path.mkdir(exist_ok=True, parents=True)
+    img = apply_tint(image, tint)
+    img.save(save_path / image_path.name)
+    img.rotate(180).save(save_path / image_path.with_stem(image_path.stem + "_inv").name)
+
+    return save_path
@@ -0,0 +1,98 @@
+import json
+from enum import Enum
+from pathlib import Path
+
+import Source.Translations.language as lang_module
+from Source.Translations.language import LangHandler, I2_LANGUAGES, LangType, Lang
+from Source.Utility.constants import TRANSLATIONS_FOLDER, GENERATED, SPLIT, PROGRESS_BAR_FUNC_TYPE
+from Source.Utility.timer import Timeit
+
+
+class SplitType(Enum):
+    AS_IS = "Split as is"
+    LIST_TO_DICT = "Change lang list to dict"
+    INVERSE = "Inverse hierarchy so lang is top key"
+
+    @classmethod
+    def get(cls) -> list["SplitType"]:
+        return [*cls]
+
+    def get_folder_name(self) -> str:
+        match self:
+            case SplitType.AS_IS:
+                return "LangList"
+            case SplitType.LIST_TO_DICT:
+                return "LangDictionary"
+            case SplitType.INVERSE:
+                return "InverseLangDictionary"
+
+    def __str__(self):
+        return self.value
+
+
+def copy_i2language(func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path:
+    timeit = Timeit()
+    func_progress_bar_set_percent(0, 1)
+    print("Copying I2Languages.assets")
+
+    i2l = LangHandler.get_i2language().raw_text()
+    with open((TRANSLATIONS_FOLDER / I2_LANGUAGES).with_suffix(".yaml"), "w", encoding="utf-8") as f:
+        f.write(i2l)
+
+    print(f"Copying I2Languages finished {timeit!r}")
+    func_progress_bar_set_percent(1, 1)
+    return TRANSLATIONS_FOLDER
+
+
+def convert_i2language_to_json(func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path:
+    timeit = Timeit()
+    func_progress_bar_set_percent(0, 1)
+    save_folder = TRANSLATIONS_FOLDER / GENERATED
+    print("Converting I2Languages to json")
+
+    i2l = LangHandler.get_i2language().json_text()
+    with open((save_folder / I2_LANGUAGES).with_suffix(".json"), "w", encoding="utf-8") as f:
+        f.write(i2l)
+
+    print(f"Converting I2Languages finished {timeit!r}")
+    func_progress_bar_set_percent(1, 1)
+    return save_folder
+
+
+def split_languages(split_type: SplitType, selected_langs: list[Lang] | None = None,
+                    func_progress_bar_set_percent: PROGRESS_BAR_FUNC_TYPE = lambda c, t: 0) -> Path:
+    """
+    Splits I2Languages to separate files by LangType.
+    selected_langs are used only by SplitType.INVERSE, default: all languages
+    """
+    match split_type:
+        case SplitType.AS_IS:
+            def split_func(l_t: LangType) -> str:
+                return LangHandler.get_lang_file(l_t).json_text()
+        case SplitType.LIST_TO_DICT:
+            def split_func(l_t: LangType) -> str:
+                return json.dumps(lang_module.gen_changed_list_to_dict(l_t), ensure_ascii=False, indent=2)
+        case _:
+            selected_langs = selected_langs or LangHandler.get_lang_list()
+
+            def split_func(l_t: LangType) -> str:
+                return json.dumps({lang.value: LangHandler.get_lang_file(l_t).get_lang(lang) for lang in selected_langs},
+                                  ensure_ascii=False, indent=2)
+
+    _time = Timeit()
+    print(f"Splitting I2Languages to separate categories. ({split_type})")
+    lang_types = LangType.get_all_types()
+    i = 0
+
+    save_path = TRANSLATIONS_FOLDER / GENERATED / SPLIT / split_type.get_folder_name()
+    save_path.mkdir(parents=True, exist_ok=True)
+    for lang_type in lang_types:
+        lang_file = split_func(lang_type)
+        if lang_file:
+            with open((save_path / lang_type.value).with_suffix(".json"), mode="w", encoding="UTF-8") as f:
+                f.write(lang_file)
+
+        func_progress_bar_set_percent(i := i + 1, len(lang_types))
+
+    print(f"Finished splitting I2Languages to separate categories. {_time!r}")
+    return save_path
@@ -0,0 +1,185 @@
+import hashlib
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from threading import Lock
+
+from PIL import Image as PILImage
+from PIL.Image import Image, open as image_open
+
+from Source.Utility.image_functions import crop_image_rect_left_bot
+from Source.Utility.sprite_data import SpriteRect
+from Source.Utility.timer import Profiler
+
+# Cropped sprites of one atlas are kept until their total size exceeds this limit
+SPRITE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Modes which PIL can reference from buffer without copying
+_SHARED_MODES = {"L", "RGBA", "RGBX", "CMYK"}
+
+
+class Atlas:
+    """
+    Texture atlas that is decoded only once and on first use. Pixels are kept as read-only buffer.
+    Sprites are cropped on demand and kept in LRU cache bounded by SPRITE_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, path: Path | None = None, image: Image | None = None,
+                 cache_max_bytes: int = SPRITE_CACHE_MAX_BYTES):
+        assert path or image, "Atlas requires path or image"
+        self.path = path
+        self.cache_max_bytes = cache_max_bytes
+
+        self._size: tuple[int, int] | None = None
+        self._image: Image | None = None
+        self._buffer: bytes | None = None
+        self._mode: str | None = None
+        self._content_hash: str | None = None
+
+        self._lock = Lock()
+        self._cache: OrderedDict[tuple[float, float, float, float], Image] = OrderedDict()
+        self._cache_bytes = 0
+
+        if image is not None:
+            self._set_image(image)
+
+    def _set_image(self, image: Image) -> None:
+        image.load()
+        self._size = image.size
+        self._mode = image.mode
+
+        if image.mode in _SHARED_MODES:
+            self._buffer = image.tobytes()
+            self._image = PILImage.frombuffer(image.mode, image.size, self._buffer, "raw", image.mode, 0, 1)
+        else:
+            self._image = image
+
+    @property
+    def size(self) -> tuple[int, int]:
+        if self._size is None:
+            # only header is read
+            with image_open(self.path) as image:
+                self._size = image.size
+        return self._size
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def image(self) -> Image:
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    Profiler.count("bytes_read", self.path.stat().st_size)
+                    with Profiler.span("decode", file=self.path.name), image_open(self.path) as image:
+                        self._set_image(image)
+        return self._image
+
+    def is_decoded(self) -> bool:
+        return self._image is not None
+
+    def get_content_hash(self) -> str:
+        """
+        Hash of texture file (or of pixels, when atlas was created from image), computed once
+        """
+        if self._content_hash is None:
+            if self.path is not None:
+                data = self.path.read_bytes()
+            else:
+                data = self._buffer if self._buffer is not None else self.image.tobytes()
+            self._content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return self._content_hash
+
+    def get_shared_size(self) -> int | None:
+        """
+        Size of decoded pixels in bytes, if atlas can be transferred through shared memory, None otherwise
+        """
+        if self._mode is None:
+            # only header is read
+            with image_open(self.path) as image:
+                self._size = image.size
+                self._mode = image.mode
+
+        if self._mode not in _SHARED_MODES:
+            return None
+        return self._size[0] * self._size[1] * PILImage.getmodebands(self._mode)
+
+    def decode_to_shared(self, shm_name: str) -> bool:
+        """
+        Decodes texture into shared memory created by 'get_shared_size' caller, atlas itself stays not decoded.
+        Returns False if decoded image does not match header.
+        """
+        shm = SharedMemory(shm_name)
+        try:
+            with image_open(self.path) as image:
+                image.load()
+                if image.mode != self._mode or image.size != self._size:
+                    return False
+                data = image.tobytes()
+                shm.buf[:len(data)] = data
+                return True
+        finally:
+            shm.close()
+
+    def load_from_shared(self, shm: SharedMemory) -> None:
+        """
+        Copies pixels decoded by 'decode_to_shared', shared memory can be released after this call
+        """
+        self._buffer = bytes(shm.buf[:self.get_shared_size()])
+        self._image = PILImage.frombuffer(self._mode, self._size, self._buffer, "raw", self._mode, 0, 1)
+
+    def crop(self, rect: SpriteRect) -> Image:
+        key = (rect.x, rect.y, rect.width, rect.height)
+        with self._lock:
+            if (sprite := self._cache.get(key)) is not None:
+                self._cache.move_to_end(key)
+                Profiler.count("sprite_cache_hits")
+                return sprite
+
+        image = self.image
+        with Profiler.span("crop"):
+            sprite = crop_image_rect_left_bot(image, rect)
+        Profiler.count("sprites_cropped")
+        sprite_bytes = sprite.width * sprite.height * len(sprite.getbands())
+
+        with self._lock:
+            if (cached_sprite := self._cache.get(key)) is not None:
+                # cropped by another thread
+                return cached_sprite
+            self._cache[key] = sprite
+            self._cache_bytes += sprite_bytes
+            while self._cache_bytes > self.cache_max_bytes and len(self._cache) > 1:
+                _, old_sprite = self._cache.popitem(last=False)
+                self._cache_bytes -= old_sprite.width * old_sprite.height * len(old_sprite.getbands())
+
+        return sprite
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_cache"] = OrderedDict()
+        state["_cache_bytes"] = 0
+        if self._buffer is not None:
+            # image is restored from buffer
+            state["_image"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+        if self._buffer is not None:
+            mode = self._mode
+            self._image = PILImage.frombuffer(mode, self._size, self._buffer, "raw", mode, 0, 1)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.path and self.path.name} {self._size} decoded={self.is_decoded()}>"
@@ -4,6 +4,7 @@ from typing import Iterable
 from PIL import ImageOps
 from PIL.Image import Image, Resampling
 
+from Source.Utility.image_ops import map_bands, threshold_mask, fill_by_mask
 from Source.Utility.sprite_data import SpriteData, SpriteRect, AnimationData
 
 
@@ -94,34 +95,17 @@ def get_anim_sprites_ready(anim: AnimationData) -> list[Image]:
 
 
 def apply_tint(image: Image, tint_color: tuple[int, int, int]) -> Image:
-    img = image.copy().convert('RGBA')
-    pixels = img.load()
-
-    width, height = img.size
-
-    for x in range(width):
-        for y in range(height):
-            r, g, b, a = pixels[x, y]
-
-            r = int(r * tint_color[0] / 255)
-            g = int(g * tint_color[1] / 255)
-            b = int(b * tint_color[2] / 255)
-
-            pixels[x, y] = (r, g, b, a)
-
-    return img
+    img = image.convert('RGBA')
+    return map_bands(img, {
+        band: lambda value, tint=tint: value * tint / 255
+        for band, tint in zip("RGB", tint_color)
+    })
 
 
 def make_image_black(_image: Image, threshold: int = 10) -> Image:
-    image = _image.copy()
-    pixdata = image.load()
-    for y in range(image.size[1]):
-        for x in range(image.size[0]):
-            if pixdata[x, y][3] > threshold:
-                pixdata[x, y] = (0, 0, 0, 255)
-            else:
-                pixdata[x, y] = (0,)*4
-    return image
+    mask = threshold_mask(_image, "A", threshold)
+    return fill_by_mask(_image.size, (0, 0, 0, 255), mask)
+
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,62 @@
+"""
+Whole-image pixel operations. Every operation is done by PIL in C (lookup tables, band masks),
+so per-pixel python loops over 'image.load()' should be written with these functions instead.
+"""
+from typing import Callable, Sequence
+
+from PIL import Image as PILImage
+from PIL.Image import Image
+
+ChannelFunc = Callable[[int], int | float]
+
+
+def make_lut(func: ChannelFunc) -> list[int]:
+    """
+    Lookup table of 8-bit channel values for func (result is clamped to 0..255)
+    """
+    return [min(max(int(func(i)), 0), 255) for i in range(256)]
+
+
+def identity_lut() -> list[int]:
+    return list(range(256))
+
+
+def map_bands(image: Image, funcs: dict[str, ChannelFunc | Sequence[int]]) -> Image:
+    """
+    Applies function (or ready lookup table) to each listed band of 8-bit image in a single pass.
+    Not listed bands are unchanged.
+
+    Example: map_bands(image, {"R": lambda r: 255 - r})
+    """
+    bands = image.getbands()
+    unknown = set(funcs).difference(bands)
+    assert not unknown, f"Image {image.mode} has no bands {unknown}"
+
+    table = []
+    for band in bands:
+        func = funcs.get(band)
+        if func is None:
+            table.extend(identity_lut())
+        elif callable(func):
+            table.extend(make_lut(func))
+        else:
+            assert len(func) == 256
+            table.extend(func)
+    return image.point(table)
+
+
+def threshold_mask(image: Image, band: str = "A", threshold: int = 0) -> Image:
+    """
+    Returns 'L' mask with 255 where band value is greater than threshold and 0 elsewhere
+    """
+    return image.getchannel(band).point([255 if i > threshold else 0 for i in range(256)])
+
+
+def fill_by_mask(size: tuple[int, int], color: tuple[int, ...], mask: Image,
+                 background: tuple[int, ...] = (0, 0, 0, 0), mode: str = "RGBA") -> Image:
+    """
+    New image of color where mask is 255 and of background where mask is 0
+    """
+    image = PILImage.new(mode, size, background)
+    image.paste(color, (0, 0) + size, mask)
+    return image
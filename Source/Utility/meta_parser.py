@@ -0,0 +1,191 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import TextIO
+
+from yaml import ScalarNode
+from yaml.resolver import Resolver
+
+# internal_id, name, rect, pivot
+SpriteRow = tuple[int, str, dict[str, float], dict[str, float]]
+
+_RE_FLOW_PIVOT = re.compile(r"^\{x: ([^,{}]+), y: ([^,{}]+)}$")
+_RECT_KEYS = {"x", "y", "width", "height"}
+
+_STR_TAG = "tag:yaml.org,2002:str"
+_resolver = Resolver()
+
+
+class UnknownMetaStructure(Exception):
+    pass
+
+
+@dataclass
+class TextureMeta:
+    guid: str
+    rows: list[SpriteRow]
+    # only for textures with single sprite (without sprite sheet)
+    sprite_sheet_internal_id: int | None
+
+
+def _split_line(line: str) -> tuple[int, str, str | None]:
+    stripped = line.lstrip(" ")
+    indent = len(line) - len(stripped)
+    key, sep, value = stripped.partition(":")
+    return indent, key, value.strip() if sep else None
+
+
+def _plain_str(value: str) -> str:
+    """Only plain scalars which YAML resolves to str are accepted"""
+    if not value or value[0] in "'\"&*!|>[{%@`#" or " #" in value:
+        raise UnknownMetaStructure(value)
+    if _resolver.resolve(ScalarNode, value, (True, False)) != _STR_TAG:
+        raise UnknownMetaStructure(value)
+    return value
+
+
+def _parse_texture_importer(lines: list[str]) -> TextureMeta:
+    guid = None
+    importer = None
+    internal_ids: list[int] = []
+    sprites: list[dict] = []
+    sprite_sheet_internal_id = None
+    is_table_found = False
+    is_sprites_found = False
+
+    section = None  # current key of TextureImporter (indent 2)
+    sheet_section = None  # current key of spriteSheet (indent 4)
+    sprite = None
+    sprite_key = None  # current key of sprite (indent 6)
+    expect_first_value = False
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+
+        if line[0] != " ":
+            indent, key, value = _split_line(line)
+            if key == "guid":
+                guid = value
+            importer = key
+            section = sheet_section = sprite = sprite_key = None
+            continue
+
+        if line.startswith("  - ") or line.startswith("    - "):
+            item_indent = 2 if line[2] == "-" else 4
+            indent, key, value = _split_line(line[:item_indent] + "  " + line[item_indent + 2:])
+            item_start = True
+        else:
+            indent, key, value = _split_line(line)
+            item_start = False
+
+        if importer != "TextureImporter":
+            continue
+
+        if indent == 2 and not item_start:
+            section = key
+            sheet_section = sprite = sprite_key = None
+            if key == "internalIDToNameTable":
+                is_table_found = True
+                if value not in ("", "[]"):
+                    raise UnknownMetaStructure(line)
+            elif key == "spriteSheet" and value:
+                raise UnknownMetaStructure(line)
+            continue
+
+        if section == "internalIDToNameTable":
+            if item_start and indent == 4:
+                if key != "first" or value:
+                    raise UnknownMetaStructure(line)
+                expect_first_value = True
+            elif expect_first_value and indent == 6:
+                internal_ids.append(int(value))
+                expect_first_value = False
+            elif indent == 4 and key == "second":
+                pass
+            else:
+                raise UnknownMetaStructure(line)
+            continue
+
+        if section != "spriteSheet":
+            continue
+
+        if indent == 4 and not item_start:
+            sheet_section = key
+            sprite = sprite_key = None
+            if key == "sprites":
+                is_sprites_found = True
+                if value not in ("", "[]"):
+                    raise UnknownMetaStructure(line)
+            elif key == "internalID":
+                sprite_sheet_internal_id = int(value)
+            continue
+
+        if sheet_section != "sprites":
+            continue
+
+        if item_start and indent == 6:
+            sprite = {}
+            sprites.append(sprite)
+
+        if sprite is None:
+            raise UnknownMetaStructure(line)
+
+        if indent == 6:
+            sprite_key = key
+            match key:
+                case "name":
+                    sprite["name"] = _plain_str(value)
+                case "rect":
+                    if value:
+                        raise UnknownMetaStructure(line)
+                    sprite["rect"] = {}
+                case "pivot":
+                    match_pivot = _RE_FLOW_PIVOT.match(value)
+                    if not match_pivot:
+                        raise UnknownMetaStructure(line)
+                    sprite["pivot"] = {"x": float(match_pivot.group(1)), "y": float(match_pivot.group(2))}
+        elif sprite_key == "name":
+            # multiline name
+            raise UnknownMetaStructure(line)
+        elif sprite_key == "rect" and indent == 8 and key in _RECT_KEYS:
+            sprite["rect"][key] = float(value)
+
+    if not guid or not is_table_found or not is_sprites_found:
+        raise UnknownMetaStructure("Not found required keys")
+
+    if len(internal_ids) < len(sprites):
+        raise UnknownMetaStructure("Not every sprite has internal id")
+
+    if not internal_ids and not sprites:
+        # single sprite texture
+        if sprite_sheet_internal_id is None:
+            raise UnknownMetaStructure("Not found internal id of single sprite")
+        return TextureMeta(guid, [], sprite_sheet_internal_id)
+
+    rows = []
+    for internal_id, sprite in zip(internal_ids, sprites):
+        if sprite.keys() != {"name", "rect", "pivot"} or sprite["rect"].keys() != _RECT_KEYS:
+            raise UnknownMetaStructure(f"Incomplete sprite: {sprite}")
+        rows.append((internal_id, sprite["name"], sprite["rect"], sprite["pivot"]))
+
+    return TextureMeta(guid, rows, None)
+
+
+def parse_texture_meta_io(text_io: TextIO) -> TextureMeta | None:
+    """
+    Fast line-oriented parser of TextureImporter .meta files (spritesheets).
+    Returns None when structure is unknown, so full YAML parser should be used instead.
+    """
+    with text_io as _f:
+        lines = _f.readlines()
+
+    try:
+        return _parse_texture_importer(lines)
+    except (UnknownMetaStructure, ValueError, TypeError):
+        return None
+
+
+def parse_texture_meta_file(path: os.PathLike[str]) -> TextureMeta | None:
+    return parse_texture_meta_io(open(path, "r", encoding="UTF-8"))
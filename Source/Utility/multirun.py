@@ -1,13 +1,269 @@
+import atexit
+import os
 from asyncio import run, gather, to_thread
-from multiprocessing import Pool
-from typing import Callable, Iterable, Awaitable
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool, cpu_count, resource_tracker
+from multiprocessing.pool import Pool as PoolType, AsyncResult
+from threading import Lock
+from typing import Callable, Iterable, Awaitable, Iterator
 
 from Source.Config.config import Config
 from Source.Utility.constants import IS_DEBUG
+from Source.Utility.special_classes import Objectless
+
+
+class MultiprocessCancelled(Exception):
+    pass
+
+
+def _run_chunk[** P, T](func: Callable[P, T], chunk: list[P.args], is_many_args: bool) -> list[T]:
+    return [func(*arg) for arg in chunk] if is_many_args else [func(arg) for arg in chunk]
+
+
+def _split_chunks[T](args: Iterable[T], chunksize: int) -> Iterator[list[T]]:
+    it = iter(args)
+    while chunk := list(islice(it, chunksize)):
+        yield chunk
+
+
+def _split_chunks_by_cost[T](args: list[T], costs: list[float], chunks_count: int) -> list[list[int]]:
+    """
+    Indexes of args grouped into chunks of similar total cost, the most expensive chunks go first.
+    Task costlier than 1/chunks_count of total cost gets its own chunk. Chunk has at most as many tasks
+    as chunk of equal split, so cheap tasks are not piled into one chunk.
+    """
+    order = sorted(range(len(args)), key=costs.__getitem__, reverse=True)
+    chunks_count = max(chunks_count, 1)
+    target_cost = sum(costs) / chunks_count
+    max_length = max(1, -(-len(args) // chunks_count))
+
+    chunks = []
+    chunk, chunk_cost = [], 0
+    for i in order:
+        chunk.append(i)
+        chunk_cost += costs[i]
+        if chunk_cost >= target_cost > 0 or len(chunk) >= max_length:
+            chunks.append(chunk)
+            chunk, chunk_cost = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def file_size_cost(path: os.PathLike[str] | str) -> int:
+    """
+    Cost function for tasks which time depends on size of file
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class MultiprocessHandler(Objectless):
+    """
+    Owns process pool which is started on first use and shared by every 'run_multiprocess' call.
+    Pool is closed with 'shutdown' (also called at exit), 'cancel' terminates current work.
+    """
+    _pool: PoolType | None = None
+    _pool_processes: int = 0
+    _requested_processes: int | None = None
+    _lock: Lock = Lock()
+
+    @classmethod
+    def get_pool(cls) -> PoolType:
+        with cls._lock:
+            if cls._pool is not None and cls._pool_processes != (cls._requested_processes or cpu_count()) \
+                    and cls._is_idle(cls._pool):
+                # size was changed by 'set_processes', pool is replaced only when no work would be cancelled
+                pool, cls._pool = cls._pool, None
+                pool.close()
+                pool.join()
+            if cls._pool is None:
+                if os.name == "posix":
+                    # workers should use tracker of this process for shared memory, otherwise they clean it up at exit
+                    resource_tracker.ensure_running()
+                cls._pool_processes = cls._requested_processes or cpu_count()
+                cls._pool = Pool(cls._pool_processes)
+            return cls._pool
+
+    @classmethod
+    def get_processes(cls) -> int:
+        return cls._pool_processes or cls._requested_processes or cpu_count()
+
+    @staticmethod
+    def _is_idle(pool: PoolType) -> bool:
+        # pool keeps every result which is not ready yet in its cache
+        return not pool._cache
+
+    @classmethod
+    def set_processes(cls, processes: int | None) -> None:
+        """
+        Sets size of pool, None means cpu_count(). Running pool of another size is replaced by 'get_pool'
+        when it has no pending work, so running tasks are not cancelled.
+        """
+        with cls._lock:
+            cls._requested_processes = processes
+            if cls._pool is None:
+                cls._pool_processes = 0
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._pool is not None
+
+    @classmethod
+    def cancel(cls) -> None:
+        """
+        Terminates workers, every running 'run_multiprocess' raises MultiprocessCancelled. Next call starts new pool.
+        """
+        with cls._lock:
+            pool, cls._pool = cls._pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+            print("Multiprocessing cancelled")
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            pool, cls._pool = cls._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    @classmethod
+    def wait_result[T](cls, pool: PoolType, result: AsyncResult[T]) -> T:
+        while not result.ready():
+            if cls._pool is not pool:
+                raise MultiprocessCancelled()
+            result.wait(0.1)
+        return result.get()
+
+    @classmethod
+    def _iter_chunks[** P, T](cls, func: Callable[P, T], chunks: Iterable[list[P.args]], is_many_args: bool,
+                              max_in_flight: int | None) -> Iterator[list[T]]:
+        pool = cls.get_pool()
+        pending: deque[AsyncResult[list[T]]] = deque()
+
+        try:
+            for chunk in chunks:
+                if cls._pool is not pool:
+                    raise MultiprocessCancelled()
+                pending.append(pool.apply_async(_run_chunk, (func, chunk, is_many_args)))
+
+                while max_in_flight and len(pending) >= max_in_flight:
+                    yield cls.wait_result(pool, pending.popleft())
+
+            while pending:
+                yield cls.wait_result(pool, pending.popleft())
+        finally:
+            # results of abandoned tasks are dropped by pool
+            pending.clear()
+
+    @classmethod
+    def iter_map[** P, T](cls, func: Callable[P, T], args: Iterable[P.args], is_many_args=True, chunksize=1,
+                          max_in_flight: int | None = None) -> Iterator[T]:
+        """
+        Ordered results of func applied to args in shared pool.
+
+        :param chunksize: Number of args sent to worker as one task
+        :param max_in_flight: Maximum number of submitted and not yet consumed tasks. Default: None (unbounded)
+        """
+        for chunk_result in cls._iter_chunks(func, _split_chunks(args, chunksize), is_many_args, max_in_flight):
+            yield from chunk_result
+
+    @classmethod
+    def map_by_cost[** P, T](cls, func: Callable[P, T], args: Iterable[P.args],
+                             cost_func: Callable[..., float], is_many_args=True,
+                             max_in_flight: int | None = None) -> list[T]:
+        """
+        Ordered results of func applied to args in shared pool. Expensive tasks are started first,
+        cheap tasks are grouped into bigger chunks, so one long task does not hold up the whole batch.
+
+        :param cost_func: Estimated cost of task by its arg (ex: size of file), called in current process
+        """
+        args = list(args)
+        costs = [max(cost_func(arg), 0) for arg in args]
+        if not sum(costs):
+            # nothing to balance (ex: all files are missing)
+            return cls.map(func, args, is_many_args, max_in_flight=max_in_flight)
+        chunks_indexes = _split_chunks_by_cost(args, costs, cls.get_processes() * 4)
+
+        results: list[T | None] = [None] * len(args)
+        chunks = ([args[i] for i in indexes] for indexes in chunks_indexes)
+        for indexes, chunk_result in zip(chunks_indexes, cls._iter_chunks(func, chunks, is_many_args, max_in_flight)):
+            for i, result in zip(indexes, chunk_result):
+                results[i] = result
+        return results
+
+    @classmethod
+    def map[** P, T](cls, func: Callable[P, T], args: Iterable[P.args], is_many_args=True,
+                     chunksize: int | None = None, max_in_flight: int | None = None) -> list[T]:
+        if chunksize is None:
+            # same as Pool.map
+            args = list(args)
+            chunksize, extra = divmod(len(args), cls.get_processes() * 4)
+            chunksize += bool(extra)
+        return list(cls.iter_map(func, args, is_many_args, max(chunksize, 1), max_in_flight))
+
+
+atexit.register(MultiprocessHandler.shutdown)
+
+
+def is_multiprocess_enabled(is_multiprocess=True) -> bool:
+    """
+    Returns True when 'run_multiprocess' with the same 'is_multiprocess' would use process pool
+    """
+    return is_multiprocess and Config.get_multiprocessing() and not IS_DEBUG
+
+
+class BoundedTaskQueue[T]:
+    """
+    Submits tasks one by one to shared pool of MultiprocessHandler, at most 'max_in_flight' tasks are unfinished:
+    'submit' waits for the oldest task when queue is full. Without multiprocessing tasks are run in 'submit'.
+    'on_done' is called with every result in order of submission, in the thread that submits tasks.
+    """
+
+    def __init__(self, on_done: Callable[[T], None] = lambda result: None, max_in_flight: int | None = None,
+                 is_multiprocess=True):
+        self._on_done = on_done
+        self._is_multiprocess = is_multiprocess_enabled(is_multiprocess)
+        self._max_in_flight = max_in_flight or MultiprocessHandler.get_processes() * 2
+        self._pending: deque[tuple[PoolType, AsyncResult[list[T]]]] = deque()
+        self.done_count = 0
+
+    def submit[** P](self, func: Callable[P, T], *args: P.args) -> None:
+        if not self._is_multiprocess:
+            self._done(func(*args))
+            return
+
+        while len(self._pending) >= self._max_in_flight:
+            self._wait_oldest()
+
+        pool = MultiprocessHandler.get_pool()
+        self._pending.append((pool, pool.apply_async(_run_chunk, (func, [args], True))))
+
+    def _done(self, result: T) -> None:
+        self.done_count += 1
+        self._on_done(result)
+
+    def _wait_oldest(self) -> None:
+        pool, result = self._pending.popleft()
+        self._done(MultiprocessHandler.wait_result(pool, result)[0])
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def join(self) -> None:
+        while self._pending:
+            self._wait_oldest()
 
 
 def run_multiprocess[** P, T](func: Callable[P, T], args: Iterable[P.args], is_many_args=True, is_multiprocess=True,
-                              processes=None, is_generator=False) -> list[T]:
+                              processes=None, is_generator=False, chunksize: int | None = None,
+                              max_in_flight: int | None = None,
+                              cost_func: Callable[..., float] | None = None) -> list[T]:
     """
     Applies sync function to list of arguments in multiprocessing environment and returns list of results
 
@@ -15,26 +271,34 @@ def run_multiprocess[** P, T](func: Callable[P, T], args: Iterable[P.args], is_m
     :param args: Iterable of arguments type P
     :param is_many_args: Should be set to False when args is a list of values. Default: True
     :param is_multiprocess: When set to False, disables multiprocessing environment and instead calls list comprehension. Default: True
-    :param processes: Number of processes to use. Default: None (auto)
+    :param processes: Number of processes to use. Default: None (shared pool of MultiprocessHandler)
     :param is_generator: When is_generator==True and is_multiprocess==False then list generator will be returned. Default: False
+    :param chunksize: Number of args sent to worker as one task. Default: None (same as Pool.map)
+    :param max_in_flight: Maximum number of tasks submitted to pool at once. Default: None (unbounded)
+    :param cost_func: Estimated cost of task by its arg (ex: 'file_size_cost'). When set, tasks are scheduled
+        from the most expensive ones and cheap tasks are grouped together, 'chunksize' is ignored. Default: None
     :return: List of functions results
     """
-    is_config_mp = Config.get_multiprocessing() and not IS_DEBUG
+    if is_multiprocess_enabled(is_multiprocess):
+        if processes is not None and processes != MultiprocessHandler.get_processes():
+            with Pool(processes) as p:
+                if is_many_args:
+                    return p.starmap(func, args, chunksize)
+                else:
+                    return p.map(func, args, chunksize)
 
-    if is_multiprocess and is_config_mp:
-        with Pool(processes) as p:
-            if is_many_args:
-                return p.starmap(func, args)
-            else:
-                return p.map(func, args)
+        if cost_func is not None:
+            return MultiprocessHandler.map_by_cost(func, args, cost_func, is_many_args, max_in_flight)
+        return MultiprocessHandler.map(func, args, is_many_args, chunksize, max_in_flight)
     else:
-        gen = (is_many_args and func(*arg) or func(arg) for arg in args)
+        gen = (func(*arg) if is_many_args else func(arg) for arg in args)
         return gen if is_generator else list(gen)
 
 
 def run_multiprocess_single[** P, T](func: Callable[P, T], args: Iterable[P.args], is_multiprocess=True,
-                                     processes=None) -> list[T]:
-    return run_multiprocess(func, args, is_multiprocess=is_multiprocess, processes=processes, is_many_args=False)
+                                     processes=None, cost_func: Callable[..., float] | None = None) -> list[T]:
+    return run_multiprocess(func, args, is_multiprocess=is_multiprocess, processes=processes, is_many_args=False,
+                            cost_func=cost_func)
 
 
 async def __run_sync_in_async[** P, T](func: Callable[P, Awaitable[T]], args: Iterable[P.args]) -> list[T]:
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 from PIL.Image import Image
 
-from typing import TypeVar, Iterator
+from typing import TypeVar, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from Source.Utility.atlas import Atlas
 
 TRect = TypeVar("TRect", bound="SpriteRect")
 TPivot = TypeVar("TPivot", bound="SpritePivot")
@@ -38,17 +41,18 @@ class SpritePivot:
 
 
 class AnimationData:
-    def __init__(self, name: str, frames_names: list[str], rects: list[SpriteRect], sprites: list[Image]):
+    def __init__(self, name: str, frames_names: list[str], rects: list[SpriteRect], sprites: list["SpriteData"]):
         self.name = name
         self._frames_names = frames_names
         self._rects = rects
-        self._sprites = sprites
+        # sprites are cropped only when requested
+        self._sprites_data = sprites
 
     def get_sprites_iter(self) -> Iterator[tuple[Image, SpriteRect, str]]:
-        return zip(self._sprites, self._rects, self._frames_names)
+        return zip(self.get_sprites(), self._rects, self._frames_names)
 
-    def get_sprites(self):
-        return self._sprites
+    def get_sprites(self) -> list[Image]:
+        return [sprite_data.sprite for sprite_data in self._sprites_data]
 
     def get_frames_names(self):
         return self._frames_names
@@ -59,18 +63,32 @@ class AnimationData:
 
 class SpriteData:
     def __init__(self, name: str, real_name: str, internal_id_set: set[int], rect: SpriteRect | dict[str, float],
-                 pivot: SpritePivot | dict[str, float]):
+                 pivot: SpritePivot | dict[str, float], atlas: "Atlas | None" = None):
         self.name = name
         self.real_name = real_name
         self.internal_id_set = internal_id_set
         self.rect = rect if isinstance(rect, SpriteRect) else SpriteRect.from_dict(rect)
         self.pivot = pivot if isinstance(pivot, SpritePivot) else SpritePivot.from_dict(pivot)
 
-        self.sprite: Image | None = None
+        self.atlas = atlas
+        self._sprite: Image | None = None
         self.animation: AnimationData | None = None
 
+    @property
+    def sprite(self) -> Image | None:
+        """
+        Sprite is cropped from atlas on first access, unless it was set explicitly
+        """
+        if self._sprite is None and self.atlas is not None:
+            return self.atlas.crop(self.rect)
+        return self._sprite
+
+    @sprite.setter
+    def sprite(self, value: Image | None) -> None:
+        self._sprite = value
+
     def __repr__(self):
-        return super().__repr__().replace(" object", f": {self.real_name}, {self.sprite=}")
+        return super().__repr__().replace(" object", f": {self.real_name}, {self.rect=}")
 
     def __getitem__(self, item):
         # SHOULD NOT BE USED NORMALLY
@@ -1,4 +1,25 @@
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
 from time import perf_counter_ns
+from typing import Any, Final
+
+from Source.Utility.constants import ROOT_FOLDER
+from Source.Utility.special_classes import Objectless
+
+# Saved next to 'unpacker.log', open with https://ui.perfetto.dev or chrome://tracing
+TRACE_PATH: Final[Path] = ROOT_FOLDER / "unpacker.trace.json"
+# Increase when format of 'otherData' changes
+TRACE_VERSION: Final[int] = 1
+
+DEFAULT_SAMPLE_INTERVAL: Final[float] = 0.005
+_MAX_STACK_DEPTH: Final[int] = 64
+_HOT_FUNCTIONS_COUNT: Final[int] = 30
 
 
 class Timeit:
@@ -19,3 +40,238 @@ class Timeit:
 
     def __repr__(self):
         return f"({self:.2f} sec)"
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict[str, Any]):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Profiler.add_span(self.name, self.start, perf_counter_ns(), self.args)
+
+
+class _Sampler(threading.Thread):
+    """
+    Records stacks of all other threads of process every 'interval' seconds
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="ProfilerSampler", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+        # (parent id, frame name) -> id
+        self.frame_ids: dict[tuple[int | None, str], int] = {}
+        self.samples: list[tuple[int, int, int]] = []
+        self.self_counts: Counter[str] = Counter()
+        self.total_counts: Counter[str] = Counter()
+
+    def _get_stack_id(self, frame) -> int | None:
+        names = []
+        while frame is not None and len(names) < _MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if not names:
+            return None
+
+        self.self_counts[names[0]] += 1
+        self.total_counts.update(set(names))
+
+        stack_id = None
+        for name in reversed(names):
+            key = (stack_id, name)
+            if (frame_id := self.frame_ids.get(key)) is None:
+                frame_id = self.frame_ids[key] = len(self.frame_ids)
+            stack_id = frame_id
+        return stack_id
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            now = perf_counter_ns()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if (stack_id := self._get_stack_id(frame)) is not None:
+                    self.samples.append((now, thread_id, stack_id))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler(Objectless):
+    """
+    Instrumentation of run: named spans of (nested) phases, counters and optional sampling of stacks.
+    Disabled by default, then 'span' and 'count' do nothing. Only current process is recorded.
+
+    Usage:
+        Profiler.start(is_sampling=True)
+        with Profiler.span("parse", file=name):
+            Profiler.count("bytes_read", size)
+        Profiler.save()
+    """
+    _is_enabled: bool = False
+    _lock = threading.Lock()
+    _start_ns: int = 0
+    _started_at: datetime | None = None
+    _events: list[dict[str, Any]] = []
+    _counters: Counter[str] = Counter()
+    # name -> [count, total ns]
+    _span_totals: dict[str, list[int]] = {}
+    _sampler: _Sampler | None = None
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return cls._is_enabled
+
+    @classmethod
+    def start(cls, is_sampling: bool = False, sample_interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        """
+        Clears previous results and starts recording
+        """
+        cls.stop()
+        with cls._lock:
+            cls._start_ns = perf_counter_ns()
+            cls._started_at = datetime.now().astimezone()
+            cls._events = []
+            cls._counters = Counter()
+            cls._span_totals = {}
+            cls._sampler = None
+            cls._is_enabled = True
+
+        if is_sampling:
+            cls._sampler = _Sampler(sample_interval)
+            cls._sampler.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """
+        Stops recording, results are kept until next 'start'
+        """
+        cls._is_enabled = False
+        if cls._sampler is not None and cls._sampler.is_alive():
+            cls._sampler.stop()
+
+    @classmethod
+    def span(cls, name: str, **args) -> _Span | nullcontext:
+        """
+        Context manager that records time of phase. args are shown in trace (ex: file name)
+        """
+        if not cls._is_enabled:
+            return nullcontext()
+        return _Span(name, args)
+
+    @classmethod
+    def add_span(cls, name: str, start_ns: int, end_ns: int, args: dict[str, Any] | None = None) -> None:
+        if not cls._is_enabled:
+            return
+
+        event = {
+            "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+            "ts": (start_ns - cls._start_ns) / 1000, "dur": (end_ns - start_ns) / 1000,
+        }
+        if args:
+            event["args"] = {key: str(value) if isinstance(value, Path) else value for key, value in args.items()}
+
+        with cls._lock:
+            cls._events.append(event)
+            totals = cls._span_totals.setdefault(name, [0, 0])
+            totals[0] += 1
+            totals[1] += end_ns - start_ns
+
+    @classmethod
+    def count(cls, name: str, value: int | float = 1) -> None:
+        if not cls._is_enabled:
+            return
+        with cls._lock:
+            cls._counters[name] += value
+
+    @classmethod
+    def get_counters(cls) -> dict[str, int | float]:
+        with cls._lock:
+            return dict(cls._counters)
+
+    @classmethod
+    def get_span_totals(cls) -> dict[str, dict[str, int | float]]:
+        with cls._lock:
+            return {name: {"count": count, "seconds": round(ns / 1e9, 6)}
+                    for name, (count, ns) in sorted(cls._span_totals.items(), key=lambda x: -x[1][1])}
+
+    @classmethod
+    def _get_thread_names(cls) -> list[dict[str, Any]]:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        tids = {event["tid"] for event in cls._events}
+        if cls._sampler is not None:
+            tids.update(tid for _, tid, _ in cls._sampler.samples)
+        return [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                 "args": {"name": names.get(tid, str(tid))}}
+                for tid in sorted(tids)]
+
+    @classmethod
+    def to_dict(cls, metadata: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        Chrome trace (json object format), summary for comparing runs is kept in 'otherData'
+        """
+        with cls._lock:
+            events = list(cls._events)
+
+        other_data = {
+            "version": TRACE_VERSION,
+            "started_at": cls._started_at and cls._started_at.isoformat(timespec="seconds"),
+            "seconds": round((perf_counter_ns() - cls._start_ns) / 1e9, 6),
+            "argv": sys.argv,
+            "python": sys.version.split()[0],
+            "counters": cls.get_counters(),
+            "spans": cls.get_span_totals(),
+            **(metadata or {}),
+        }
+
+        data = {
+            "traceEvents": events + cls._get_thread_names(),
+            "displayTimeUnit": "ms",
+            "otherData": other_data,
+        }
+
+        sampler = cls._sampler
+        if sampler is not None:
+            if sampler.is_alive():
+                sampler.stop()
+            data["stackFrames"] = {
+                str(frame_id): {"name": name, **({"parent": str(parent)} if parent is not None else {})}
+                for (parent, name), frame_id in sampler.frame_ids.items()
+            }
+            data["samples"] = [
+                {"name": "sample", "cpu": 0, "pid": os.getpid(), "tid": tid, "ts": (ts - cls._start_ns) / 1000,
+                 "sf": str(stack_id), "weight": 1}
+                for ts, tid, stack_id in sampler.samples
+            ]
+            other_data["samples"] = len(sampler.samples)
+            other_data["hot_functions"] = {
+                "self": dict(sampler.self_counts.most_common(_HOT_FUNCTIONS_COUNT)),
+                "total": dict(sampler.total_counts.most_common(_HOT_FUNCTIONS_COUNT)),
+            }
+
+        return data
+
+    @classmethod
+    def save(cls, path: Path = TRACE_PATH, metadata: dict[str, Any] | None = None) -> Path:
+        """
+        Stops recording and saves results
+        """
+        cls.stop()
+        data = cls.to_dict(metadata)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="UTF-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Saved profiling trace to {path}")
+        return path
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from io import StringIO
 from itertools import starmap
 from pathlib import Path
-from typing import TextIO, Self, Callable, Iterable
+from typing import TextIO, Self, Callable, Iterable, Iterator
 
 import yaml
 from yaml import Node, MappingNode, Loader
@@ -16,10 +16,19 @@ from yaml.reader import Reader
 from yaml.resolver import Resolver
 from yaml.scanner import Scanner
 
+try:
+    from yaml.cyaml import CParser
+except ImportError:
+    CParser = None
+
 from Source.Utility.multirun import run_multiprocess
-from Source.Utility.timer import Timeit
+from Source.Utility.timer import Timeit, Profiler
 
 MAX_PARSE_BATCH_SIZE = 1 << 12
+STREAM_CHUNK_SIZE = 1 << 20
+
+UNITY_TAG = "--- "
+UNITY_YAML_TAG = "tag:unity3d.com,2011"
 
 
 @dataclass
@@ -114,7 +123,9 @@ class UnityDoc:
             text_split = filter(filter_func, text_split)
             text_parse = unity_tag + unity_tag.join(text_split)
 
-        entries = list(yaml.load_all(text_parse, UnityLoaderR))
+        Profiler.count("yaml_chars_parsed", len(text_parse))
+        with Profiler.span("parse", chars=len(text_parse)):
+            entries = list(yaml.load_all(text_parse, UnityLoader))
         return UnityDoc(entries)
 
     @staticmethod
@@ -128,6 +139,33 @@ class UnityDoc:
         with open(path, "r", encoding="UTF-8") as _f:
             return UnityDoc.yaml_parse_io(_f)
 
+    @staticmethod
+    def yaml_iter_io(text_io: TextIO, filter_func: Callable[[str], bool] = None,
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[UnityYAMLEntry]:
+        """
+        Lazily parses documents one by one while reading text_io by chunks.
+        Memory depends on the biggest document, not on the whole file.
+        """
+        with text_io as _f:
+            for document in _iter_yaml_documents(_f, chunk_size):
+                if filter_func and not filter_func(document[len(UNITY_TAG):]):
+                    continue
+                yield yaml.load(document, UnityLoader)
+
+    @staticmethod
+    def yaml_iter_file(path: os.PathLike[str], filter_func: Callable[[str], bool] = None,
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[UnityYAMLEntry]:
+        return UnityDoc.yaml_iter_io(open(path, "r", encoding="UTF-8"), filter_func, chunk_size)
+
+    @staticmethod
+    def yaml_parse_io_stream(text_io: TextIO, filter_func: Callable[[str], bool] = None) -> Self:
+        with Profiler.span("parse"):
+            return UnityDoc(list(UnityDoc.yaml_iter_io(text_io, filter_func)))
+
+    @staticmethod
+    def yaml_parse_file_stream(path: os.PathLike[str], filter_func: Callable[[str], bool] = None) -> Self:
+        return UnityDoc(list(UnityDoc.yaml_iter_file(path, filter_func)))
+
     @staticmethod
     def yaml_parse_text_parallel(text: str, filter_func: Callable[[str], bool] = None) -> Self:
         unity_tag = "--- "
@@ -141,7 +179,8 @@ class UnityDoc:
         text_split_parts_list = starmap(_split_yaml_string, text_split_enum)
         text_split_parts = (part for parts in text_split_parts_list for part in parts)  # flatten
 
-        entries_parts = run_multiprocess(_yaml_load_part, text_split_parts)
+        with Profiler.span("parse", chars=len(text)):
+            entries_parts = run_multiprocess(_yaml_load_part, text_split_parts)
 
         entries: list[UnityYAMLEntry | None] = [None] * (entries_parts[-1][0] + 1)
         for entry_index, part_index, entry in entries_parts:
@@ -164,8 +203,44 @@ class UnityDoc:
             return UnityDoc.yaml_parse_io_parallel(_f, filter_func)
 
 
+def _iter_yaml_documents(text_io: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yields documents starting with "--- " from text_io without reading the whole file.
+    Header of file (%YAML, %TAG) is skipped.
+    """
+    boundary = "\n" + UNITY_TAG
+    keep = len(boundary) - 1
+
+    parts: list[str] = []
+    carry = ""
+    while chunk := text_io.read(chunk_size):
+        data = carry + chunk if carry else chunk
+
+        start = 0
+        while (index := data.find(boundary, start)) != -1:
+            parts.append(data[start:index + 1])
+            document = "".join(parts)
+            if document.startswith(UNITY_TAG):
+                yield document
+            parts.clear()
+            start = index + 1
+
+        # boundary can be split between chunks
+        rest = data[start:] if start else data
+        if len(rest) > keep:
+            parts.append(rest[:-keep])
+            carry = rest[-keep:]
+        else:
+            carry = rest
+
+    parts.append(carry)
+    document = "".join(parts)
+    if document.startswith(UNITY_TAG):
+        yield document
+
+
 def _yaml_load_part(i: int, j: int, entry: str) -> tuple[int, int, "UnityYAMLEntry"]:
-    return i, j, yaml.load(entry, UnityLoaderR)
+    return i, j, yaml.load(entry, UnityLoader)
 
 
 def _split_yaml_string(entry_index: int, entry: str) -> list[tuple[int, int, str]]:
@@ -252,6 +327,43 @@ class UnityLoaderR(Reader, Scanner, UnityParserR, Composer, SafeConstructor, Res
         return UnityYAMLEntry(class_name, class_id, file_id, data)
 
 
+_RE_UNITY_DOCUMENT_START = re.compile(r"^--- !u!(\d+) &(-?\d+)", re.MULTILINE)
+
+if CParser:
+    class UnityLoaderC(CParser, SafeConstructor, Resolver):
+        """
+        Loader using libyaml. Produces the same entries as UnityLoaderR.
+
+        libyaml does not keep %TAG directives between documents and does not give source snippets,
+        so every '--- !u!{classID} &{fileID}' is rewritten to verbatim tag that contains both ids.
+        """
+
+        def __init__(self, stream: str | TextIO):
+            if not isinstance(stream, str):
+                stream = stream.read()
+            stream = _RE_UNITY_DOCUMENT_START.sub(rf"--- !<{UNITY_YAML_TAG}:\1:\2> &\2", stream)
+
+            CParser.__init__(self, stream)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+        @staticmethod
+        def unity_yaml_constructor(loader: Loader, suffix: str, node: MappingNode | Node):
+            _, class_id, file_id = suffix.split(":")
+
+            yaml_object: dict = loader.construct_mapping(node)
+            class_name, data = list(yaml_object.items())[0]
+            assert len(yaml_object.keys()) == 1, "For each tag (!u!) there must by only one entry"
+
+            return UnityYAMLEntry(class_name, int(class_id), int(file_id), data)
+
+    yaml.add_multi_constructor(UNITY_YAML_TAG, UnityLoaderC.unity_yaml_constructor, UnityLoaderC)
+
+    UnityLoader = UnityLoaderC
+else:
+    UnityLoader = UnityLoaderR
+
+
 @dataclass
 class UnityDocTree(UnityYAMLEntry):
 
@@ -322,12 +434,32 @@ if __name__ == "__main__":
 
     # __timeit()
 
+    def __stream():
+        import tracemalloc
+
+        def _measure(name, func):
+            tracemalloc.start()
+            timeit = Timeit()
+            result = func()
+            print(f"{name}: {timeit!r}, peak memory {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MiB")
+            tracemalloc.stop()
+            return result
+
+        print(f"File size: {fp.stat().st_size / 2 ** 20:.1f} MiB")
+        seq = _measure("yaml_parse_file", lambda: UnityDoc.yaml_parse_file(fp))
+        stream = _measure("yaml_parse_file_stream", lambda: UnityDoc.yaml_parse_file_stream(fp))
+        _measure("yaml_iter_file (entries dropped)", lambda: sum(1 for _ in UnityDoc.yaml_iter_file(fp)))
+
+        assert seq == stream
+
+
+    # __stream()
+
     def __profile():
-        import cProfile
         print("Started")
-        with cProfile.Profile() as pr:
-            UnityDoc.yaml_parse_file_parallel(fp, lambda x: "Tilemap:" in x)
-            pr.print_stats('time')
+        Profiler.start(is_sampling=True)
+        UnityDoc.yaml_parse_file_parallel(fp, lambda x: "Tilemap:" in x)
+        Profiler.save()
 
 
     # __profile()
@@ -0,0 +1,294 @@
+"""
+Benchmarks of hot paths on synthetic assets, runs offline without game files.
+
+Usage: python -m _Tests.Benchmarks.bench [--size tiny|small|medium|large] [--repeat N] [--output FILE]
+                                          [--baseline FILE] [--threshold 0.25] [--only NAME ...] [--jobs N]
+
+Results are saved as json. With '--baseline' every case is compared with the same case of previous results,
+exit code is 1 if any case became slower than threshold allows.
+Scaling of multiprocessing is measured by running the same cases with different '--jobs' and comparing results,
+ex: '--only gen_tilemap_full gen_tilemap_streaming --jobs 4 --baseline jobs1.json'.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Final
+
+from _Tests.Benchmarks import fixtures
+from _Tests.Benchmarks.fixtures import SyntheticAssets, BenchSize, SIZES
+from Source.Config.config import DLCType, Game
+from Source.Data.data import DataHandler, DataType
+from Source.Data.meta_data import MetaDataHandler, _get_meta
+from Source.Translations.language import LangHandler, LangType, gen_inverse_dict
+from Source.Utility.multirun import MultiprocessHandler
+from Source.Utility.timer import Timeit
+from Source.Utility.unityparser2 import UnityDoc
+
+# Increase when cases or fixtures change so much that old results cannot be compared
+BENCH_VERSION: Final[int] = 1
+
+DEFAULT_THRESHOLD: Final[float] = 0.25
+# differences smaller than this are noise of timer and scheduler
+DEFAULT_MIN_DELTA: Final[float] = 0.005
+
+
+@dataclass
+class BenchCase:
+    name: str
+    func: Callable[[], Any]
+    # called before every run, not timed
+    setup: Callable[[], None] = lambda: None
+
+
+def _sleep(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+# many short tasks and one long task at the end, which default chunking puts into the last chunk
+STRAGGLER_ARGS: Final[list[float]] = [0.001] * 100 + [0.1]
+
+
+def _is_tilemap_entry(text: str) -> bool:
+    return "Tilemap:" in text
+
+
+def _load_meta() -> None:
+    MetaDataHandler.load(Game.VS)
+
+
+def _reset_meta() -> None:
+    fixtures.reset_handlers()
+
+
+def get_cases(assets: SyntheticAssets, work_folder: Path) -> list[BenchCase]:
+    from Source.Images.image_gen_new import ImageGeneratorManager, GenType
+    from Source.Images.tilemap_gen import gen_tilemap, TilemapDataHandler
+
+    cache_folder = work_folder / "MetaCache"
+    tilemap_cache_folder = work_folder / "TilemapCache"
+    index_path = work_folder / "AssetIndex.sqlite"
+    images_folder = work_folder / "Images"
+
+    def setup_meta_cold():
+        _reset_meta()
+        index_path.unlink(missing_ok=True)
+        fixtures.clear_folder(cache_folder)
+
+    def setup_lang():
+        _load_meta()
+        LangHandler._full_file = None
+        LangHandler._loaded_data.clear()
+
+    def setup_lang_inverse():
+        _load_meta()
+        LangHandler.get_lang_file(LangType.GENERAL)
+
+    def setup_tilemap(is_cached: bool):
+        def _setup():
+            _load_meta()
+            MetaDataHandler.loaded_assets_meta.clear()
+            TilemapDataHandler.loaded_prefabs.clear()
+            fixtures.clear_folder(images_folder)
+            if not is_cached:
+                fixtures.clear_folder(tilemap_cache_folder)
+        return _setup
+
+    def setup_images(is_clear: bool):
+        def _setup():
+            _load_meta()
+            DataHandler.load()
+            LangHandler.get_lang_file(LangType.GENERAL)
+            MetaDataHandler.loaded_assets_meta.clear()
+            if is_clear:
+                fixtures.clear_folder(images_folder)
+        return _setup
+
+    req_gens = {GenType.IMAGE: 1, GenType.IMAGE_FRAME: True}
+
+    return [
+        BenchCase("map_straggler", lambda: MultiprocessHandler.map(_sleep, STRAGGLER_ARGS, is_many_args=False)),
+        BenchCase("map_by_cost_straggler",
+                  lambda: MultiprocessHandler.map_by_cost(_sleep, STRAGGLER_ARGS, float, is_many_args=False)),
+        BenchCase("unitydoc_parse", lambda: UnityDoc.yaml_parse_file(assets.prefab)),
+        BenchCase("unitydoc_parse_smart", lambda: UnityDoc.yaml_parse_file_smart(assets.prefab, _is_tilemap_entry)),
+        BenchCase("unitydoc_parse_stream", lambda: UnityDoc.yaml_parse_file_stream(assets.prefab, _is_tilemap_entry)),
+        BenchCase("unitydoc_parse_parallel", lambda: UnityDoc.yaml_parse_file_parallel(assets.prefab, _is_tilemap_entry)),
+        BenchCase("get_meta_cold", lambda: _get_meta(assets.items_meta), lambda: fixtures.clear_folder(cache_folder)),
+        BenchCase("get_meta_cached", lambda: _get_meta(assets.items_meta)),
+        BenchCase("meta_handler_load_cold", _load_meta, setup_meta_cold),
+        BenchCase("meta_handler_load_indexed", _load_meta, _reset_meta),
+        BenchCase("data_handler_load", lambda: DataHandler.get_data(DLCType.VS, DataType.ITEM).data(),
+                  lambda: (_reset_meta(), _load_meta())),
+        BenchCase("lang_split", lambda: LangHandler.get_lang_file(LangType.GENERAL), setup_lang),
+        BenchCase("lang_inverse", lambda: gen_inverse_dict(LangType.ITEM), setup_lang_inverse),
+        BenchCase("gen_tilemap", lambda: gen_tilemap(assets.prefab, False), setup_tilemap(False)),
+        BenchCase("gen_tilemap_cached", lambda: gen_tilemap(assets.prefab, False), setup_tilemap(True)),
+        BenchCase("gen_tilemap_full", lambda: gen_tilemap(assets.prefab, False, is_streaming=False),
+                  setup_tilemap(True)),
+        BenchCase("gen_tilemap_streaming", lambda: gen_tilemap(assets.prefab, False, is_streaming=True),
+                  setup_tilemap(True)),
+        BenchCase("image_generator",
+                  lambda: ImageGeneratorManager.run_generator(DLCType.VS, DataType.ITEM, req_gens),
+                  setup_images(True)),
+        BenchCase("image_generator_unchanged",
+                  lambda: ImageGeneratorManager.run_generator(DLCType.VS, DataType.ITEM, req_gens),
+                  setup_images(False)),
+    ]
+
+
+def run_case(case: BenchCase, repeat: int, is_verbose: bool = False) -> dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        output = sys.stdout if is_verbose else io.StringIO()
+        with redirect_stdout(output), redirect_stderr(sys.stderr if is_verbose else output):
+            case.setup()
+            timeit = Timeit()
+            case.func()
+            runs.append(timeit.get_sec())
+
+    return {
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.fmean(runs), 6),
+        "runs": [round(run, 6) for run in runs],
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+            min_delta: float = DEFAULT_MIN_DELTA) -> list[dict[str, Any]]:
+    """
+    Compares best runs of cases present in both results, returns comparison of every case
+    """
+    comparisons = []
+    for name, result in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        ratio = result["min"] / base["min"] if base["min"] else 1.0
+        comparisons.append({
+            "name": name,
+            "baseline": base["min"],
+            "current": result["min"],
+            "ratio": round(ratio, 3),
+            "is_regression": ratio > 1 + threshold and result["min"] - base["min"] > min_delta,
+        })
+    return comparisons
+
+
+def get_report(results: dict[str, Any], comparisons: list[dict[str, Any]]) -> str:
+    by_name = {comparison["name"]: comparison for comparison in comparisons}
+    width = max((len(name) for name in results["cases"]), default=0)
+    lines = []
+    for name, result in results["cases"].items():
+        line = f"{name:<{width}}  min {result["min"]:9.4f} sec  median {result["median"]:9.4f} sec"
+        if comparison := by_name.get(name):
+            line += f"  x{comparison["ratio"]:.2f}" + ("  REGRESSION" if comparison["is_regression"] else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run(size: BenchSize, repeat: int, only: list[str] | None = None, is_multiprocess: bool = False,
+        is_verbose: bool = False) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="vs_bench_") as tmp:
+        tmp = Path(tmp)
+        timeit = Timeit()
+        assets = fixtures.create_assets(tmp / "Assets", size)
+        fixtures_seconds = timeit.get_sec()
+
+        work_folder = tmp / "Work"
+        cases_results = {}
+        with fixtures.use_assets(assets, work_folder, is_multiprocess):
+            for case in get_cases(assets, work_folder):
+                if only and case.name not in only:
+                    continue
+                print(f"Running {case.name}", file=sys.stderr)
+                cases_results[case.name] = run_case(case, repeat, is_verbose)
+
+    return {
+        "version": BENCH_VERSION,
+        "created_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "multiprocessing": is_multiprocess,
+        "jobs": MultiprocessHandler.get_processes() if is_multiprocess else 1,
+        "size": size.__dict__,
+        "repeat": repeat,
+        "fixtures_seconds": round(fixtures_seconds, 4),
+        "cases": cases_results,
+    }
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m _Tests.Benchmarks.bench",
+                                     description="Benchmarks of hot paths on synthetic assets")
+    parser.add_argument("--size", choices=list(SIZES), default="small", help="size of assets (default: small)")
+    parser.add_argument("--sprites", type=int, help="override number of sprites (and items)")
+    parser.add_argument("--tiles", type=int, help="override number of tiles in every tilemap layer")
+    parser.add_argument("--terms", type=int, help="override number of language terms")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every case, best is compared (default: 3)")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only these cases")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of processes, 1 disables multiprocessing (default: 1)")
+    parser.add_argument("--output", metavar="FILE", help="save results to json FILE ('-' prints to stdout)")
+    parser.add_argument("--baseline", metavar="FILE", help="results of previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed slowdown against baseline (default: {DEFAULT_THRESHOLD} = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help=f"slowdowns smaller than this are ignored, sec (default: {DEFAULT_MIN_DELTA})")
+    parser.add_argument("--verbose", action="store_true", help="show output of benchmarked functions")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+
+    overrides = {key: value for key in ("sprites", "tiles", "terms") if (value := getattr(args, key)) is not None}
+    size = replace(SIZES[args.size], **overrides)
+
+    is_multiprocess = args.jobs != 1
+    if is_multiprocess:
+        MultiprocessHandler.set_processes(args.jobs if args.jobs > 1 else None)
+
+    try:
+        results = run(size, args.repeat, args.only, is_multiprocess, args.verbose)
+    finally:
+        MultiprocessHandler.shutdown()
+
+    comparisons = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="UTF-8"))
+        if baseline.get("version") != BENCH_VERSION or baseline.get("size") != results["size"]:
+            print("! Baseline was made with different version or size of assets, results may be not comparable",
+                  file=sys.stderr)
+        comparisons = compare(results, baseline, args.threshold, args.min_delta)
+        results["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "cases": comparisons}
+
+    print(get_report(results, comparisons), file=sys.stderr)
+
+    if args.output:
+        text = json.dumps(results, indent=2)
+        if args.output == "-":
+            print(text)
+        else:
+            Path(args.output).write_text(text, encoding="UTF-8")
+
+    regressions = [comparison["name"] for comparison in comparisons if comparison["is_regression"]]
+    if regressions:
+        print(f"Regressions: {", ".join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Synthetic Unity assets in the same layout as ripped ones (ExportedProject/Assets/...), so hot paths can be
+benchmarked without game files: spritesheets with .meta, tilemap prefab, I2Languages, DataManagerSettings with
+json data files.
+"""
+import hashlib
+import json
+import math
+import shutil
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+import Source.Data.meta_data as meta_data_module
+import Source.Images.image_gen_new as image_gen_new
+import Source.Images.tilemap_gen as tilemap_gen
+from Source.Config.config import CfgKey, Config, DLCType, EXPORTED_PROJECT, ASSETS
+from Source.Data.data import DataHandler
+from Source.Data.meta_cache import load_cached_texture_meta, save_cached_texture_meta
+from Source.Data.meta_data import MetaDataHandler
+from Source.Images.tilemap_data import load_cached_tilemaps, save_cached_tilemaps
+from Source.Translations.language import LangHandler, Lang, I2_LANGUAGES
+from Source.Utility.constants import TEXTURE_2D, RESOURCES, TEXT_ASSET, GAME_OBJECT, MONO_BEHAVIOUR, \
+    DATA_MANAGER_SETTINGS
+
+SPRITE_SIZE = 32
+FRAME_SIZE = 40
+ITEMS_TEXTURE = "items"
+TILES_TEXTURE = "tiles"
+UI_TEXTURE = "UI"
+UI_FRAMES = ("frameC", "frameF")
+PREFAB_NAME = "BenchStage"
+
+_UNITY_HEADER = "%YAML 1.1\n%TAG !u! tag:unity3d.com,2011:\n"
+_TILEMAP_CLASS_ID = 1839735485
+
+
+@dataclass
+class BenchSize:
+    # sprites in items texture (and items in data)
+    sprites: int
+    # tiles in every layer of tilemap
+    tiles: int
+    layers: int
+    # terms of I2Languages (besides item names)
+    terms: int
+    # different sprites used by tilemap
+    tile_sprites: int = 16
+
+
+SIZES: dict[str, BenchSize] = {
+    "tiny": BenchSize(sprites=8, tiles=64, layers=2, terms=50, tile_sprites=4),
+    "small": BenchSize(sprites=128, tiles=4_096, layers=3, terms=2_000),
+    "medium": BenchSize(sprites=1_024, tiles=65_536, layers=4, terms=20_000, tile_sprites=64),
+    "large": BenchSize(sprites=4_096, tiles=262_144, layers=6, terms=80_000, tile_sprites=256),
+}
+
+
+@dataclass
+class SyntheticAssets:
+    size: BenchSize
+    # folder selected in config (contains ExportedProject)
+    root: Path
+    assets: Path
+    items_meta: Path
+    tiles_meta: Path
+    ui_meta: Path
+    prefab: Path
+    i2languages: Path
+    data_settings: Path
+
+
+def get_guid(name: str) -> str:
+    return hashlib.md5(name.encode("UTF-8")).hexdigest()
+
+
+def _write_asset(path: Path, text: str, importer: str = "DefaultImporter") -> str:
+    """
+    Writes asset and its .meta, returns guid
+    """
+    guid = get_guid(path.name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="UTF-8")
+    path.with_name(path.name + ".meta").write_text(
+        f"fileFormatVersion: 2\nguid: {guid}\n{importer}:\n  userData: \n  assetBundleName: \n", encoding="UTF-8")
+    return guid
+
+
+def write_spritesheet(folder: Path, name: str, names: list[str], sprite_size: int = SPRITE_SIZE,
+                      pivot: tuple[float, float] = (0.5, 0.5)) -> Path:
+    """
+    Texture with grid of sprites (every one filled with its own color) and .meta with TextureImporter.
+    Returns path of .meta
+    """
+    columns = max(1, math.ceil(math.sqrt(len(names))))
+    rows = math.ceil(len(names) / columns)
+    width, height = columns * sprite_size, rows * sprite_size
+
+    image = Image.new("RGBA", (width, height))
+    table = []
+    sprites = []
+    for i, sprite_name in enumerate(names):
+        column, row = i % columns, i // columns
+        left, top = column * sprite_size, row * sprite_size
+        color = (i * 37 % 256, i * 91 % 256, i * 53 % 256, 255)
+        image.paste(color, (left + 2, top + 2, left + sprite_size - 2, top + sprite_size - 2))
+
+        internal_id = 21300000 + i
+        table.append(f"  - first:\n      213: {internal_id}\n    second: {sprite_name}\n")
+        # rect origin is left bottom corner of texture
+        sprites.append(
+            f"    - serializedVersion: 2\n"
+            f"      name: {sprite_name}\n"
+            f"      rect:\n"
+            f"        serializedVersion: 2\n"
+            f"        x: {left}\n"
+            f"        y: {height - top - sprite_size}\n"
+            f"        width: {sprite_size}\n"
+            f"        height: {sprite_size}\n"
+            f"      alignment: 9\n"
+            f"      pivot: {{x: {pivot[0]}, y: {pivot[1]}}}\n"
+            f"      border: {{x: 0, y: 0, z: 0, w: 0}}\n"
+            f"      outline: []\n"
+            f"      physicsShape: []\n"
+            f"      tessellationDetail: 0\n"
+            f"      bones: []\n"
+            f"      spriteID: {get_guid(name + sprite_name)[:16]}\n"
+            f"      internalID: {internal_id}\n"
+            f"      vertices: []\n"
+            f"      indices: \n"
+            f"      edges: []\n"
+            f"      weights: []\n"
+        )
+
+    folder.mkdir(parents=True, exist_ok=True)
+    texture_path = folder / f"{name}.png"
+    image.save(texture_path)
+
+    meta_path = texture_path.with_name(texture_path.name + ".meta")
+    meta_path.write_text(
+        "fileFormatVersion: 2\n"
+        f"guid: {get_guid(texture_path.name)}\n"
+        "TextureImporter:\n"
+        "  internalIDToNameTable:\n"
+        f"{"".join(table)}"
+        "  externalObjects: {}\n"
+        "  serializedVersion: 12\n"
+        "  spriteMode: 2\n"
+        "  spriteSheet:\n"
+        "    serializedVersion: 2\n"
+        "    sprites:\n"
+        f"{"".join(sprites)}"
+        "    outline: []\n"
+        "    physicsShape: []\n"
+        "    bones: []\n"
+        "    spriteID: \n"
+        "    internalID: 0\n"
+        "  spritePackingTag: \n"
+        "  userData: \n"
+        "  assetBundleName: \n",
+        encoding="UTF-8")
+    return meta_path
+
+
+def write_tilemap_prefab(path: Path, texture_guid: str, tile_sprites: int, tiles: int, layers: int) -> Path:
+    """
+    Prefab with square tilemap layers, tiles use sprites of texture by their internal ids and some are flipped
+    """
+    side = max(1, math.ceil(math.sqrt(tiles)))
+    matrices = [(1, 1), (-1, 1), (1, -1)]
+
+    parts = [_UNITY_HEADER,
+             "--- !u!1 &100\nGameObject:\n  m_ObjectHideFlags: 0\n  m_Name: Grid\n"
+             "  m_Component:\n  - component: {fileID: 400}\n",
+             "--- !u!4 &400\nTransform:\n  m_GameObject: {fileID: 100}\n"
+             "  m_LocalPosition: {x: 0, y: 0, z: 0}\n  m_Children: []\n"]
+
+    for layer in range(layers):
+        parts.append(f"--- !u!{_TILEMAP_CLASS_ID} &{-1000 - layer}\nTilemap:\n  m_ObjectHideFlags: 0\n  m_Tiles:\n")
+        for i in range(tiles):
+            # layers are shifted, so they overlap only partially
+            x, y = (i + layer) % side, (i + layer) // side
+            parts.append(
+                f"  - first: {{x: {x}, y: {-y}, z: 0}}\n"
+                f"    second:\n"
+                f"      serializedVersion: 2\n"
+                f"      m_TileIndex: {(i * 7 + layer) % tile_sprites}\n"
+                f"      m_TileSpriteIndex: {(i * 7 + layer) % tile_sprites}\n"
+                f"      m_TileMatrixIndex: {i % len(matrices)}\n"
+                f"      m_TileColorIndex: 0\n"
+                f"      m_TileObjectToInstantiateIndex: 65535\n"
+                f"      dummyAlignment: 0\n"
+                f"      m_AllTileFlags: 1073741825\n"
+            )
+
+        parts.append("  m_TileSpriteArray:\n")
+        parts.extend(f"  - m_RefCount: 1\n    m_Data: {{fileID: {21300000 + i}, guid: {texture_guid}, type: 3}}\n"
+                     for i in range(tile_sprites))
+
+        parts.append("  m_TileMatrixArray:\n")
+        for e00, e11 in matrices:
+            parts.append(
+                "  - m_RefCount: 1\n"
+                "    m_Data:\n"
+                f"      e00: {e00}\n      e01: 0\n      e02: 0\n      e03: 0\n"
+                f"      e10: 0\n      e11: {e11}\n      e12: 0\n      e13: 0\n"
+                "      e20: 0\n      e21: 0\n      e22: 1\n      e23: 0\n"
+                "      e30: 0\n      e31: 0\n      e32: 0\n      e33: 1\n"
+            )
+
+        parts.append(f"  m_Size: {{x: {side}, y: {side}, z: 1}}\n  m_Name: 'Layer: {layer}'\n")
+
+    _write_asset(path, "".join(parts), "PrefabImporter")
+    return path
+
+
+def write_i2languages(path: Path, item_ids: list[str], terms: int) -> Path:
+    """
+    I2Languages with names of items and other terms of several lang types, all languages are filled
+    """
+    langs = [lang.value for lang in Lang]
+    lang_types = ["lang", "weaponLang", "enemiesLang", "stageLang", "characterLang"]
+
+    def term(name: str, value: str) -> str:
+        values = "".join(f"      - {value} {lang}\n" for lang in langs)
+        return f"    - Term: {name}\n      TermType: 0\n      Languages:\n{values}      Flags: \n"
+
+    parts = [_UNITY_HEADER,
+             "--- !u!114 &11400000\nMonoBehaviour:\n  m_ObjectHideFlags: 0\n"
+             f"  m_Name: {I2_LANGUAGES}\n  mSource:\n    mTerms:\n"]
+    for item_id in item_ids:
+        parts.append(term(f"itemLang/{{{item_id}}}name", f"Item {item_id}"))
+        parts.append(term(f"itemLang/{{{item_id}}}description", f"Description of {item_id}"))
+    for i in range(terms):
+        parts.append(term(f"{lang_types[i % len(lang_types)]}/{{TERM_{i}}}text", f"Text {i}"))
+
+    parts.append("    mLanguages:\n")
+    parts.extend(f"    - Name: {lang}\n      Code: {lang}\n" for lang in langs)
+
+    _write_asset(path, "".join(parts), "NativeFormatImporter")
+    return path
+
+
+def write_data(assets: Path, item_ids: list[str]) -> Path:
+    """
+    DataManagerSettings that references json data files (items use sprites of items texture)
+    """
+    items = {
+        item_id: {
+            "texture": ITEMS_TEXTURE,
+            "frameName": f"{item_id.lower()}.png",
+            "collectionFrame": UI_FRAMES[0],
+            "isRelic": i % 5 == 0,
+            "rarity": i % 100,
+        }
+        for i, item_id in enumerate(item_ids)
+    }
+    weapons = {f"WEAPON_{i}": [{"level": 1, "power": i}, {"power": i + 1}] for i in range(len(item_ids))}
+
+    item_guid = _write_asset(assets / TEXT_ASSET / "itemData.json", json.dumps(items, indent=2), "TextScriptImporter")
+    weapon_guid = _write_asset(assets / TEXT_ASSET / "weaponData.json", json.dumps(weapons, indent=2),
+                               "TextScriptImporter")
+
+    path = assets / MONO_BEHAVIOUR / f"{DATA_MANAGER_SETTINGS}.asset"
+    _write_asset(path, _UNITY_HEADER +
+                 "--- !u!114 &11400000\nMonoBehaviour:\n  m_ObjectHideFlags: 0\n"
+                 f"  m_Name: {DATA_MANAGER_SETTINGS}\n  _Settings:\n"
+                 f"    _ItemDataJsonAsset: {{fileID: 4900000, guid: {item_guid}, type: 3}}\n"
+                 f"    _WeaponDataJsonAsset: {{fileID: 4900000, guid: {weapon_guid}, type: 3}}\n",
+                 "NativeFormatImporter")
+    return path
+
+
+def create_assets(root: Path, size: BenchSize) -> SyntheticAssets:
+    assets = root / EXPORTED_PROJECT / ASSETS
+    item_ids = [f"ITEM_{i}" for i in range(size.sprites)]
+
+    items_meta = write_spritesheet(assets / TEXTURE_2D, ITEMS_TEXTURE, [item_id.lower() for item_id in item_ids])
+    tiles_meta = write_spritesheet(assets / TEXTURE_2D, TILES_TEXTURE,
+                                   [f"tile_{i}" for i in range(size.tile_sprites)], pivot=(0, 0))
+    ui_meta = write_spritesheet(assets / TEXTURE_2D, UI_TEXTURE, list(UI_FRAMES), FRAME_SIZE)
+
+    prefab = write_tilemap_prefab(assets / GAME_OBJECT / f"{PREFAB_NAME}.prefab", get_guid(f"{TILES_TEXTURE}.png"),
+                                  size.tile_sprites, size.tiles, size.layers)
+    i2languages = write_i2languages(assets / RESOURCES / f"{I2_LANGUAGES}.asset", item_ids, size.terms)
+    data_settings = write_data(assets, item_ids)
+
+    return SyntheticAssets(size, root, assets, items_meta, tiles_meta, ui_meta, prefab, i2languages, data_settings)
+
+
+def reset_handlers() -> None:
+    """
+    Forgets everything loaded by handlers, so next access loads it again
+    """
+    if MetaDataHandler.loaded_game is not None:
+        MetaDataHandler.unload()
+    MetaDataHandler.loaded_game = None
+    DataHandler._loaded_data.clear()
+    DataHandler._concat_data.clear()
+    LangHandler._full_file = None
+    LangHandler._loaded_data.clear()
+    tilemap_gen.TilemapDataHandler.loaded_prefabs.clear()
+
+
+@contextmanager
+def use_assets(assets: SyntheticAssets, work_folder: Path, is_multiprocess: bool = False):
+    """
+    Points config to synthetic assets and redirects every file that handlers and generators write
+    (asset index, meta and tilemap caches, generated images) to work_folder. Previous state is restored on exit.
+    """
+    empty_folder = work_folder / "Empty"
+    empty_folder.mkdir(parents=True, exist_ok=True)
+    cache_folder = work_folder / "MetaCache"
+    tilemap_cache_folder = work_folder / "TilemapCache"
+
+    for key in CfgKey.get_assets_keys():
+        Config.set_override(key, assets.root if key == DLCType.VS.value.config_key else empty_folder)
+    Config.set_override(CfgKey.MULTIPROCESSING, is_multiprocess)
+    reset_handlers()
+
+    def load_cached(guid, stat, cache_folder_=cache_folder):
+        return load_cached_texture_meta(guid, stat, cache_folder_)
+
+    def save_cached(texture_meta, stat, cache_folder_=cache_folder):
+        return save_cached_texture_meta(texture_meta, stat, cache_folder_)
+
+    def load_cached_tiles(path, stat, cache_folder_=tilemap_cache_folder):
+        return load_cached_tilemaps(path, stat, cache_folder_)
+
+    def save_cached_tiles(path, tilemaps, stat, cache_folder_=tilemap_cache_folder):
+        return save_cached_tilemaps(path, tilemaps, stat, cache_folder_)
+
+    try:
+        with mock.patch.object(MetaDataHandler, "_asset_index_path", work_folder / "AssetIndex.sqlite"), \
+                mock.patch.object(meta_data_module, "load_cached_texture_meta", load_cached), \
+                mock.patch.object(meta_data_module, "save_cached_texture_meta", save_cached), \
+                mock.patch.object(image_gen_new, "IMAGES_FOLDER", work_folder / "Images"), \
+                mock.patch.object(tilemap_gen, "load_cached_tilemaps", load_cached_tiles), \
+                mock.patch.object(tilemap_gen, "save_cached_tilemaps", save_cached_tiles), \
+                mock.patch.object(tilemap_gen, "IMAGES_FOLDER", work_folder / "Images"):
+            yield
+    finally:
+        reset_handlers()
+        for key in CfgKey.get_assets_keys():
+            Config.set_override(key, None)
+        Config.set_override(CfgKey.MULTIPROCESSING, None)
+
+
+def clear_folder(path: Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
@@ -1,12 +1,32 @@
 import unittest
 
-from _Tests import multirun_tests, unpacker_open_tests
+from _Tests import multirun_tests, unpacker_open_tests, unityparser_tests, meta_parser_tests, \
+    asset_index_tests, meta_cache_tests, atlas_tests, image_ops_tests, transparent_save_tests, \
+    anim_export_tests, image_sink_tests, build_manifest_tests, unpacker_cli_tests, build_tests, timer_tests, \
+    benchmarks_tests, tilemap_tests, png_stream_tests, tilemap_pyramid_tests
 
 
 def load_tests(loader, tests, pattern):
     suite = unittest.TestSuite()
     suite.addTests(loader.loadTestsFromModule(multirun_tests))
     suite.addTests(loader.loadTestsFromModule(unpacker_open_tests))
+    suite.addTests(loader.loadTestsFromModule(unityparser_tests))
+    suite.addTests(loader.loadTestsFromModule(meta_parser_tests))
+    suite.addTests(loader.loadTestsFromModule(asset_index_tests))
+    suite.addTests(loader.loadTestsFromModule(meta_cache_tests))
+    suite.addTests(loader.loadTestsFromModule(atlas_tests))
+    suite.addTests(loader.loadTestsFromModule(image_ops_tests))
+    suite.addTests(loader.loadTestsFromModule(transparent_save_tests))
+    suite.addTests(loader.loadTestsFromModule(anim_export_tests))
+    suite.addTests(loader.loadTestsFromModule(image_sink_tests))
+    suite.addTests(loader.loadTestsFromModule(build_manifest_tests))
+    suite.addTests(loader.loadTestsFromModule(unpacker_cli_tests))
+    suite.addTests(loader.loadTestsFromModule(build_tests))
+    suite.addTests(loader.loadTestsFromModule(timer_tests))
+    suite.addTests(loader.loadTestsFromModule(benchmarks_tests))
+    suite.addTests(loader.loadTestsFromModule(tilemap_tests))
+    suite.addTests(loader.loadTestsFromModule(png_stream_tests))
+    suite.addTests(loader.loadTestsFromModule(tilemap_pyramid_tests))
 
     return suite
 
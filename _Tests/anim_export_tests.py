@@ -0,0 +1,59 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+import Source.Images.transparent_save as tr_save
+from Source.Images.anim_export import AnimationExporter
+from Source.Utility.multirun import MultiprocessHandler
+
+
+def _make_frames(count: int = 4, size: int = 16) -> list[Image.Image]:
+    return [Image.new("RGBA", (size, size), (40 * i, 255 - 40 * i, 0, 255 if i % 2 else 128)) for i in range(count)]
+
+
+class AnimationExporterTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        MultiprocessHandler.shutdown()
+
+    def test_export(self):
+        selected = [True] * len(tr_save.SAVE_DATA)
+        frames = _make_frames()
+
+        for is_multiprocess in [True, False]:
+            with self.subTest(is_multiprocess), tempfile.TemporaryDirectory() as tmp:
+                progress = []
+                exporter = AnimationExporter(selected, lambda c, t: progress.append((c, t)),
+                                             is_multiprocess=is_multiprocess)
+                exporter.expected_total = 2 * exporter.get_formats_count()
+                exporter.add_frames(frames, 100, Path(tmp), "first")
+                exporter.add_frames(frames, 100, Path(tmp), "second")
+                exporter.join()
+
+                total = exporter.expected_total
+                self.assertEqual(progress, [(c, total) for c in range(1, total + 1)])
+                for ext, folder, _ in tr_save.SAVE_DATA:
+                    for name in ["first", "second"]:
+                        path = Path(tmp, folder, f"{name}{ext}")
+                        self.assertTrue(path.exists(), path)
+                        with Image.open(path) as image:
+                            self.assertEqual(image.n_frames, len(frames))
+
+    def test_selected_formats(self):
+        selected = [False] * len(tr_save.SAVE_DATA)
+        selected[-1] = True
+
+        with tempfile.TemporaryDirectory() as tmp:
+            exporter = AnimationExporter(selected, is_multiprocess=False)
+            self.assertEqual(exporter.get_formats_count(), 1)
+            exporter.add_frames(_make_frames(), 100, Path(tmp), "anim")
+            exporter.join()
+
+            ext, folder, _ = tr_save.SAVE_DATA[-1]
+            self.assertEqual([p.relative_to(tmp) for p in Path(tmp).rglob("*.*")], [Path(folder, f"anim{ext}")])
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from Source.Data.asset_index import AssetIndex
+
+
+class AssetIndexTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "index.sqlite"
+        self.root = Path(self.temp_dir.name) / "Assets"
+
+        for rel in ["a.png.meta", "a.png", "sub/b.meta", "sub/deep/c.prefab.meta", "sub/deep/Data_d.asset.meta",
+                    "other/e.txt"]:
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"guid: {path.stem}")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _scan(self, file_name: str = "") -> tuple[set[Path], AssetIndex]:
+        with AssetIndex(self.db_path) as index:
+            return {f.path for f in index.scan(self.root, file_name)}, index
+
+    @staticmethod
+    def _touch_dir(path: Path):
+        # mtime resolution of some file systems is too coarse for test
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_same_as_rglob(self):
+        for file_name in ["", "Data", "b", "none"]:
+            with self.subTest(file_name):
+                found, _ = self._scan(file_name)
+                self.assertEqual(found, set(self.root.rglob(f"{file_name}*.meta")))
+
+    def test_warm_scan(self):
+        _, index = self._scan()
+        self.assertEqual(index.changed_dirs, index.scanned_dirs)
+
+        found, index = self._scan()
+        self.assertEqual(index.changed_dirs, 0)
+        self.assertEqual(found, set(self.root.rglob("*.meta")))
+
+    def test_changed_dirs(self):
+        self._scan()
+
+        (self.root / "sub/deep/new.meta").write_text("guid: new")
+        self._touch_dir(self.root / "sub/deep")
+        shutil.rmtree(self.root / "other")
+        self._touch_dir(self.root)
+
+        found, index = self._scan()
+        self.assertEqual(index.changed_dirs, 2)
+        self.assertEqual(found, set(self.root.rglob("*.meta")))
+
+        found, index = self._scan()
+        self.assertEqual(index.changed_dirs, 0)
+        self.assertEqual(found, set(self.root.rglob("*.meta")))
+
+    def test_guids(self):
+        with AssetIndex(self.db_path) as index:
+            files = index.scan(self.root)
+            self.assertTrue(all(f.guid is None for f in files))
+            index.set_guids((f.path, f.path.stem) for f in files)
+
+        with AssetIndex(self.db_path) as index:
+            files = index.scan(self.root)
+            self.assertTrue(all(f.guid == f.path.stem for f in files))
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,125 @@
+import pickle
+import tempfile
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from Source.Utility.atlas import Atlas
+from Source.Utility.image_functions import crop_image_rect_left_bot
+from Source.Utility.sprite_data import SpriteRect, SpriteData, AnimationData
+
+
+def _make_image(mode: str = "RGBA", size=(64, 32)) -> Image.Image:
+    image = Image.new(mode, size)
+    image.putdata([(x * 7 + y * 3) % 256 if mode in ("L", "P") else ((x * 7) % 256, (y * 5) % 256, x ^ y, 255)
+                   for y in range(size[1]) for x in range(size[0])])
+    return image
+
+
+def _decode_to_shared(atlas: Atlas, shm_name: str) -> tuple[Atlas, bool]:
+    return atlas, atlas.decode_to_shared(shm_name)
+
+
+class AtlasTests(TestCase):
+    rects = [SpriteRect(0, 0, 16, 16), SpriteRect(16, 8, 8, 24), SpriteRect(40, 0, 24, 32)]
+
+    def test_crop(self):
+        for mode in ["RGBA", "L", "P"]:
+            with self.subTest(mode):
+                image = _make_image(mode)
+                atlas = Atlas(image=image.copy())
+                for rect in self.rects:
+                    expected = crop_image_rect_left_bot(image, rect)
+                    self.assertEqual(atlas.crop(rect).tobytes(), expected.tobytes())
+                    self.assertEqual(atlas.crop(rect).mode, expected.mode)
+
+    def test_lazy_decode(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "atlas.png"
+            _make_image().save(path)
+
+            atlas = Atlas(path)
+            self.assertEqual(atlas.size, (64, 32))
+            self.assertFalse(atlas.is_decoded())
+            atlas.crop(self.rects[0])
+            self.assertTrue(atlas.is_decoded())
+
+    def test_content_hash(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "atlas.png"
+            _make_image().save(path)
+
+            atlas = Atlas(path)
+            content_hash = atlas.get_content_hash()
+            self.assertFalse(atlas.is_decoded())
+            self.assertEqual(Atlas(path).get_content_hash(), content_hash)
+
+            _make_image(size=(64, 64)).save(path)
+            self.assertNotEqual(Atlas(path).get_content_hash(), content_hash)
+
+        self.assertEqual(Atlas(image=_make_image()).get_content_hash(), Atlas(image=_make_image()).get_content_hash())
+
+    def test_cache_limit(self):
+        atlas = Atlas(image=_make_image(), cache_max_bytes=16 * 16 * 4)
+        first = atlas.crop(self.rects[0])
+        self.assertIs(atlas.crop(self.rects[0]), first)
+
+        atlas.crop(self.rects[1])
+        self.assertIsNot(atlas.crop(self.rects[0]), first)
+        self.assertEqual(atlas.crop(self.rects[0]).tobytes(), first.tobytes())
+
+    def test_pickle(self):
+        image = _make_image()
+        atlas = pickle.loads(pickle.dumps(Atlas(image=image)))
+        self.assertEqual(atlas.image.tobytes(), image.tobytes())
+        self.assertEqual(atlas.crop(self.rects[2]).tobytes(), crop_image_rect_left_bot(image, self.rects[2]).tobytes())
+
+    def test_shared_memory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for mode, expected_size in [("RGBA", 64 * 32 * 4), ("L", 64 * 32), ("P", None)]:
+                with self.subTest(mode):
+                    path = Path(temp_dir) / f"atlas_{mode}.png"
+                    image = _make_image(mode)
+                    image.save(path)
+
+                    atlas = Atlas(path)
+                    size = atlas.get_shared_size()
+                    self.assertEqual(size, expected_size)
+                    if size is None:
+                        continue
+
+                    shm = SharedMemory(create=True, size=size)
+                    try:
+                        with Pool(1) as pool:
+                            atlas, is_decoded = pool.apply(_decode_to_shared, (atlas, shm.name))
+                        self.assertTrue(is_decoded)
+                        self.assertFalse(atlas.is_decoded())
+
+                        atlas.load_from_shared(shm)
+                    finally:
+                        shm.close()
+                        shm.unlink()
+
+                    self.assertEqual(atlas.image.tobytes(), image.tobytes())
+                    self.assertEqual(atlas.crop(self.rects[1]).tobytes(),
+                                     crop_image_rect_left_bot(image, self.rects[1]).tobytes())
+
+    def test_sprite_data(self):
+        image = _make_image()
+        atlas = Atlas(image=image)
+        sprites = [SpriteData(f"s_{i}", f"s_{i}", {i}, rect, {"x": 0.5, "y": 0.5}, atlas)
+                   for i, rect in enumerate(self.rects)]
+
+        self.assertEqual(sprites[1].sprite.size, (8, 24))
+        animation = AnimationData("s", [s.name for s in sprites], self.rects, sprites)
+        self.assertEqual([s.tobytes() for s in animation.get_sprites()], [s.sprite.tobytes() for s in sprites])
+
+        sprites[0].sprite = image
+        self.assertIs(sprites[0].sprite, image)
+
+
+if __name__ == "__main__":
+    ut_main()
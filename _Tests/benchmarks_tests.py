@@ -0,0 +1,56 @@
+import io
+import json
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from _Tests.Benchmarks import bench
+from _Tests.Benchmarks.fixtures import SIZES, create_assets, use_assets, ITEMS_TEXTURE
+from Source.Config.config import CfgKey, Config, Game
+from Source.Data.meta_data import MetaDataHandler
+
+
+class BenchmarksTests(TestCase):
+    def test_fixtures(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["tiny"])
+
+            with use_assets(assets, Path(tmp, "Work")):
+                self.assertEqual(Config[CfgKey.VS], assets.root)
+                MetaDataHandler.load(Game.VS)
+                meta = MetaDataHandler.get_meta_by_name(ITEMS_TEXTURE, is_multiprocess=False)
+                meta.init_sprites()
+                self.assertEqual(len(meta.data_id), SIZES["tiny"].sprites)
+
+            self.assertIsNone(MetaDataHandler.loaded_game)
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp, "results.json")
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                code = bench.main(["--size", "tiny", "--repeat", "1", "--output", str(output)])
+            self.assertEqual(code, 0)
+
+            results = json.loads(output.read_text(encoding="UTF-8"))
+            self.assertEqual(results["version"], bench.BENCH_VERSION)
+            self.assertIn("gen_tilemap", results["cases"])
+            self.assertIn("image_generator", results["cases"])
+            for result in results["cases"].values():
+                self.assertEqual(len(result["runs"]), 1)
+                self.assertGreater(result["min"], 0)
+
+    def test_compare(self):
+        baseline = {"cases": {"a": {"min": 1.0}, "b": {"min": 1.0}, "c": {"min": 0.001}, "old": {"min": 1.0}}}
+        results = {"cases": {"a": {"min": 1.2}, "b": {"min": 1.5}, "c": {"min": 0.002}, "new": {"min": 1.0}}}
+
+        comparisons = {c["name"]: c for c in bench.compare(results, baseline, threshold=0.25, min_delta=0.005)}
+        self.assertEqual(set(comparisons), {"a", "b", "c"})
+        self.assertFalse(comparisons["a"]["is_regression"])
+        self.assertTrue(comparisons["b"]["is_regression"])
+        # twice slower, but difference is noise
+        self.assertFalse(comparisons["c"]["is_regression"])
+
+
+if __name__ == "__main__":
+    ut_main()
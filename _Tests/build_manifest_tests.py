@@ -0,0 +1,122 @@
+import io
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from _Tests.Benchmarks.fixtures import SIZES, create_assets, use_assets
+from Source.Config.config import DLCType, Game
+from Source.Data.data import DataType
+from Source.Data.meta_data import MetaDataHandler
+from Source.Images.build_manifest import BuildManifest, get_digest, MANIFEST_NAME
+from Source.Images.image_gen_new import ItemImageGenerator, GenType
+
+
+class BuildManifestTests(TestCase):
+    def _build(self, folder: Path, files: dict[str, tuple[str, dict]]) -> BuildManifest:
+        """
+        Writes files, which need rebuild, as generator would do
+        """
+        manifest = BuildManifest(folder)
+        for name, (group, inputs) in files.items():
+            path = folder / name
+            if manifest.need_rebuild(path, get_digest(inputs), group):
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(str(inputs))
+        return manifest
+
+    def test_digest(self):
+        self.assertEqual(get_digest({"a": 1, "b": [1, 2]}), get_digest({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(get_digest({"a": 1}), get_digest({"a": 2}))
+
+    def test_incremental(self):
+        files = {
+            "BASE_GAME/a.png": ("IMAGE", {"id": "a"}),
+            "BASE_GAME/b.png": ("IMAGE", {"id": "b"}),
+            "BASE_GAME/Icon/a.png": ("IMAGE_FRAME", {"id": "a"}),
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            manifest = self._build(folder, files)
+            manifest.save()
+            self.assertEqual((manifest.rebuilt, manifest.skipped), (3, 0))
+            self.assertTrue((folder / MANIFEST_NAME).exists())
+
+            manifest = self._build(folder, files)
+            manifest.save()
+            self.assertEqual((manifest.rebuilt, manifest.skipped), (0, 3))
+
+            files["BASE_GAME/b.png"] = ("IMAGE", {"id": "b", "changed": True})
+            (folder / "BASE_GAME/a.png").unlink()
+            manifest = self._build(folder, files)
+            manifest.save()
+            self.assertEqual((manifest.rebuilt, manifest.skipped), (2, 1))
+
+    def test_remove_stale(self):
+        files = {
+            "a.png": ("IMAGE", {"id": "a"}),
+            "b.png": ("IMAGE", {"id": "b"}),
+            "Icon/a.png": ("IMAGE_FRAME", {"id": "a"}),
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            self._build(folder, files).save()
+
+            # only images are generated, without entry 'b'
+            manifest = self._build(folder, {"a.png": files["a.png"]})
+            self.assertEqual(manifest.remove_stale({"IMAGE"}), [folder / "b.png"])
+            manifest.save()
+
+            self.assertFalse((folder / "b.png").exists())
+            self.assertTrue((folder / "Icon/a.png").exists())
+
+            manifest = self._build(folder, {"Icon/a.png": files["Icon/a.png"]})
+            self.assertEqual((manifest.rebuilt, manifest.skipped), (0, 1))
+            self.assertEqual(manifest.remove_stale({"IMAGE_FRAME"}), [])
+            self.assertIn("removed: 0", manifest.get_summary())
+
+    def test_discard(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            manifest = self._build(folder, {"a.png": ("IMAGE", {"id": "a"})})
+            manifest.discard(folder / "a.png")
+            manifest.save()
+
+            manifest = self._build(folder, {"a.png": ("IMAGE", {"id": "a"})})
+            self.assertEqual(manifest.rebuilt, 1)
+
+    def test_broken_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            (folder / MANIFEST_NAME).write_text("{broken")
+            manifest = self._build(folder, {"a.png": ("IMAGE", {"id": "a"})})
+            self.assertEqual(manifest.rebuilt, 1)
+
+    def test_unchanged_generator_run(self):
+        def run_generator() -> ItemImageGenerator:
+            MetaDataHandler.loaded_assets_meta.clear()
+            gen = ItemImageGenerator(DLCType.VS, DataType.ITEM, {GenType.IMAGE: 1, GenType.IMAGE_FRAME: True})
+            with gen.image_sink:
+                gen.main_generator(DLCType.VS, DataType.ITEM)
+            gen.finish_build()
+            return gen
+
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["tiny"])
+            with use_assets(assets, Path(tmp, "Work")), redirect_stdout(io.StringIO()):
+                MetaDataHandler.load(Game.VS)
+
+                gen = run_generator()
+                self.assertGreater(gen.build_manifest.rebuilt, 0)
+
+                # entries are checked by digest before rendering, so atlases are not decoded at all
+                gen = run_generator()
+                self.assertEqual(gen.build_manifest.rebuilt, 0)
+                self.assertGreater(gen.build_manifest.skipped, 0)
+                self.assertFalse(any(meta.atlas.is_decoded() for meta in gen.meta_data.values()))
+
+
+if __name__ == "__main__":
+    ut_main()
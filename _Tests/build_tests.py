@@ -0,0 +1,192 @@
+import io
+import tempfile
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from pathlib import Path
+from threading import Barrier
+from unittest import TestCase, mock, main as ut_main
+
+from _Tests.Benchmarks.fixtures import SIZES, create_assets, use_assets
+import Source.Data.meta_data as meta_data_module
+from Source.Config.config import DLCType, Game
+from Source.Data.data import DataHandler, DataType
+from Source.Data.meta_data import MetaDataHandler
+from Source.Images.image_gen_new import ImageGeneratorManager, GenType
+from Source.Pipelines.build import BuildOrchestrator, BuildTask, TaskStatus, get_path_signature
+from Source.Pipelines.errors import PipelineError
+
+
+class BuildTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self._tmp.name)
+        self.state_path = self.folder / "BuildState.json"
+        self.source = self.folder / "source.txt"
+        self.source.write_text("1")
+        self.calls: list[str] = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _task(self, name: str, deps: tuple[str, ...] = (), is_input=True) -> BuildTask:
+        def func(progress):
+            self.calls.append(name)
+            output = self.folder / f"{name}.out"
+            output.write_text(self.source.read_text())
+            return output
+
+        return BuildTask(name, func, deps, inputs=(lambda: [self.source]) if is_input else None)
+
+    def _tasks(self) -> list[BuildTask]:
+        return [
+            self._task("images", ("load",)),
+            self._task("load", is_input=False),
+            self._task("data", ("load",)),
+            self._task("concat", ("data",)),
+        ]
+
+    def _run(self, tasks: list[BuildTask], **kwargs) -> dict[str, TaskStatus]:
+        results = BuildOrchestrator(tasks, self.state_path, **kwargs).run()
+        return {result.name: result.status for result in results}
+
+    def test_order(self):
+        statuses = self._run(self._tasks())
+
+        self.assertTrue(all(status == TaskStatus.DONE for status in statuses.values()))
+        self.assertEqual(self.calls[0], "load")
+        self.assertLess(self.calls.index("data"), self.calls.index("concat"))
+
+    def test_concurrent(self):
+        # both tasks must be running at the same time to pass barrier
+        barrier = Barrier(2, timeout=5)
+        tasks = [BuildTask(name, lambda progress: barrier.wait() and None) for name in ("a", "b")]
+
+        statuses = self._run(tasks, max_workers=2)
+        self.assertEqual(statuses, {"a": TaskStatus.DONE, "b": TaskStatus.DONE})
+
+    def test_concurrent_state(self):
+        # every finished task saves state, saves of parallel tasks must not break each other
+        tasks = [self._task(f"task_{i}") for i in range(16)]
+        statuses = self._run(tasks, max_workers=8)
+        self.assertTrue(all(status == TaskStatus.DONE for status in statuses.values()))
+        self.assertEqual(list(self.folder.glob("*.tmp")), [])
+
+        self.calls.clear()
+        statuses = self._run(tasks, max_workers=8)
+        self.assertTrue(all(status == TaskStatus.SKIPPED for status in statuses.values()))
+
+    def test_concurrent_image_tasks(self):
+        # generators of items and weapons both need UI texture, it must be loaded once
+        loaded = Counter()
+        get_meta = meta_data_module._get_meta
+
+        def get_meta_slow(path):
+            loaded[path.name] += 1
+            time.sleep(0.05)
+            return get_meta(path)
+
+        barrier = Barrier(2, timeout=5)
+
+        def image_task(data_type: DataType) -> BuildTask:
+            def func(progress):
+                barrier.wait()
+                return ImageGeneratorManager.run_generator(DLCType.VS, data_type, {GenType.IMAGE: 1}, progress)
+            return BuildTask(f"images:{data_type.value}", func)
+
+        assets = create_assets(self.folder / "Assets", SIZES["tiny"])
+        with use_assets(assets, self.folder / "Work"), redirect_stdout(io.StringIO()), \
+                mock.patch.object(meta_data_module, "_get_meta", get_meta_slow):
+            MetaDataHandler.load(Game.VS)
+            DataHandler.load()
+            statuses = self._run([image_task(DataType.ITEM), image_task(DataType.WEAPON)], max_workers=2)
+
+        self.assertTrue(all(status == TaskStatus.DONE for status in statuses.values()))
+        self.assertTrue(loaded)
+        self.assertEqual(set(loaded.values()), {1})
+
+    def test_skip_unchanged(self):
+        self._run(self._tasks())
+        self.calls.clear()
+
+        statuses = self._run(self._tasks())
+        self.assertEqual(self.calls, ["load"])
+        self.assertEqual(statuses["concat"], TaskStatus.SKIPPED)
+
+        (self.folder / "concat.out").unlink()
+        self.calls.clear()
+        self._run(self._tasks())
+        self.assertEqual(sorted(self.calls), ["concat", "load"])
+
+        self.calls.clear()
+        self._run(self._tasks(), is_force=True)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_rebuild_changed(self):
+        self._run(self._tasks())
+        self.calls.clear()
+
+        self.source.write_text("22")
+        self._run(self._tasks())
+        self.assertEqual(sorted(self.calls), ["concat", "data", "images", "load"])
+        self.assertEqual((self.folder / "concat.out").read_text(), "22")
+
+        changed = self._tasks()
+        changed[2].params = {"scale": 2}
+        self.calls.clear()
+        self._run(changed)
+        # dependent task is rebuilt too
+        self.assertEqual(sorted(self.calls), ["concat", "data", "load"])
+
+    def test_failed(self):
+        def fail(progress):
+            raise PipelineError("no assets")
+
+        tasks = self._tasks()
+        tasks[2].func = fail
+
+        statuses = self._run(tasks)
+        self.assertEqual(statuses["data"], TaskStatus.FAILED)
+        self.assertEqual(statuses["concat"], TaskStatus.BLOCKED)
+        self.assertEqual(statuses["images"], TaskStatus.DONE)
+
+        # failed task is not remembered
+        self.calls.clear()
+        self.assertEqual(self._run(self._tasks())["data"], TaskStatus.DONE)
+
+    def test_graph_errors(self):
+        with self.assertRaises(ValueError):
+            BuildOrchestrator([self._task("a", ("b",)), self._task("b", ("a",))], self.state_path)
+        with self.assertRaises(ValueError):
+            BuildOrchestrator([self._task("a", ("missing",))], self.state_path)
+        with self.assertRaises(ValueError):
+            BuildOrchestrator([self._task("a"), self._task("a")], self.state_path)
+
+    def test_plan(self):
+        orchestrator = BuildOrchestrator(self._tasks(), self.state_path)
+        plan = orchestrator.plan()
+        self.assertEqual([task.name for task, _ in plan], ["load", "images", "data", "concat"])
+        self.assertTrue(all(status == TaskStatus.RUN for _, status in plan))
+        self.assertEqual(self.calls, [])
+
+        orchestrator.run()
+        plan = BuildOrchestrator(self._tasks(), self.state_path).plan()
+        self.assertEqual({task.name: status for task, status in plan},
+                         {"load": TaskStatus.RUN, "images": TaskStatus.SKIP,
+                          "data": TaskStatus.SKIP, "concat": TaskStatus.SKIP})
+        self.assertIn("concat", BuildOrchestrator.get_plan_report(plan))
+
+    def test_path_signature(self):
+        sub = self.folder / "sub"
+        sub.mkdir()
+        (sub / "a.png").write_bytes(b"1")
+        signature = get_path_signature(self.folder)
+
+        self.assertEqual(signature, get_path_signature(self.folder))
+        (sub / "a.png").write_bytes(b"12")
+        self.assertNotEqual(signature, get_path_signature(self.folder))
+        self.assertEqual(get_path_signature(self.folder / "missing"), [str(self.folder / "missing"), None])
+
+
+if __name__ == "__main__":
+    ut_main()
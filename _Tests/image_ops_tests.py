@@ -0,0 +1,75 @@
+import os
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from Source.Utility.image_functions import apply_tint, make_image_black
+from Source.Utility.image_ops import map_bands, threshold_mask, fill_by_mask, make_lut
+
+
+def _apply_tint_per_pixel(image: Image.Image, tint_color: tuple[int, int, int]) -> Image.Image:
+    img = image.copy().convert('RGBA')
+    pixels = img.load()
+    for x in range(img.width):
+        for y in range(img.height):
+            r, g, b, a = pixels[x, y]
+            pixels[x, y] = (int(r * tint_color[0] / 255), int(g * tint_color[1] / 255),
+                            int(b * tint_color[2] / 255), a)
+    return img
+
+
+def _make_image_black_per_pixel(_image: Image.Image, threshold: int = 10) -> Image.Image:
+    image = _image.copy()
+    pixdata = image.load()
+    for y in range(image.size[1]):
+        for x in range(image.size[0]):
+            pixdata[x, y] = (0, 0, 0, 255) if pixdata[x, y][3] > threshold else (0,) * 4
+    return image
+
+
+def _random_image(mode: str = "RGBA", size=(67, 45)) -> Image.Image:
+    bands = Image.getmodebands(mode)
+    return Image.frombytes(mode, size, os.urandom(size[0] * size[1] * bands))
+
+
+class ImageOpsTests(TestCase):
+    def test_apply_tint(self):
+        for mode in ["RGBA", "RGB", "LA"]:
+            image = _random_image(mode)
+            for tint in [(255, 170, 255), (136, 136, 238), (0, 255, 1), (255, 255, 255)]:
+                with self.subTest(mode=mode, tint=tint):
+                    expected = _apply_tint_per_pixel(image, tint)
+                    result = apply_tint(image, tint)
+                    self.assertEqual(result.mode, expected.mode)
+                    self.assertEqual(result.tobytes(), expected.tobytes())
+
+    def test_make_image_black(self):
+        image = _random_image()
+        for threshold in [0, 10, 254, 255]:
+            with self.subTest(threshold=threshold):
+                expected = _make_image_black_per_pixel(image, threshold)
+                result = make_image_black(image, threshold)
+                self.assertEqual(result.mode, expected.mode)
+                self.assertEqual(result.tobytes(), expected.tobytes())
+
+    def test_map_bands(self):
+        image = _random_image()
+        result = map_bands(image, {"G": lambda g: 255 - g, "A": make_lut(lambda a: a // 2)})
+        for band, expected in [("R", image.getchannel("R").tobytes()),
+                               ("G", bytes(255 - v for v in image.getchannel("G").tobytes())),
+                               ("A", bytes(v // 2 for v in image.getchannel("A").tobytes()))]:
+            self.assertEqual(result.getchannel(band).tobytes(), expected)
+
+        with self.assertRaises(AssertionError):
+            map_bands(image.convert("RGB"), {"A": lambda a: a})
+
+    def test_fill_by_mask(self):
+        image = _random_image()
+        mask = threshold_mask(image, "R", 127)
+        result = fill_by_mask(image.size, (1, 2, 3, 4), mask, (5, 6, 7, 8))
+        for r, pixel in zip(image.getchannel("R").getdata(), result.getdata()):
+            self.assertEqual(pixel, (1, 2, 3, 4) if r > 127 else (5, 6, 7, 8))
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+from pathlib import Path
+from threading import Event
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from Source.Images.image_sink import ImageSink
+
+
+def _random_image(size: int = 64) -> Image.Image:
+    return Image.frombytes("RGBA", (size, size), os.urandom(size * size * 4))
+
+
+class ImageSinkTests(TestCase):
+    def test_save(self):
+        images = [_random_image() for _ in range(10)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with ImageSink(max_workers=4, max_pending=2) as sink:
+                for i, image in enumerate(images):
+                    sink.save(image, Path(tmp, f"folder{i % 3}", "sub", f"{i}.png"), scale=2)
+            self.assertEqual(sink.errors, [])
+
+            for i, image in enumerate(images):
+                with Image.open(Path(tmp, f"folder{i % 3}", "sub", f"{i}.png")) as saved:
+                    self.assertEqual(saved.size, (128, 128))
+                    self.assertEqual(saved.resize(image.size, Image.Resampling.NEAREST).tobytes(), image.tobytes())
+
+    def test_same_path_order(self):
+        images = [Image.new("RGBA", (8, 8), (i, 0, 0, 255)) for i in range(30)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "same.png")
+            with ImageSink(max_workers=4) as sink:
+                for image in images:
+                    sink.save(image, path)
+
+            with Image.open(path) as saved:
+                self.assertEqual(saved.getpixel((0, 0)), (29, 0, 0, 255))
+
+    def test_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "file").write_bytes(b"")
+            sink = ImageSink(max_workers=2)
+            sink.save(_random_image(), Path(tmp, "file", "inside_file.png"))
+            sink.save(_random_image(), Path(tmp, "ok.png"))
+            errors = sink.join()
+
+            self.assertEqual([path for path, _ in errors], [Path(tmp, "file", "inside_file.png")])
+            self.assertTrue(Path(tmp, "ok.png").exists())
+            self.assertEqual(sink.close(), [])
+
+    def test_write_behind(self):
+        release = Event()
+        started = Event()
+        written = []
+
+        class BlockingImage:
+            # saving waits for release, so 'save' of sink must return while write is still running
+            def __init__(self, name: str, error: Exception | None = None):
+                self.name = name
+                self.error = error
+
+            def save(self, path: Path, **kwargs) -> None:
+                started.set()
+                release.wait(5)
+                if self.error:
+                    raise self.error
+                written.append((path.name, self.name))
+
+        sink = ImageSink(max_workers=2, max_pending=8)
+        try:
+            sink.save(BlockingImage("a1"), Path("a.png"))
+            self.assertTrue(started.wait(5))
+            sink.save(BlockingImage("b1"), Path("b.png"))
+            sink.save(BlockingImage("a2"), Path("a.png"))
+            sink.save(BlockingImage("c1", OSError("disk full")), Path("c.png"))
+            self.assertEqual(written, [])
+        finally:
+            release.set()
+            errors = sink.close()
+
+        self.assertEqual([(path, str(error)) for path, error in errors], [(Path("c.png"), "disk full")])
+        self.assertEqual([name for path, name in written if path == "a.png"], ["a1", "a2"])
+        self.assertEqual(sorted(written), [("a.png", "a1"), ("a.png", "a2"), ("b.png", "b1")])
+
+
+if __name__ == "__main__":
+    ut_main()
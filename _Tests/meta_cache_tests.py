@@ -0,0 +1,59 @@
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from Source.Data.meta_cache import load_cached_texture_meta, save_cached_texture_meta
+from Source.Utility.meta_parser import parse_texture_meta_io, TextureMeta
+from _Tests.unity_samples import META_TEXT
+
+
+class MetaCacheTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_folder = Path(self.temp_dir.name) / "MetaCache"
+        self.meta_path = Path(self.temp_dir.name) / "texture.png.meta"
+        self.meta_path.write_text(META_TEXT, encoding="UTF-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _round_trip(self, texture_meta: TextureMeta) -> TextureMeta | None:
+        stat = self.meta_path.stat()
+        save_cached_texture_meta(texture_meta, stat, self.cache_folder)
+        return load_cached_texture_meta(texture_meta.guid, stat, self.cache_folder)
+
+    def test_round_trip(self):
+        texture_meta = parse_texture_meta_io(StringIO(META_TEXT))
+        self.assertEqual(self._round_trip(texture_meta), texture_meta)
+
+    def test_single_sprite(self):
+        texture_meta = TextureMeta("fedcba9876543210fedcba9876543210", [], 21300000)
+        self.assertEqual(self._round_trip(texture_meta), texture_meta)
+
+    def test_unicode_name(self):
+        texture_meta = TextureMeta("0123", [(-1, "кадр_0", {"x": 0.0, "y": 1.0, "width": 2.0, "height": 3.5},
+                                             {"x": 0.5, "y": 0.25})], None)
+        self.assertEqual(self._round_trip(texture_meta), texture_meta)
+
+    def test_invalidation(self):
+        texture_meta = parse_texture_meta_io(StringIO(META_TEXT))
+        self._round_trip(texture_meta)
+
+        stat = self.meta_path.stat()
+        os.utime(self.meta_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(load_cached_texture_meta(texture_meta.guid, self.meta_path.stat(), self.cache_folder))
+        self.assertIsNone(load_cached_texture_meta("missing", stat, self.cache_folder))
+
+    def test_corrupted(self):
+        texture_meta = parse_texture_meta_io(StringIO(META_TEXT))
+        self._round_trip(texture_meta)
+
+        cache_path = self.cache_folder / f"{texture_meta.guid}.bin"
+        cache_path.write_bytes(cache_path.read_bytes()[:-3])
+        self.assertIsNone(load_cached_texture_meta(texture_meta.guid, self.meta_path.stat(), self.cache_folder))
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,64 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from Source.Data.meta_data import _parse_texture_meta_yaml
+from Source.Utility.meta_parser import parse_texture_meta_io
+from _Tests.unity_samples import META_TEXT
+
+SINGLE_META_TEXT = """fileFormatVersion: 2
+guid: fedcba9876543210fedcba9876543210
+TextureImporter:
+  internalIDToNameTable: []
+  externalObjects: {}
+  spriteSheet:
+    serializedVersion: 2
+    sprites: []
+    outline: []
+    spriteID: 5e97eb03825dee720800000000000000
+    internalID: 21300000
+    vertices: []
+  spritePackingTag: 
+"""
+
+
+class MetaParserTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _parse_yaml(self, text: str):
+        path = Path(self.temp_dir.name) / "texture.png.meta"
+        path.write_text(text, encoding="UTF-8")
+        return _parse_texture_meta_yaml(path)
+
+    def test_same_as_yaml(self):
+        fast = parse_texture_meta_io(StringIO(META_TEXT))
+        self.assertIsNotNone(fast)
+        self.assertEqual(fast, self._parse_yaml(META_TEXT))
+        self.assertEqual([row[1] for row in fast.rows], ["bat_0", "bat_1", "frameB"])
+
+    def test_single_sprite(self):
+        fast = parse_texture_meta_io(StringIO(SINGLE_META_TEXT))
+        self.assertIsNotNone(fast)
+        self.assertEqual(fast, self._parse_yaml(SINGLE_META_TEXT))
+        self.assertEqual(fast.sprite_sheet_internal_id, 21300000)
+
+    def test_fallback(self):
+        unknown = {
+            "quoted name": META_TEXT.replace("name: bat_1", "name: 'bat_1'"),
+            "not str name": META_TEXT.replace("name: bat_1", "name: 1"),
+            "block pivot": META_TEXT.replace("pivot: {x: 0.5, y: 0.5}", "pivot:\n        x: 0.5\n        y: 0.5"),
+            "flow table": META_TEXT.replace("  - first:\n      213: 1234\n", "  - first: {213: 1234}\n"),
+            "missing table": META_TEXT.replace("internalIDToNameTable", "fileIDToRecycleName"),
+        }
+        for name, text in unknown.items():
+            with self.subTest(name):
+                self.assertIsNone(parse_texture_meta_io(StringIO(text)))
+
+
+if __name__ == "__main__":
+    ut_main()
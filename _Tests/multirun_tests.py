@@ -1,8 +1,13 @@
 import asyncio
+import time
+from multiprocessing import Pool
+from threading import Timer
 from typing import Iterable
 from unittest import TestCase, main as ut_main
 
-from Source.Utility.multirun import run_multiprocess, run_concurrent_sync, run_gather
+from Source.Utility.multirun import run_multiprocess, run_concurrent_sync, run_gather, MultiprocessHandler, \
+    MultiprocessCancelled, BoundedTaskQueue, _split_chunks_by_cost
+from Source.Utility.timer import Timeit
 
 
 def many_args(a: int, b: int, c: int) -> int:
@@ -61,6 +66,137 @@ class MultiprocessTests(TestCase):
         self.assertEqual(ret, expected)
 
 
+def sleep_arg(a: float) -> float:
+    time.sleep(a)
+    return a
+
+
+class MultiprocessHandlerTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        MultiprocessHandler.shutdown()
+
+    def test_map(self):
+        args = [(n, n - 1, n - 2) for n in range(100)]
+        expected = [many_args(*a) for a in args]
+        for chunksize in [None, 1, 7, 1000]:
+            with self.subTest(chunksize):
+                self.assertEqual(MultiprocessHandler.map(many_args, args, chunksize=chunksize), expected)
+
+    def test_iter_map_in_flight(self):
+        consumed = []
+
+        def gen_args():
+            for n in range(20):
+                consumed.append(n)
+                yield n
+
+        it = MultiprocessHandler.iter_map(single_arg, gen_args(), is_many_args=False, max_in_flight=3)
+        self.assertEqual(next(it), single_arg(0))
+        self.assertLessEqual(len(consumed), 3)
+        self.assertEqual(list(it), [single_arg(n) for n in range(1, 20)])
+
+    def test_shared_pool(self):
+        MultiprocessHandler.map(single_arg, [1], is_many_args=False)
+        pool = MultiprocessHandler.get_pool()
+        MultiprocessHandler.map(single_arg, [1, 2], is_many_args=False)
+        self.assertIs(MultiprocessHandler.get_pool(), pool)
+
+        MultiprocessHandler.shutdown()
+        self.assertFalse(MultiprocessHandler.is_running())
+        self.assertEqual(MultiprocessHandler.map(single_arg, [3], is_many_args=False), [single_arg(3)])
+
+    def test_set_processes(self):
+        pool = MultiprocessHandler.get_pool()
+        processes = MultiprocessHandler.get_processes()
+        result = pool.apply_async(sleep_arg, (0.3,))
+
+        # running task is not cancelled, pool of new size is started when old one has no work
+        MultiprocessHandler.set_processes(processes + 1)
+        try:
+            self.assertIs(MultiprocessHandler.get_pool(), pool)
+            self.assertEqual(MultiprocessHandler.wait_result(pool, result), 0.3)
+
+            self.assertIsNot(MultiprocessHandler.get_pool(), pool)
+            self.assertEqual(MultiprocessHandler.get_processes(), processes + 1)
+            self.assertEqual(MultiprocessHandler.map(single_arg, [3], is_many_args=False), [single_arg(3)])
+        finally:
+            MultiprocessHandler.set_processes(None)
+
+    def test_cancel(self):
+        Timer(0.2, MultiprocessHandler.cancel).start()
+        timeit = Timeit()
+        with self.assertRaises(MultiprocessCancelled):
+            MultiprocessHandler.map(sleep_arg, [10] * 4, is_many_args=False, chunksize=1)
+        self.assertLess(timeit.get_sec(), 5)
+
+        self.assertEqual(MultiprocessHandler.map(single_arg, [4], is_many_args=False), [single_arg(4)])
+
+    def test_split_chunks_by_cost(self):
+        costs = [1, 100, 1, 1, 50, 1, 1, 1, 30, 1]
+        chunks = _split_chunks_by_cost(costs, costs, 4)
+
+        self.assertEqual(sorted(i for chunk in chunks for i in chunk), list(range(len(costs))))
+        self.assertEqual(chunks[0], [1])
+        self.assertEqual(chunks[1], [4])
+        # cheap tasks are grouped with the last expensive one, but not more than in chunk of equal split
+        self.assertEqual(chunks[2], [8, 0, 2])
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 1, 3, 3, 2])
+
+        # costs are unknown (ex: missing files): equal split instead of chunk for every task
+        self.assertEqual([len(chunk) for chunk in _split_chunks_by_cost([0] * 1000, [0] * 1000, 4)], [250] * 4)
+        chunks = _split_chunks_by_cost(range(9), [5, 0, 0, 0, 0, 0, 0, 0, 0], 3)
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 3, 3, 2])
+
+    def test_map_by_cost_zero(self):
+        args = list(range(50))
+        self.assertEqual(MultiprocessHandler.map_by_cost(single_arg, args, lambda arg: 0, is_many_args=False),
+                         [single_arg(a) for a in args])
+
+    def test_map_by_cost(self):
+        args = [(n, n - 1, n - 2) for n in range(100)]
+        expected = [many_args(*a) for a in args]
+        self.assertEqual(MultiprocessHandler.map_by_cost(many_args, args, lambda arg: arg[0] % 7), expected)
+        self.assertEqual(MultiprocessHandler.map_by_cost(many_args, args, lambda arg: 0), expected)
+
+        single = list(range(50))
+        self.assertEqual(MultiprocessHandler.map_by_cost(single_arg, single, float, is_many_args=False),
+                         [single_arg(a) for a in single])
+
+    def test_bounded_task_queue(self):
+        for is_multiprocess in [True, False]:
+            with self.subTest(is_multiprocess):
+                results = []
+                queue = BoundedTaskQueue(results.append, max_in_flight=2, is_multiprocess=is_multiprocess)
+                for n in range(10):
+                    queue.submit(many_args, n, n - 1, n - 2)
+                    self.assertLessEqual(len(queue), 2)
+                queue.join()
+
+                self.assertEqual(len(queue), 0)
+                self.assertEqual(queue.done_count, 10)
+                self.assertEqual(results, [many_args(n, n - 1, n - 2) for n in range(10)])
+
+    def test_per_call_overhead(self):
+        calls = 5
+        args = list(range(8))
+
+        timeit = Timeit()
+        for _ in range(calls):
+            with Pool() as p:
+                p.map(single_arg, args)
+        new_pool_time = timeit.get_sec()
+
+        MultiprocessHandler.map(single_arg, args, is_many_args=False)
+        timeit = Timeit()
+        for _ in range(calls):
+            MultiprocessHandler.map(single_arg, args, is_many_args=False)
+        shared_pool_time = timeit.get_sec()
+
+        # shared pool does not start new processes for every call
+        self.assertLess(shared_pool_time, new_pool_time)
+
+
 class ConcurrentTests(TestCase):
     def test_cc_many_args(self):
         args = [(n, n - 1, n - 2) for n in range(10)]
@@ -0,0 +1,74 @@
+import random
+import zlib
+import tempfile
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from Source.Images.png_stream import PngStreamWriter, encode_png_band
+
+
+class PngStreamTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name, "Out", "image.png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_bands(self):
+        rng = random.Random(1)
+        image = Image.frombytes("RGBA", (37, 23), rng.randbytes(37 * 23 * 4))
+        # transparent and repeated parts, like in tilemaps
+        image.paste((0, 0, 0, 0), (0, 0, 37, 5))
+        image.paste(image.crop((0, 5, 37, 10)), (0, 10))
+
+        with PngStreamWriter(self.path, image.size) as writer:
+            for top, bottom in ((0, 1), (1, 9), (9, 9), (9, 23)):
+                writer.write(image.crop((0, top, 37, bottom)))
+
+        with Image.open(self.path) as result:
+            self.assertEqual(result.mode, "RGBA")
+            self.assertEqual(result.size, image.size)
+            self.assertEqual(result.tobytes(), image.tobytes())
+        self.assertEqual([p.name for p in self.path.parent.iterdir()], ["image.png"])
+
+    def test_encoded_bands(self):
+        rng = random.Random(2)
+        image = Image.frombytes("RGBA", (19, 16), rng.randbytes(19 * 16 * 4))
+        # bands are encoded independently (as in worker processes) and stitched in one deflate stream
+        bands = [encode_png_band(image.crop((0, top, 19, top + 4))) for top in range(0, 16, 4)]
+
+        with PngStreamWriter(self.path, image.size) as writer:
+            for band in bands:
+                writer.write_encoded(band)
+            self.assertRaises(ValueError, writer.write_encoded, bands[0])
+
+        with Image.open(self.path) as result:
+            self.assertEqual(result.tobytes(), image.tobytes())
+
+        data = self.path.read_bytes()
+        idat = data.index(b"IDAT")
+        raw = zlib.decompress(data[idat + 4:idat + 4 + int.from_bytes(data[idat - 4:idat], "big")])
+        self.assertEqual(len(raw), sum(band.raw_size for band in bands))
+
+    def test_wrong_bands(self):
+        with PngStreamWriter(self.path, (4, 4)) as writer:
+            self.assertRaises(ValueError, writer.write, Image.new("RGBA", (5, 1)))
+            self.assertRaises(ValueError, writer.write, Image.new("RGB", (4, 1)))
+            self.assertRaises(ValueError, writer.write, Image.new("RGBA", (4, 5)))
+            writer.write(Image.new("RGBA", (4, 4)))
+
+        # not finished image is not saved
+        with self.assertRaises(ValueError):
+            with PngStreamWriter(self.path, (4, 4)) as writer:
+                writer.write(Image.new("RGBA", (4, 2), (1, 2, 3, 4)))
+                writer.close()
+        with Image.open(self.path) as result:
+            self.assertEqual(result.getpixel((0, 0)), (0, 0, 0, 0))
+        self.assertEqual(len(list(self.path.parent.iterdir())), 1)
+
+
+if __name__ == "__main__":
+    ut_main()
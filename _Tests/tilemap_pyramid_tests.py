@@ -0,0 +1,84 @@
+import io
+import random
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from Source.Images.tilemap_pyramid import PyramidWriter
+
+
+class PyramidWriterTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name, "Pyramid", "map.dzi")
+
+        rng = random.Random(1)
+        self.image = Image.frombytes("RGBA", (150, 83), rng.randbytes(150 * 83 * 4))
+        self.image.paste((0, 0, 0, 0), (0, 0, 150, 40))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, image: Image.Image, band_heights: list[int]) -> str:
+        with PyramidWriter(self.path, image.size, tile_size=32) as writer:
+            top = 0
+            for height in band_heights:
+                writer.write(image.crop((0, top, image.size[0], top + height)))
+                top += height
+        return writer.get_summary()
+
+    def test_levels(self):
+        # odd bands are downscaled together with rows of next bands
+        self._write(self.image, [1, 30, 7, 45])
+
+        self.assertIn('Width="150" Height="83"', self.path.read_text(encoding="UTF-8"))
+        files_folder = self.path.with_name("map_files")
+        # 150 px: levels 8 (full) .. 0 (1x1)
+        self.assertEqual(sorted(int(p.name) for p in files_folder.iterdir() if p.is_dir()), list(range(9)))
+
+        level_image = self.image
+        for level in range(8, -1, -1):
+            for tile_path in (files_folder / str(level)).iterdir():
+                column, row = map(int, tile_path.stem.split("_"))
+                box = (column * 32, row * 32, min(column * 32 + 32, level_image.size[0]),
+                       min(row * 32 + 32, level_image.size[1]))
+                with Image.open(tile_path) as tile:
+                    self.assertEqual(tile.tobytes(), level_image.crop(box).tobytes(), f"{level}/{tile_path.name}")
+            self.assertEqual(len(list((files_folder / str(level)).iterdir())),
+                             -(-level_image.size[0] // 32) * -(-level_image.size[1] // 32))
+            level_image = level_image.reduce(2)
+
+    @staticmethod
+    def _get_tiles(image: Image.Image) -> list[bytes]:
+        tiles = []
+        for _ in range(9):
+            tiles.extend(image.crop((x, y, min(x + 32, image.size[0]), min(y + 32, image.size[1]))).tobytes()
+                         for y in range(0, image.size[1], 32) for x in range(0, image.size[0], 32))
+            image = image.reduce(2)
+        return tiles
+
+    def test_skip_unchanged(self):
+        self.assertIn("rebuilt: 29, skipped: 0", self._write(self.image, [83]))
+        self.assertIn("rebuilt: 0, skipped: 29", self._write(self.image, [50, 33]))
+
+        # tile of full level and tiles covering it on lower levels are changed
+        changed = self.image.copy()
+        changed.paste((1, 2, 3, 255), (130, 70, 150, 83))
+        count_changed = sum(a != b for a, b in zip(self._get_tiles(self.image), self._get_tiles(changed)))
+        self.assertGreater(count_changed, 2)
+        self.assertIn(f"rebuilt: {count_changed}, skipped: {29 - count_changed}", self._write(changed, [83]))
+
+    def test_not_finished(self):
+        with self.assertRaises(ValueError), redirect_stdout(io.StringIO()):
+            with PyramidWriter(self.path, self.image.size) as writer:
+                writer.write(self.image.crop((0, 0, 150, 10)))
+                writer.close()
+        self.assertFalse(self.path.exists())
+        self.assertRaises(ValueError, PyramidWriter(self.path, (4, 4)).write, Image.new("RGBA", (5, 1)))
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,311 @@
+import io
+import os
+import tempfile
+from array import array
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from _Tests.Benchmarks.fixtures import SIZES, create_assets, use_assets, reset_handlers
+from _Tests.unity_samples import PREFAB_TEXT
+from Source.Config.config import CfgKey, Config, Game
+from Source.Data.meta_data import MetaDataHandler
+from Source.Images.tilemap_atlas import ATLAS_FOLDER, export_tilemap_atlas, read_grid, rebuild_layers
+from Source.Images.tilemap_pyramid import PYRAMID_FOLDER
+from Source.Images.tilemap_data import Tilemap, load_cached_tilemaps, save_cached_tilemaps, IDENTITY_MATRIX
+import Source.Images.tilemap_gen as tilemap_gen
+from Source.Images.tilemap_gen import gen_tilemap, TilemapDataHandler
+import Source.Images.tilemap_render as tilemap_render
+from Source.Images.tilemap_render import render_layers
+from Source.Utility.image_functions import affine_transform
+from Source.Utility.multirun import MultiprocessHandler
+from Source.Utility.sprite_data import SpriteData
+from Source.Utility.unityparser2 import UnityDoc
+
+
+class TilemapDataTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_folder = Path(self.temp_dir.name) / "TilemapCache"
+        self.prefab_path = Path(self.temp_dir.name) / "stage.prefab"
+        self.prefab_path.write_text(PREFAB_TEXT, encoding="UTF-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _parse(self) -> list[Tilemap]:
+        entries = UnityDoc.yaml_parse_file(self.prefab_path).filter(class_names=["Tilemap"])
+        return [Tilemap.from_entry(entry) for entry in entries]
+
+    def test_from_entry(self):
+        tilemap, = self._parse()
+
+        self.assertEqual(tilemap.size, (2, 1))
+        self.assertEqual(len(tilemap), 2)
+        self.assertEqual(list(tilemap.xs), [0, 1])
+        self.assertEqual(list(tilemap.ys), [-1, -1])
+        self.assertEqual(list(tilemap.tile_indexes), [0, 1])
+        self.assertEqual(list(tilemap.sprite_ids), [21300000])
+        self.assertEqual(tilemap.sprite_guids, ["abcdef0123456789abcdef0123456789"])
+        # prefab has no matrices
+        self.assertEqual(tilemap.get_matrix(1), IDENTITY_MATRIX)
+
+    def test_cache_round_trip(self):
+        tilemaps = self._parse()
+        stat = self.prefab_path.stat()
+        save_cached_tilemaps(self.prefab_path, tilemaps, stat, self.cache_folder)
+
+        self.assertEqual(load_cached_tilemaps(self.prefab_path, stat, self.cache_folder), tilemaps)
+
+    def test_cache_invalidation(self):
+        stat = self.prefab_path.stat()
+        self.assertIsNone(load_cached_tilemaps(self.prefab_path, stat, self.cache_folder))
+
+        save_cached_tilemaps(self.prefab_path, self._parse(), stat, self.cache_folder)
+        os.utime(self.prefab_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(load_cached_tilemaps(self.prefab_path, self.prefab_path.stat(), self.cache_folder))
+
+        cache_path, = self.cache_folder.iterdir()
+        cache_path.write_bytes(cache_path.read_bytes()[:-3])
+        self.assertIsNone(load_cached_tilemaps(self.prefab_path, stat, self.cache_folder))
+
+
+class GenTilemapTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        MultiprocessHandler.shutdown()
+
+    def test_overlapping_tiles(self):
+        guid = "0123"
+        sprites = {}
+        for i, color in enumerate([(255, 0, 0, 255), (0, 0, 255, 100), (0, 255, 0, 0)]):
+            sprite_data = SpriteData(f"tile_{i}", f"tile_{i}", {i}, {"x": 0, "y": 0, "width": 32, "height": 32},
+                                     {"x": 0, "y": 0})
+            sprite_data.sprite = Image.new("RGBA", (32, 32), color)
+            sprite_data.sprite.paste((10, 20, 30, 40), (0, 0, 8, 32))
+            sprites[i] = sprite_data
+
+        # last tile is in the same cell as first (|y| is used), second one is placed twice on the same cell
+        tiles = [(0, 0, 0, 0), (1, -1, 1, 1), (1, -1, 1, 1), (0, 1, 2, 1), (1, 0, 1, 0), (0, 0, 1, 1)]
+        tilemap = Tilemap((2, 2), array("q", [0, 1, 2]), [guid] * 3, array("d", [1, 0, 0, 1, -1, 0, 0, 1]),
+                          *(array("i", column) for column in zip(*tiles)))
+
+        expected = Image.new("RGBA", (64, 64))
+        for x, y, tile_index, matrix_index in tiles:
+            sprite = sprites[tile_index].sprite
+            if matrix_index:
+                sprite = affine_transform(sprite, tilemap.get_matrix(matrix_index))
+            expected.alpha_composite(sprite, (x * 32, abs(y) * 32))
+
+        data_by_guid = {guid: SimpleNamespace(data_id=sprites)}
+        for is_multiprocess in [False, True]:
+            with self.subTest(is_multiprocess=is_multiprocess):
+                Config.set_override(CfgKey.MULTIPROCESSING, is_multiprocess)
+                try:
+                    image, = render_layers([tilemap], data_by_guid, (2, 2), [])
+                finally:
+                    Config.set_override(CfgKey.MULTIPROCESSING, None)
+                self.assertEqual(image.tobytes(), expected.tobytes())
+
+    def test_render_layers_shared_buffer(self):
+        guid = "0123"
+        sprites = {}
+        for i, color in enumerate([(255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 100)]):
+            sprites[i] = SpriteData(f"tile_{i}", f"tile_{i}", {i}, {"x": 0, "y": 0, "width": 32, "height": 32},
+                                    {"x": 0, "y": 0})
+            sprites[i].sprite = Image.new("RGBA", (32, 32), color)
+        tilemaps = [
+            Tilemap((2, 2), array("q", [0, 1, 2]), [guid] * 3, array("d", IDENTITY_MATRIX),
+                    array("i", [layer, 1]), array("i", [0, -layer % 2]), array("i", [layer, 2]), array("i", [0, 0]))
+            for layer in range(3)
+        ]
+        data_by_guid = {guid: SimpleNamespace(data_id=sprites)}
+
+        expected = [image.tobytes() for image in render_layers(tilemaps, data_by_guid, (3, 2), [])]
+
+        created = []
+
+        class CountedSharedMemory(tilemap_render.SharedMemory):
+            def __init__(self, name=None, create=False, size=0):
+                super().__init__(name, create, size)
+                if create:
+                    created.append(self.name)
+
+        Config.set_override(CfgKey.MULTIPROCESSING, True)
+        try:
+            with mock.patch.object(tilemap_render, "SharedMemory", CountedSharedMemory):
+                images = [image.tobytes() for image in render_layers(tilemaps, data_by_guid, (3, 2), [])]
+        finally:
+            Config.set_override(CfgKey.MULTIPROCESSING, None)
+
+        self.assertEqual(images, expected)
+        # tile sheet and one buffer of layer image, which is reused by every layer
+        self.assertEqual(len(created), 2)
+
+    def test_gen_tilemap(self):
+        size = SIZES["tiny"]
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), size)
+
+            with use_assets(assets, Path(tmp, "Work")), redirect_stdout(io.StringIO()):
+                MetaDataHandler.load(Game.VS)
+                save_folder = gen_tilemap(assets.prefab, False)
+                tilemaps, count_layers = TilemapDataHandler.loaded_prefabs[assets.prefab]
+                layers = {path.name: path.read_bytes() for path in save_folder.glob("*.png")}
+
+                # second generation loads layers from cache instead of parsing prefab
+                reset_handlers()
+                self.assertTrue(any(Path(tmp, "Work", "TilemapCache").iterdir()))
+                MetaDataHandler.load(Game.VS)
+                gen_tilemap(assets.prefab, False)
+                self.assertEqual(TilemapDataHandler.loaded_prefabs[assets.prefab][0], tilemaps)
+
+            self.assertEqual(count_layers, size.layers)
+            self.assertEqual(len(layers), 2 * size.layers)
+            for path in save_folder.glob("*.png"):
+                self.assertEqual(path.read_bytes(), layers[path.name])
+
+            side = tilemaps[0].size[0]
+            with Image.open(save_folder / f"{assets.prefab.stem}-0.png") as image:
+                self.assertEqual(image.size, (side * 32, side * 32))
+                self.assertEqual(image.getpixel((16, 16))[3], 255)
+
+    def test_exclude_layers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["tiny"])
+            with use_assets(assets, Path(tmp, "Work")), redirect_stdout(io.StringIO()):
+                MetaDataHandler.load(Game.VS)
+                save_folder = gen_tilemap(assets.prefab, False, exclude_layers={0})
+
+            # excluded layer is saved as image, but is not part of composites
+            stem = assets.prefab.stem
+            layers = range(SIZES["tiny"].layers)
+            self.assertTrue(all((save_folder / f"{stem}-Layer-{i}.png").exists() for i in layers))
+            self.assertEqual([(save_folder / f"{stem}-{i}.png").exists() for i in layers],
+                             [i != 0 for i in layers])
+
+    def test_transparent_layer(self):
+        def render_layers_mock(tilemaps, data_by_guid, size_map, log_list):
+            size = (size_map[0] * 32, size_map[1] * 32)
+            yield Image.new("RGBA", size, (10, 20, 30, 255))
+            yield Image.new("RGBA", size, (255, 255, 255, 0))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["tiny"])
+            with use_assets(assets, Path(tmp, "Work")), redirect_stdout(io.StringIO()), \
+                    mock.patch.object(tilemap_gen, "render_layers", render_layers_mock):
+                MetaDataHandler.load(Game.VS)
+                save_folder = gen_tilemap(assets.prefab, False, is_streaming=False)
+
+            # composite with transparent layer is not encoded again
+            stem = assets.prefab.stem
+            self.assertEqual((save_folder / f"{stem}-1.png").read_bytes(), (save_folder / f"{stem}-0.png").read_bytes())
+            with Image.open(save_folder / f"{stem}-1.png") as image:
+                self.assertEqual(image.getpixel((0, 0)), (10, 20, 30, 255))
+
+    def test_modes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["tiny"])
+
+            def gen(is_multiprocess: bool, is_streaming: bool) -> dict[str, bytes]:
+                with use_assets(assets, Path(tmp, "Work"), is_multiprocess), redirect_stdout(io.StringIO()):
+                    MetaDataHandler.load(Game.VS)
+                    # tiny map is 8 tiles wide: 3 rows of tiles in every band, last band is smaller
+                    with mock.patch.object(tilemap_gen, "STREAMING_BAND_PIXELS", (8 * 32) * (3 * 32)):
+                        save_folder = gen_tilemap(assets.prefab, False, is_streaming=is_streaming)
+
+                images = {}
+                for path in save_folder.glob("*.png"):
+                    with Image.open(path) as image:
+                        images[path.name] = image.tobytes()
+                return images
+
+            expected = gen(False, False)
+            self.assertEqual(len(expected), 2 * SIZES["tiny"].layers)
+            for is_multiprocess, is_streaming in [(False, True), (True, False), (True, True)]:
+                with self.subTest(is_multiprocess=is_multiprocess, is_streaming=is_streaming):
+                    self.assertEqual(gen(is_multiprocess, is_streaming), expected)
+
+
+    def test_pyramid(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["tiny"])
+            stem = assets.prefab.stem
+
+            def gen(is_streaming: bool) -> dict[str, bytes]:
+                with use_assets(assets, Path(tmp, "Work")), redirect_stdout(io.StringIO()), \
+                        mock.patch.object(tilemap_gen, "STREAMING_BAND_PIXELS", (8 * 32) * (3 * 32)):
+                    MetaDataHandler.load(Game.VS)
+                    save_folder = gen_tilemap(assets.prefab, False, is_streaming=is_streaming, is_pyramid=True)
+
+                tiles = {}
+                for path in (save_folder / PYRAMID_FOLDER / f"{stem}_files").glob("*/*.png"):
+                    with Image.open(path) as image:
+                        tiles[path.relative_to(save_folder).as_posix()] = image.tobytes()
+                return tiles
+
+            tiles = gen(False)
+            # last composite is 256 px: full level is one tile, levels 8..0
+            self.assertEqual(len(tiles), 9)
+            self.assertEqual(gen(True), tiles)
+
+            save_folder = Path(tmp, "Work", "Images")
+            last_composite, = save_folder.rglob(f"{stem}-{SIZES['tiny'].layers - 1}.png")
+            with Image.open(last_composite) as image:
+                self.assertEqual(tiles[f"{PYRAMID_FOLDER}/{stem}_files/8/0_0.png"], image.tobytes())
+
+
+class TilemapAtlasTests(TestCase):
+    def test_overlapping_tiles(self):
+        guid = "0123"
+        sprites = {}
+        for i, color in enumerate([(255, 0, 0, 255), (0, 0, 255, 100)]):
+            sprite_data = SpriteData(f"tile_{i}", f"tile_{i}", {i}, {"x": 0, "y": 0, "width": 32, "height": 32},
+                                     {"x": 0, "y": 0})
+            sprite_data.sprite = Image.new("RGBA", (32, 32), color)
+            sprite_data.sprite.paste((10, 20, 30, 40), (0, 0, 8, 32))
+            sprites[i] = sprite_data
+
+        # three tiles in cell (0, 1), one tile outside of map
+        tiles = [(0, -1, 0, 0), (0, -1, 1, 1), (1, 0, 0, 1), (0, -1, 1, 0), (5, 0, 0, 0)]
+        tilemap = Tilemap((2, 2), array("q", [0, 1]), [guid] * 2, array("d", [1, 0, 0, 1, -1, 0, 0, 1]),
+                          *(array("i", column) for column in zip(*tiles)))
+        data_by_guid = {guid: SimpleNamespace(data_id=sprites)}
+        expected, = render_layers([tilemap], data_by_guid, (2, 2), [])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = export_tilemap_atlas([tilemap], data_by_guid, (2, 2), Path(tmp), "map")
+            grid, size_map, depth = read_grid(Path(tmp, "map-Layer-0-grid.bin"))
+            image, = rebuild_layers(index_path)
+
+        self.assertEqual((size_map, depth), ((2, 2), 3))
+        # 4 unique pairs of tile and matrix, ids of cells (0, 0), (1, 0), (0, 1), (1, 1) in every plane
+        self.assertEqual(list(grid), [0, 2, 1, 0, 0, 0, 4, 0, 0, 0, 3, 0])
+        self.assertEqual(image.tobytes(), expected.tobytes())
+
+    def test_gen_tilemap_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            assets = create_assets(Path(tmp, "Assets"), SIZES["small"])
+            with use_assets(assets, Path(tmp, "Work")), redirect_stdout(io.StringIO()):
+                MetaDataHandler.load(Game.VS)
+                save_folder = gen_tilemap(assets.prefab, False, is_atlas=True)
+
+            index_path = save_folder / ATLAS_FOLDER / f"{assets.prefab.stem}-atlas.json"
+            atlas_size = sum(path.stat().st_size for path in index_path.parent.iterdir())
+            images_size = 0
+            for i, image in enumerate(rebuild_layers(index_path)):
+                layer_path = save_folder / f"{assets.prefab.stem}-Layer-{i}.png"
+                images_size += layer_path.stat().st_size
+                with Image.open(layer_path) as expected:
+                    self.assertEqual(image.tobytes(), expected.tobytes())
+
+            self.assertEqual(i + 1, SIZES["small"].layers)
+            self.assertLess(atlas_size, images_size)
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,80 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from threading import Thread
+from unittest import TestCase, main as ut_main
+
+from Source.Utility.timer import Profiler, Timeit
+
+
+class ProfilerTests(TestCase):
+    def tearDown(self):
+        Profiler.stop()
+
+    def test_disabled(self):
+        Profiler.stop()
+        with Profiler.span("parse"):
+            Profiler.count("bytes_read", 10)
+        self.assertFalse(Profiler.is_enabled())
+
+        Profiler.start()
+        self.assertEqual(Profiler.get_counters(), {})
+        self.assertEqual(Profiler.get_span_totals(), {})
+
+    def test_spans_and_counters(self):
+        Profiler.start()
+        with Profiler.span("build", file=Path("a.png")):
+            for _ in range(3):
+                with Profiler.span("crop"):
+                    Profiler.count("sprites_cropped")
+            Profiler.count("bytes_read", 100)
+
+        def encode():
+            with Profiler.span("encode"):
+                pass
+
+        thread = Thread(target=encode)
+        thread.start()
+        thread.join()
+        Profiler.stop()
+
+        self.assertEqual(Profiler.get_counters(), {"sprites_cropped": 3, "bytes_read": 100})
+        totals = Profiler.get_span_totals()
+        self.assertEqual({name: total["count"] for name, total in totals.items()},
+                         {"build": 1, "crop": 3, "encode": 1})
+
+        data = Profiler.to_dict({"command": "test"})
+        spans = [event for event in data["traceEvents"] if event["ph"] == "X"]
+        build = next(event for event in spans if event["name"] == "build")
+        self.assertEqual(build["args"], {"file": "a.png"})
+        # nested spans are inside parent
+        for crop in (event for event in spans if event["name"] == "crop"):
+            self.assertGreaterEqual(crop["ts"], build["ts"])
+            self.assertLessEqual(crop["ts"] + crop["dur"], build["ts"] + build["dur"] + 1)
+        self.assertEqual(len({event["tid"] for event in spans}), 2)
+        self.assertEqual(data["otherData"]["command"], "test")
+        self.assertNotIn("samples", data)
+
+    def test_sampling(self):
+        Profiler.start(is_sampling=True, sample_interval=0.001)
+        timeit = Timeit()
+        while timeit.get_sec() < 0.1:
+            sum(range(1000))
+            time.sleep(0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Profiler.save(Path(tmp) / "trace.json")
+            data = json.loads(path.read_text(encoding="UTF-8"))
+
+        self.assertFalse(Profiler.is_enabled())
+        self.assertGreater(len(data["samples"]), 0)
+        for sample in data["samples"]:
+            self.assertIn(sample["sf"], data["stackFrames"])
+        for frame in data["stackFrames"].values():
+            self.assertTrue("parent" not in frame or frame["parent"] in data["stackFrames"])
+        self.assertTrue(any("test_sampling" in name for name in data["otherData"]["hot_functions"]["total"]))
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -0,0 +1,92 @@
+import os
+import random
+from io import BytesIO
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+from Source.Images.transparent_save import TransparentAnimatedGifConverter, save_transparent_gif
+
+
+class _PerPixelGifConverter(TransparentAnimatedGifConverter):
+    """
+    Previous per-pixel implementation, output should be the same
+    """
+
+    def _process_pixels(self):
+        self._transparent_pixels = set(
+            idx for idx, alpha in enumerate(self._img_rgba.getchannel(channel='A').getdata())
+            if alpha <= self._alpha_threshold)
+
+    def _set_parsed_palette(self):
+        palette = self._img_p.getpalette()
+        self._img_p_used_palette_idxs = set(
+            idx for pal_idx, idx in enumerate(self._img_p_data)
+            if pal_idx not in self._transparent_pixels)
+        self._img_p_parsedpalette = dict(
+            (idx, tuple(palette[idx * 3:idx * 3 + 3]))
+            for idx in self._img_p_used_palette_idxs)
+
+    def _adjust_pixels(self):
+        if self._palette_replaces['idx_from']:
+            trans_table = bytearray.maketrans(
+                bytes(self._palette_replaces['idx_from']),
+                bytes(self._palette_replaces['idx_to']))
+            self._img_p_data = self._img_p_data.translate(trans_table)
+        for idx_pixel in self._transparent_pixels:
+            self._img_p_data[idx_pixel] = 0
+        self._img_p.frombytes(data=bytes(self._img_p_data))
+
+
+def _random_frame(size: tuple[int, int], colors: int) -> Image.Image:
+    rgb = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).quantize(colors).convert("RGB")
+    alpha = Image.frombytes("L", size, os.urandom(size[0] * size[1]))
+    rgb.putalpha(alpha)
+    return rgb
+
+
+class TransparentGifTests(TestCase):
+    def _assert_same(self, image: Image.Image, alpha_threshold: int):
+        random.seed(1)
+        expected = _PerPixelGifConverter(image.copy(), alpha_threshold).process()
+        random.seed(1)
+        result = TransparentAnimatedGifConverter(image.copy(), alpha_threshold).process()
+
+        self.assertEqual(result.tobytes(), expected.tobytes())
+        self.assertEqual(result.getpalette(), expected.getpalette())
+        self.assertEqual(result.info, expected.info)
+
+    def test_converter(self):
+        for size in [(1, 1), (32, 32), (47, 13), (128, 96)]:
+            for colors in [2, 255, 256]:
+                for alpha_threshold in [0, 50, 255]:
+                    with self.subTest(size=size, colors=colors, alpha_threshold=alpha_threshold):
+                        self._assert_same(_random_frame(size, colors), alpha_threshold)
+
+    def test_fully_opaque_and_transparent(self):
+        for alpha in [0, 255]:
+            with self.subTest(alpha=alpha):
+                image = _random_frame((40, 40), 256)
+                image.putalpha(alpha)
+                self._assert_same(image, 0)
+
+    def test_save(self):
+        images = [_random_frame((32, 32), 64) for _ in range(3)]
+        files = []
+        for converter in [_PerPixelGifConverter, TransparentAnimatedGifConverter]:
+            random.seed(2)
+            frames = [converter(image.copy(), 0).process() for image in images]
+            file = BytesIO()
+            frames[0].save(file, format="GIF", save_all=True, optimize=False, append_images=frames[1:],
+                           duration=100, disposal=2, loop=0)
+            files.append(file.getvalue())
+        self.assertEqual(files[0], files[1])
+
+        random.seed(2)
+        file = BytesIO()
+        save_transparent_gif(images, 100, file)
+        self.assertEqual(file.getvalue(), files[1])
+
+
+if __name__ == "__main__":
+    ut_main()
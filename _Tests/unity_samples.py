@@ -0,0 +1,165 @@
+"""Small Unity YAML documents in the same layout as ripped assets."""
+
+PREFAB_TEXT = """%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!1 &100
+GameObject:
+  m_ObjectHideFlags: 0
+  m_Name: Grid
+  m_Component:
+  - component: {fileID: 400}
+--- !u!4 &400
+Transform:
+  m_GameObject: {fileID: 100}
+  m_LocalPosition: {x: 0, y: 0.5, z: 0}
+  m_Children: []
+--- !u!1839735485 &-2000
+Tilemap:
+  m_ObjectHideFlags: 0
+  m_Tiles:
+  - first: {x: 0, y: -1, z: 0}
+    second:
+      serializedVersion: 2
+      m_TileIndex: 0
+      m_TileMatrixIndex: 0
+  - first: {x: 1, y: -1, z: 0}
+    second:
+      serializedVersion: 2
+      m_TileIndex: 1
+      m_TileMatrixIndex: 1
+  m_TileSpriteArray:
+  - m_RefCount: 1
+    m_Data: {fileID: 21300000, guid: abcdef0123456789abcdef0123456789, type: 3}
+  m_Size: {x: 2, y: 1, z: 1}
+  m_Name: 'Layer: 1'
+"""
+
+META_TEXT = """fileFormatVersion: 2
+guid: 0123456789abcdef0123456789abcdef
+TextureImporter:
+  internalIDToNameTable:
+  - first:
+      213: -2413806693520163455
+    second: bat_0
+  - first:
+      213: 6917426830719214524
+    second: bat_1
+  - first:
+      213: 1234
+    second: frameB
+  externalObjects: {}
+  serializedVersion: 12
+  mipmaps:
+    mipMapMode: 0
+    enableMipMap: 0
+  spriteMode: 2
+  spriteSheet:
+    serializedVersion: 2
+    sprites:
+    - serializedVersion: 2
+      name: bat_0
+      rect:
+        serializedVersion: 2
+        x: 0
+        y: 32
+        width: 32
+        height: 32
+      alignment: 9
+      pivot: {x: 0.5, y: 0.25}
+      border: {x: 0, y: 0, z: 0, w: 0}
+      outline: []
+      physicsShape: []
+      tessellationDetail: 0
+      bones: []
+      spriteID: 1a2b3c
+      internalID: -2413806693520163455
+      vertices: []
+      indices: 
+      edges: []
+      weights: []
+    - serializedVersion: 2
+      name: bat_1
+      rect:
+        serializedVersion: 2
+        x: 32
+        y: 32
+        width: 32
+        height: 32
+      alignment: 9
+      pivot: {x: 0.5, y: 0.25}
+      border: {x: 0, y: 0, z: 0, w: 0}
+      outline: []
+      physicsShape: []
+      tessellationDetail: 0
+      bones: []
+      spriteID: 4d5e6f
+      internalID: 6917426830719214524
+      vertices: []
+      indices: 
+      edges: []
+      weights: []
+    - serializedVersion: 2
+      name: frameB
+      rect:
+        serializedVersion: 2
+        x: 0
+        y: 0
+        width: 48.5
+        height: 30
+      alignment: 0
+      pivot: {x: 0.5, y: 0.5}
+      border: {x: 0, y: 0, z: 0, w: 0}
+      outline: []
+      physicsShape: []
+      tessellationDetail: 0
+      bones: []
+      spriteID: 7a8b9c
+      internalID: 1234
+      vertices: []
+      indices: 
+      edges: []
+      weights: []
+    outline: []
+    physicsShape: []
+    bones: []
+    spriteID: 
+    internalID: 0
+    vertices: []
+    indices: 
+    edges: []
+    weights: []
+    secondaryTextures: []
+  spritePackingTag: 
+  pSDRemoveMatte: 0
+  userData: 
+  assetBundleName: 
+  assetBundleVariant: 
+"""
+
+I2_TEXT = """%YAML 1.1
+%TAG !u! tag:unity3d.com,2011:
+--- !u!114 &11400000
+MonoBehaviour:
+  m_ObjectHideFlags: 0
+  m_Script: {fileID: 11500000, guid: 0123456789abcdef0123456789abcdef, type: 3}
+  m_Name: I2Languages
+  mSource:
+    mTerms:
+    - Term: weaponLang/{WHIP}name
+      TermType: 0
+      Languages:
+      - Whip
+      - "Fouet"
+      - "\u041A\u043D\u0443\u0442"
+      - 'It''s a whip'
+      - |-
+        Multi
+        line
+      - 
+      Flags: 
+    mLanguages:
+    - Name: English
+      Code: en
+    - Name: French
+      Code: fr
+"""
@@ -0,0 +1,78 @@
+from io import StringIO
+from unittest import TestCase, main as ut_main, skipIf
+
+import yaml
+
+from Source.Utility import unityparser2
+from Source.Utility.unityparser2 import UnityDoc, UnityLoaderR, _split_yaml_string, _yaml_load_part
+from _Tests.unity_samples import PREFAB_TEXT, META_TEXT, I2_TEXT
+
+
+class UnityDocStreamTests(TestCase):
+    def test_stream_same_as_full(self):
+        expected = UnityDoc.yaml_parse_text(PREFAB_TEXT)
+
+        for chunk_size in (1, 3, 5, 64, 1 << 20):
+            with self.subTest(chunk_size=chunk_size):
+                entries = list(UnityDoc.yaml_iter_io(StringIO(PREFAB_TEXT), chunk_size=chunk_size))
+                self.assertEqual(UnityDoc(entries), expected)
+
+    def test_stream_filter(self):
+        def flt(x):
+            return "Tilemap:" in x
+
+        expected = UnityDoc.yaml_parse_text(PREFAB_TEXT, flt)
+        doc = UnityDoc.yaml_parse_io_stream(StringIO(PREFAB_TEXT), flt)
+
+        self.assertEqual(doc, expected)
+        self.assertEqual([e.className for e in doc.entries], ["Tilemap"])
+        self.assertEqual(doc.entry.fileID, -2000)
+
+
+@skipIf(unityparser2.CParser is None, "libyaml is not available")
+class UnityLoaderParityTests(TestCase):
+    """
+    UnityLoaderC must produce the same UnityDoc as pure python UnityLoaderR
+    """
+
+    @staticmethod
+    def _load_both(text: str) -> tuple[UnityDoc, UnityDoc]:
+        return (UnityDoc(list(yaml.load_all(text, UnityLoaderR))),
+                UnityDoc(list(yaml.load_all(text, unityparser2.UnityLoaderC))))
+
+    def test_default_loader(self):
+        self.assertIs(unityparser2.UnityLoader, unityparser2.UnityLoaderC)
+
+    def test_prefab(self):
+        pure, c = self._load_both(PREFAB_TEXT)
+        self.assertEqual(pure, c)
+        self.assertEqual([(e.classID, e.fileID) for e in c.entries], [(1, 100), (4, 400), (1839735485, -2000)])
+
+    def test_meta(self):
+        pure, c = self._load_both(META_TEXT)
+        self.assertEqual(pure, c)
+        self.assertEqual(c.entry["guid"], "0123456789abcdef0123456789abcdef")
+
+    def test_i2languages(self):
+        pure, c = self._load_both(I2_TEXT)
+        self.assertEqual(pure, c)
+        self.assertEqual(c.entry.data["mSource"]["mTerms"][0]["Languages"][4], "Multi\nline")
+
+    def test_without_header(self):
+        # documents split by "--- " lose %TAG directive (filter and parallel parse)
+        text = PREFAB_TEXT[PREFAB_TEXT.index("--- "):]
+        pure, c = self._load_both(text)
+        self.assertEqual(pure, c)
+        self.assertEqual(len(c.entries), 3)
+
+    def test_split_parts(self):
+        documents = ["--- " + x for x in PREFAB_TEXT.split("--- ")[1:]]
+        for i, document in enumerate(documents):
+            for entry_index, part_index, part in _split_yaml_string(i, document):
+                with self.subTest(entry_index=entry_index, part_index=part_index):
+                    _, _, c_entry = _yaml_load_part(entry_index, part_index, part)
+                    self.assertEqual(yaml.load(part, UnityLoaderR), c_entry)
+
+
+if __name__ == "__main__":
+    ut_main()
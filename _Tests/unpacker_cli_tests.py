@@ -0,0 +1,101 @@
+import io
+import json
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest import TestCase, main as ut_main
+
+from PIL import Image
+
+import unpacker_cli
+from Source.Config.config import CfgKey, Config, DLCType
+from Source.Data.data import DataType
+from Source.Utility.constants import COMPOUND_DATA
+from Source.Utility.multirun import MultiprocessHandler
+
+
+def _run(argv: list[str]) -> tuple[int, str]:
+    stdout = io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+        code = unpacker_cli.main(argv)
+    return code, stdout.getvalue()
+
+
+class UnpackerCliTests(TestCase):
+    def tearDown(self):
+        Config.set_override(CfgKey.MULTIPROCESSING, None)
+        MultiprocessHandler.set_processes(None)
+
+    def test_parser(self):
+        parser = unpacker_cli.get_parser()
+
+        args = parser.parse_args(["images", "--dlc", "ms", "--data-type", "item", "--gens", "image_frame"])
+        self.assertEqual(args.dlc, DLCType.MS)
+        self.assertEqual(args.data_type, DataType.ITEM)
+        self.assertEqual(args.gens, ["image_frame"])
+
+        args = parser.parse_args(["images", "--dlc", "compound", "--data-type", "PowerUp"])
+        self.assertIs(args.dlc, COMPOUND_DATA)
+        self.assertEqual(args.data_type, DataType.POWER_UP)
+
+        args = parser.parse_args(["tilemap", "a.prefab", "--no-streaming"])
+        self.assertIs(args.streaming, False)
+        self.assertIsNone(parser.parse_args(["tilemap", "a.prefab"]).streaming)
+        args = parser.parse_args(["tilemap", "a.prefab", "--atlas", "--no-images"])
+        self.assertEqual((args.atlas, args.images, args.pyramid), (True, False, False))
+        self.assertTrue(parser.parse_args(["tilemap", "a.prefab", "--pyramid"]).pyramid)
+        self.assertEqual(parser.parse_args(["tilemap", "a.prefab"]).exclude_layers, [])
+        args = parser.parse_args(["tilemap", "a.prefab", "--exclude-layers", "0", "2"])
+        self.assertEqual(args.exclude_layers, [0, 2])
+
+        args = parser.parse_args(["inverse-tilemap", "map.png", "--tint", "0xFF00FF"])
+        self.assertEqual(args.tint, 0xFF00FF)
+
+        args = parser.parse_args(["build", "--dry-run", "--data-types", "weapon", "item", "--no-audio"])
+        self.assertEqual(args.data_types, [DataType.WEAPON, DataType.ITEM])
+        self.assertIs(args.dlc, COMPOUND_DATA)
+        self.assertTrue(args.dry_run and args.no_audio)
+
+    def test_usage_errors(self):
+        self.assertEqual(_run([])[0], unpacker_cli.EXIT_USAGE)
+        self.assertEqual(_run(["images", "--dlc", "unknown", "--data-type", "item"])[0], unpacker_cli.EXIT_USAGE)
+        self.assertEqual(_run(["--help"])[0], unpacker_cli.EXIT_OK)
+
+    def test_failed_summary(self):
+        code, stdout = _run(["--summary", "-", "--jobs", "1", "inverse-tilemap", "not_existing.png", "--tint", "1"])
+        self.assertEqual(code, unpacker_cli.EXIT_FAILED)
+
+        summary = json.loads(stdout)
+        self.assertEqual(summary["status"], "failed")
+        self.assertEqual(summary["exit_code"], unpacker_cli.EXIT_FAILED)
+        self.assertIn("not_existing.png", summary["error"])
+        self.assertFalse(summary["multiprocessing"])
+
+    def test_inverse_tilemap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "map.png")
+            Image.new("RGBA", (4, 2), (255, 255, 255, 255)).save(path)
+            summary_path = Path(tmp, "summary.json")
+            trace_path = Path(tmp, "trace.json")
+
+            code, _ = _run(["--summary", str(summary_path), "--jobs", "2", "--no-progress",
+                            "--profile", str(trace_path), "inverse-tilemap", str(path), "--tint", "0xFF0000"])
+            self.assertEqual(code, unpacker_cli.EXIT_OK)
+
+            summary = json.loads(summary_path.read_text(encoding="UTF-8"))
+            self.assertEqual(summary["status"], "ok")
+            self.assertEqual(summary["output"], str(Path(tmp, "Inverse")))
+            self.assertEqual(summary["processes"], 2)
+            self.assertEqual([step["name"] for step in summary["steps"]], ["inverse-tilemap"])
+
+            with Image.open(Path(tmp, "Inverse", "map.png")) as image:
+                self.assertEqual(image.getpixel((0, 0)), (255, 0, 0, 255))
+            self.assertTrue(Path(tmp, "Inverse", "map_inv.png").exists())
+
+            trace = json.loads(trace_path.read_text(encoding="UTF-8"))
+            self.assertIn("inverse-tilemap", trace["otherData"]["spans"])
+            self.assertEqual(trace["otherData"]["status"], "ok")
+
+
+if __name__ == "__main__":
+    ut_main()
@@ -1,4 +1,3 @@
-import itertools
 import json
 import os
 import sys
@@ -10,8 +9,6 @@ from tkinter import ttk
 from tkinter.messagebox import showerror, showwarning, showinfo, askyesno
 from tkinter.simpledialog import askinteger
 
-from PIL.Image import open as image_open
-
 import Source.Data.data as data_module
 import Source.Images.transparent_save as tr_save
 import Source.Translations.language as lang_module
@@ -20,15 +17,16 @@ from Source.Data.data import DataHandler
 from Source.Data.meta_data import MetaDataHandler
 from Source.Images import image_gen, image_gen_vc
 from Source.Images.image_gen_new import ImageGeneratorManager
-from Source.Translations.language import LangHandler, I2_LANGUAGES, LangType
+from Source.Pipelines import data_pipeline, image_pipeline, lang_pipeline
+from Source.Pipelines.errors import PipelineError
+from Source.Translations.language import LangHandler, LangType
 from Source.Utility.constants import ROOT_FOLDER, IS_DEBUG, DEFAULT_ANIMATION_FRAME_RATE, IMAGES_FOLDER, \
-    GENERATED, TILEMAPS, DATA_FOLDER, TRANSLATIONS_FOLDER, SPLIT, COMPOUND_DATA, COMPOUND_DATA_TYPE, PREFAB_INSTANCE, \
-    GAME_OBJECT
+    GENERATED, TILEMAPS, COMPOUND_DATA, COMPOUND_DATA_TYPE, PREFAB_INSTANCE, GAME_OBJECT
 from Source.Utility.defer_constants import DeferConstants
 from Source.Utility.constants import to_source_path
-from Source.Utility.image_functions import resize_image, get_anim_sprites_ready, apply_tint, resize_list_images
 from Source.Utility.logger import Logger
-from Source.Utility.timer import Timeit
+from Source.Utility.multirun import MultiprocessHandler
+from Source.Utility.timer import Timeit, Profiler
 from Source.Utility.utility import CheckBoxes, ButtonsBox, clean_all_json
 
 
@@ -383,54 +381,16 @@ class Unpacker(tk.Tk):
         generate_function(full_path)
 
     def generate_images_by_meta(self, full_path: Path):
-        file = full_path.name
-
-        print(f"Generating {file} by meta")
-
         scale_factor = askinteger("Scale", "Input scale multiplier", initialvalue=1)
         if not scale_factor: return
 
-        MetaDataHandler.loaded_game = Game.SPECIAL
-
-        full_path_meta = full_path.with_name(file + ".meta")
-        if not MetaDataHandler.has_meta_by_path(full_path_meta):
-            if not full_path_meta.exists():
-                showerror("Error", f"MetaData not found for {file}")
-                return
-            MetaDataHandler.add_meta_data_by_path(full_path_meta)
-
-        data = MetaDataHandler.get_meta_by_name(file)
-
-        data.init_sprites()
-
-        total_len = len(data.data_name)
-
-        folder_to_save = ROOT_FOLDER.joinpath("Images", "Generated", "_By meta Image")
-        if total_len > 1:
-            folder_to_save = folder_to_save.joinpath(full_path.stem)
-        else:
-            folder_to_save = folder_to_save.joinpath("_SingeSprites")
-
-        folder_to_save.mkdir(parents=True, exist_ok=True)
-
-        print(f"Files out of {total_len}:")
-        self.progress_bar_set_percent(0, total_len)
-
-        for i, (_, sprite_data) in enumerate(data.data_name.items()):
-            sprite = resize_image(sprite_data.sprite, scale_factor)
-            sprite.save(folder_to_save.joinpath(str(sprite_data.real_name)).with_suffix(".png"))
-
-            print(f"\r{i + 1}", end="")
-            self.progress_bar_set_percent(i + 1, total_len)
-
-        print()
-        self.last_loaded_folder = folder_to_save.absolute()
+        try:
+            self.last_loaded_folder = image_pipeline.generate_images_by_meta(full_path, scale_factor,
+                                                                             self.progress_bar_set_percent)
+        except PipelineError as e:
+            showerror("Error", str(e))
 
     def generate_animation_by_meta(self, full_path):
-        file = full_path.name
-
-        print(f"Generating {file} by meta")
-
         scale_factor_initial = 1
         scale_factor = askinteger("Scale", "Input scale multiplier", initialvalue=scale_factor_initial)
         if not scale_factor: return
@@ -452,80 +412,24 @@ class Unpacker(tk.Tk):
             print("Not selected any animation extension")
             return
 
-        data = MetaDataHandler.get_meta_by_name(file)
-
-        if not data:
-            showerror("Error", f"MetaData not found for {file}")
+        try:
+            save_folder = image_pipeline.generate_animations_by_meta(full_path, selected_anim_types, scale_factor,
+                                                                     frame_rate, self.progress_bar_set_percent)
+        except PipelineError as e:
+            showerror("Error", str(e))
             return
 
-        animations = data.get_animations()
-
-        total_len = len(animations)
-
-        if not total_len:
-            print(f"Not found animations for {file}")
-            return
-
-        selected_types = list(itertools.compress(anim_types, selected_anim_types))
-        print(f"Selected {scale_factor=}, {frame_rate=}, selected extensions={selected_types}")
-
-        folder_to_save = ROOT_FOLDER.joinpath("Images", "Generated", "_By meta Anim")
-        if total_len > 1:
-            folder_to_save = folder_to_save.joinpath(full_path.stem)
-        else:
-            folder_to_save = folder_to_save.joinpath("_SingeAnimations")
-
-        folder_to_save.mkdir(parents=True, exist_ok=True)
-
-        duration = 1000 // frame_rate
-
-        print(f"Animations out of {total_len}:")
-        self.progress_bar_set_percent(0, total_len)
-
-        for i, anim in enumerate(animations):
-            sprites_list = get_anim_sprites_ready(anim)
-            sprites_list = resize_list_images(sprites_list, scale_factor)
-
-            for ext, folder, func in itertools.compress(tr_save.SAVE_DATA, selected_anim_types):
-                path = folder_to_save.joinpath(folder)
-                path.mkdir(exist_ok=True)
-                func(sprites_list, duration, path.joinpath(str(anim.name)).with_suffix(ext))
-
-            print(f"\r{i + 1}", end="")
-            self.progress_bar_set_percent(i + 1, total_len)
-
-        print()
-        self.last_loaded_folder = folder_to_save.absolute()
+        if save_folder:
+            self.last_loaded_folder = save_folder
 
     def languages_get(self):
-        timeit = Timeit()
-        self.progress_bar_set_percent(0, 1)
-        print("Copying I2Languages.assets")
-
-        i2l = LangHandler.get_i2language().raw_text()
-        with open((TRANSLATIONS_FOLDER / I2_LANGUAGES).with_suffix(".yaml"), "w", encoding="utf-8") as f:
-            f.write(i2l)
-
-        print(f"Copying I2Languages finished {timeit!r}")
-        self.progress_bar_set_percent(1, 1)
-        self.last_loaded_folder = TRANSLATIONS_FOLDER
+        self.last_loaded_folder = lang_pipeline.copy_i2language(self.progress_bar_set_percent)
 
     def languages_get_json(self):
-        timeit = Timeit()
-        self.progress_bar_set_percent(0, 1)
-        save_folder = TRANSLATIONS_FOLDER / GENERATED
-        print("Converting I2Languages to json")
-
-        i2l = LangHandler.get_i2language().json_text()
-        with open((save_folder / I2_LANGUAGES).with_suffix(".json"), "w", encoding="utf-8") as f:
-            f.write(i2l)
-
-        print(f"Converting I2Languages finished {timeit!r}")
-        self.progress_bar_set_percent(1, 1)
-        self.last_loaded_folder = save_folder
+        self.last_loaded_folder = lang_pipeline.convert_i2language_to_json(self.progress_bar_set_percent)
 
     def languages_split(self):
-        split_types = ["Split as is", "Change lang list to dict", "Inverse hierarchy so lang is top key"]
+        split_types = lang_pipeline.SplitType.get()
 
         bb = ButtonsBox(split_types, "Select split type", "Select type of splitting langs", self)
         bb.wait_window()
@@ -533,10 +437,10 @@ class Unpacker(tk.Tk):
         if bb.return_data is None:
             return
 
-        split_index = bb.return_data
+        split_type = split_types[bb.return_data]
         selected_langs = None
 
-        if split_index == len(split_types) - 1:
+        if split_type == lang_pipeline.SplitType.INVERSE:
             langs_list = LangHandler.get_lang_list()
             cbs = CheckBoxes(LangHandler.get_lang_list(True), parent=self,
                              label="Select languages to include in split files",
@@ -548,74 +452,16 @@ class Unpacker(tk.Tk):
             selected_langs = [langs_list[i] for i, tf in enumerate(cbs.return_data) if tf]
             print(f"Selected languages: {selected_langs}")
 
-        split_funcs = [
-            lambda l_t: LangHandler.get_lang_file(l_t).json_text(),
-            lambda l_t: json.dumps(lang_module.gen_changed_list_to_dict(l_t), ensure_ascii=False, indent=2),
-            lambda l_t: json.dumps(
-                {lang.value: LangHandler.get_lang_file(l_t).get_lang(lang) for lang in selected_langs},
-                ensure_ascii=False, indent=2),
-        ]
-        split_folder_names = ["LangList", "LangDictionary", "InverseLangDictionary"]
-
-        _time = Timeit()
-        print(f"Splitting I2Languages to separate categories. ({split_types[split_index]})")
-        lang_types = LangType.get_all_types()
-        i = 0
-
-        save_path = TRANSLATIONS_FOLDER / GENERATED / SPLIT / split_folder_names[split_index]
-        save_path.mkdir(parents=True, exist_ok=True)
-        for lang_type in lang_types:
-            lang_file = split_funcs[split_index](lang_type)
-            if lang_file:
-                with open((save_path / lang_type.value).with_suffix(".json"), mode="w", encoding="UTF-8") as f:
-                    f.write(lang_file)
-
-            self.progress_bar_set_percent(i := i + 1, len(lang_types))
-
-        print(f"Finished splitting I2Languages to separate categories. {_time!r}")
+        lang_pipeline.split_languages(split_type, selected_langs, self.progress_bar_set_percent)
 
     def get_data(self):
-        if not self.get_assets_dir().exists():
-            showwarning("Warning", "VS assets folder must be entered.")
-            return
-
-        _time = Timeit()
-        print("Copying data files.")
-
-        total_amount = DataHandler.get_total_amount()
-        i = 0
-
-        dlc_types = DLCType.get_all_types_by_game(Game.VS)
-        for dlc_type in dlc_types:
-            save_path = DATA_FOLDER / dlc_type.value.full_name
-            save_path.mkdir(parents=True, exist_ok=True)
-
-            data_files = DataHandler.get_dict_by_dlc_type(dlc_type)
-            for data_type, data_file in data_files.items():
-                with open((save_path / data_type.value).with_suffix(".json"), mode="w", encoding="UTF-8") as f:
-                    f.write(data_file.raw_text_cleaned_commas())
-
-                self.progress_bar_set_percent(i := i + 1, total_amount)
-
-        print(f"Finished copying data files. {_time!r}")
+        try:
+            data_pipeline.copy_data_files(self.progress_bar_set_percent)
+        except PipelineError as e:
+            showwarning("Warning", str(e))
 
     def data_concatenate(self):
-        _time = Timeit()
-        print(f"Concatenating data files.")
-        data_types = data_module.DataType.get_all_types()
-        i = 0
-
-        for data_type in data_types:
-            self.progress_bar_set_percent(i := i + 1, len(data_types), data_type.name)
-
-            save_path = DATA_FOLDER / GENERATED
-            save_path.mkdir(parents=True, exist_ok=True)
-
-            data_file = DataHandler.get_data(COMPOUND_DATA, data_type)
-            with open((save_path / data_type.value).with_suffix(".json"), mode="w", encoding="UTF-8") as f:
-                f.write(data_file.raw_text())
-
-        print(f"Finished concatenating data files. {_time!r}")
+        data_pipeline.concatenate_data_files(self.progress_bar_set_percent)
 
     def data_to_image(self):
         def thread_load_data():
@@ -646,13 +492,14 @@ class Unpacker(tk.Tk):
 
             self.outer_progress_bar.close_bar()
 
-            metas = MetaDataHandler.get_meta_by_name_set(gen.textures_set(data))
+            metas = MetaDataHandler.get_meta_by_name_set(gen.textures_set(data), is_decode_atlas=True)
             for meta in metas:
                 meta.init_sprites()
 
             for i, (k_id, obj) in enumerate(ug):
                 self.progress_bar_set_percent(i + 1, total)
                 gen.make_image(k_id, obj, lang_data=(lang or {}).get(k_id), add_data=add_data, **generator_settings)
+            gen.join_animations()
 
             self.last_loaded_folder = Path(f"./Images/Generated/{add_data["p_file"]}").absolute()
 
@@ -908,6 +755,8 @@ class Unpacker(tk.Tk):
             return
 
         tint_dec_int = askinteger("Enter tint", "Enter tint in form of integer base 10")
+        if tint_dec_int is None:
+            return
         tint = (
             (tint_dec_int >> 16) & 0xff,
             (tint_dec_int >> 8) & 0xff,
@@ -919,17 +768,7 @@ class Unpacker(tk.Tk):
         if not is_create:
             return
 
-        full_path = Path(full_path)
-        save_path = full_path.parent / "Inverse"
-
-        image = image_open(full_path)
-
-        save_path.mkdir(exist_ok=True, parents=True)
-        img = apply_tint(image, tint)
-        img.save(save_path / full_path.name)
-        img.rotate(180).save(save_path / full_path.with_stem(full_path.stem + "_inv").name)
-
-        self.last_loaded_folder = save_path
+        self.last_loaded_folder = image_pipeline.create_inverse_tilemap(Path(full_path), tint_dec_int)
 
     @staticmethod
     def vc_generate_card_database():
@@ -942,6 +781,11 @@ if __name__ == '__main__':
     sys.stderr = Logger(sys.stderr)
     IS_DEBUG and print(f"{IS_DEBUG = }\n")
 
+    is_profiling = Config[CfgKey.PROFILING]
+    is_profiling and Profiler.start(is_sampling=True)
+
     app = Unpacker()
     app.mainloop()
+    MultiprocessHandler.shutdown()
+    is_profiling and Profiler.save()
     DeferConstants.is_pydub()
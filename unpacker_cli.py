@@ -0,0 +1,457 @@
+"""
+Command line interface of unpacker, runs the same pipelines as GUI without Tk dialogs.
+
+Usage: python -m unpacker_cli [--jobs N] [--summary FILE] <command> [options]
+Run 'python -m unpacker_cli --help' or '<command> --help' for list of commands and options.
+
+Exit codes: 0 - finished, 1 - pipeline failed, 2 - wrong arguments, 130 - interrupted.
+"""
+import argparse
+import json
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Final
+
+import Source.Images.transparent_save as tr_save
+from Source.Config.config import CfgKey, DLCType, Config, Game
+from Source.Data.data import DataType
+from Source.Pipelines.errors import PipelineError
+from Source.Utility.constants import COMPOUND_DATA, COMPOUND_DATA_TYPE, DEFAULT_ANIMATION_FRAME_RATE, \
+    PROGRESS_BAR_FUNC_TYPE
+from Source.Utility.logger import Logger
+from Source.Utility.multirun import MultiprocessHandler, is_multiprocess_enabled
+from Source.Utility.timer import Timeit, Profiler, TRACE_PATH
+
+EXIT_OK: Final[int] = 0
+EXIT_FAILED: Final[int] = 1
+EXIT_USAGE: Final[int] = 2
+EXIT_INTERRUPTED: Final[int] = 130
+
+COMPOUND: Final[str] = "compound"
+
+
+class RunSummary:
+    """
+    Timings and result of one run, saved as json
+    """
+
+    def __init__(self, command: str, arguments: dict[str, Any]):
+        self.command = command
+        self.arguments = arguments
+        self.started_at = datetime.now().astimezone()
+        self.steps: list[dict[str, Any]] = []
+        self.output: Path | None = None
+        self.status = "ok"
+        self.error: str | None = None
+        self.exit_code = EXIT_OK
+        self._timeit = Timeit()
+
+    @contextmanager
+    def step(self, name: str):
+        timeit = Timeit()
+        try:
+            with Profiler.span(name):
+                yield
+        finally:
+            self.steps.append({"name": name, "seconds": round(timeit.get_sec(), 4)})
+
+    def fail(self, status: str, error: BaseException, exit_code: int) -> None:
+        self.status = status
+        self.error = f"{error.__class__.__name__}: {error}" if str(error) else error.__class__.__name__
+        self.exit_code = exit_code
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "command": self.command,
+            "arguments": self.arguments,
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "error": self.error,
+            "output": self.output and str(self.output),
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(self._timeit.get_sec(), 4),
+            "steps": self.steps,
+            "multiprocessing": is_multiprocess_enabled(),
+            "processes": MultiprocessHandler.get_processes(),
+        }
+
+    def save(self, path: str) -> None:
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        if path == "-":
+            print(text)
+        else:
+            Path(path).write_text(text, encoding="UTF-8")
+
+
+class ConsoleProgress:
+    """
+    Progress bar function for console, prints at most every 'interval' seconds
+    """
+
+    def __init__(self, interval: float = 0.2, is_enabled: bool = True, prefix: str = ""):
+        self.interval = interval
+        self.is_enabled = is_enabled
+        self.prefix = prefix and f"{prefix} "
+        self._last_print = -interval
+
+    def __call__(self, current: int | float, total: int | float) -> None:
+        if not self.is_enabled:
+            return
+        now = perf_counter()
+        if current < total and now - self._last_print < self.interval:
+            return
+        self._last_print = now
+        percent = current * 100 / total if total else 100
+        print(f"\r{self.prefix}[{percent:5.1f}%] {current} / {total}", end="\n" if current >= total else "",
+              file=sys.stderr)
+
+
+def _parse_dlc(value: str) -> DLCType | COMPOUND_DATA_TYPE:
+    if value.lower() == COMPOUND:
+        return COMPOUND_DATA
+    try:
+        return DLCType[value.upper()]
+    except KeyError:
+        raise argparse.ArgumentTypeError(
+            f"unknown DLC '{value}', choose from: {COMPOUND}, {", ".join(d.name for d in DLCType)}")
+
+
+def _parse_data_type(value: str) -> DataType:
+    for data_type in DataType.get_all_types():
+        if value.lower() in (data_type.name.lower(), data_type.value.lower()):
+            return data_type
+    raise argparse.ArgumentTypeError(
+        f"unknown data type '{value}', choose from: {", ".join(sorted(d.value for d in DataType.get_all_types()))}")
+
+
+def _parse_int(value: str) -> int:
+    # allows 0x.. for tints
+    try:
+        return int(value, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an integer: '{value}'")
+
+
+def _get_anim_formats() -> list[str]:
+    return [folder for _, folder, _ in tr_save.SAVE_DATA]
+
+
+def _get_selected_anim_types(formats: list[str]) -> list[bool]:
+    return [folder in formats for folder in _get_anim_formats()]
+
+
+def _cmd_data(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.data_pipeline import copy_data_files
+    return copy_data_files(progress)
+
+
+def _cmd_concat(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.data_pipeline import concatenate_data_files
+    return concatenate_data_files(progress)
+
+
+def _cmd_lang_copy(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.lang_pipeline import copy_i2language
+    return copy_i2language(progress)
+
+
+def _cmd_lang_json(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.lang_pipeline import convert_i2language_to_json
+    return convert_i2language_to_json(progress)
+
+
+def _cmd_lang_split(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.lang_pipeline import split_languages, SplitType
+    from Source.Translations.language import Lang
+
+    try:
+        langs = args.langs and [Lang(lang) for lang in args.langs]
+    except ValueError as e:
+        raise PipelineError(str(e))
+    return split_languages(SplitType[args.split_type.upper()], langs, progress)
+
+
+def _cmd_images(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Images.image_gen_new import ImageGeneratorManager, GenType
+
+    if not ImageGeneratorManager.get_gen(args.data_type):
+        raise PipelineError(f"Generator does not exist for {args.data_type.value}")
+
+    req_gens: dict[GenType, int | bool] = {GenType.IMAGE: args.scale}
+    req_gens.update({GenType[gen.upper()]: True for gen in args.gens})
+
+    return ImageGeneratorManager.run_generator(args.dlc, args.data_type, req_gens, progress)
+
+
+def _cmd_meta_images(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.image_pipeline import generate_images_by_meta
+    return generate_images_by_meta(args.image, args.scale, progress)
+
+
+def _cmd_meta_anims(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.image_pipeline import generate_animations_by_meta
+    return generate_animations_by_meta(args.image, _get_selected_anim_types(args.formats), args.scale,
+                                       args.frame_rate, progress)
+
+
+def _cmd_audio(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Utility.defer_constants import DeferConstants
+    if not DeferConstants.is_pydub():
+        raise PipelineError("FFmpeg not found")
+
+    import Source.Audio.audio_unified_gen as audio_gen
+
+    save_types_set = {audio_gen.AudioSaveType[name.upper()] for name in args.names}
+    save_path, error = audio_gen.gen_music_tracks(COMPOUND_DATA, save_types_set, progress)
+    if error:
+        raise PipelineError(error)
+    return save_path and Path(save_path)
+
+
+def _cmd_tilemap(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Images.tilemap_gen import gen_tilemap
+
+    save_folder = None
+    for prefab in args.prefabs:
+        if not prefab.exists():
+            raise PipelineError(f"Prefab not found: {prefab}")
+        with summary.step(prefab.name):
+            save_folder = gen_tilemap(prefab, False, progress, is_streaming=args.streaming, is_atlas=args.atlas,
+                                      is_images=args.images, is_pyramid=args.pyramid,
+                                      exclude_layers=set(args.exclude_layers))
+    return save_folder
+
+
+def _cmd_inverse_tilemap(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Pipelines.image_pipeline import create_inverse_tilemap
+
+    if not args.image.exists():
+        raise PipelineError(f"Image not found: {args.image}")
+    return create_inverse_tilemap(args.image, args.tint)
+
+
+def _cmd_rip(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    if not Config[CfgKey.STEAM_VS] or not Config[CfgKey.RIPPER]:
+        raise PipelineError("Not found path to VS steam folder or AssetRipper")
+
+    from Source.Ripper.ripper import rip_files
+    rip_files(set(args.dlcs))
+    return None
+
+
+def _cmd_build(args, progress: PROGRESS_BAR_FUNC_TYPE, summary: RunSummary) -> Path | None:
+    from Source.Images.image_gen_new import GenType
+    from Source.Pipelines.build import BuildOrchestrator, TaskStatus, get_full_rebuild_tasks
+    from Source.Pipelines.lang_pipeline import SplitType
+
+    audio_save_types = None
+    if not args.no_audio:
+        from Source.Audio.audio_unified_gen import AudioSaveType
+        audio_save_types = {AudioSaveType[name.upper()] for name in args.audio_names}
+
+    req_gens: dict[GenType, int | bool] = {GenType.IMAGE: args.scale}
+    req_gens.update({GenType[gen.upper()]: True for gen in args.gens})
+
+    for prefab in args.tilemaps:
+        if not prefab.exists():
+            raise PipelineError(f"Prefab not found: {prefab}")
+
+    tasks = get_full_rebuild_tasks(
+        dlc_type=args.dlc,
+        data_types=args.data_types,
+        req_gens=req_gens,
+        lang_split_types=[SplitType[split_type.upper()] for split_type in args.lang_split],
+        audio_save_types=audio_save_types,
+        tilemaps=args.tilemaps,
+    )
+    orchestrator = BuildOrchestrator(tasks, max_workers=args.workers, is_force=args.force)
+
+    if args.dry_run:
+        print(BuildOrchestrator.get_plan_report(orchestrator.plan()))
+        return None
+
+    results = orchestrator.run(lambda name: ConsoleProgress(is_enabled=not args.no_progress, prefix=name))
+    summary.steps.extend({"name": result.name, "seconds": round(result.seconds, 4), "status": str(result.status)}
+                         for result in results)
+    print(BuildOrchestrator.get_timing_report(results), file=sys.stderr)
+
+    failed = [result.name for result in results if result.status == TaskStatus.FAILED]
+    if failed:
+        raise PipelineError(f"Failed tasks: {", ".join(failed)}")
+    return None
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m unpacker_cli",
+                                     description="Resource unpacker for ripped assets from Vampire Survivors game.")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes: 1 disables multiprocessing, 0 uses every cpu "
+                             "(default: multiprocessing setting of config)")
+    parser.add_argument("--summary", metavar="FILE",
+                        help="save json summary of run with timings to FILE ('-' prints it to stdout)")
+    parser.add_argument("--no-progress", action="store_true", help="do not print progress")
+    parser.add_argument("--log", action="store_true", help="also write output to unpacker.log")
+    parser.add_argument("--profile", nargs="?", type=Path, const=TRACE_PATH, metavar="FILE",
+                        help=f"save spans and counters of run as Chrome trace to FILE (default: {TRACE_PATH.name})")
+    parser.add_argument("--profile-sampling", action="store_true",
+                        help="also record stacks of threads every few milliseconds (implies --profile)")
+    parser.add_argument("--game", choices=[Game.VS.name.lower(), Game.VC.name.lower()], default=Game.VS.name.lower(),
+                        help="game which metadata is loaded before command (default: vs)")
+
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    def add_command(name: str, func: Callable, help_text: str, is_meta_needed=True) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help_text, description=help_text)
+        command.set_defaults(func=func, is_meta_needed=is_meta_needed)
+        return command
+
+    add_command("data", _cmd_data, "Get data from assets")
+    add_command("concat", _cmd_concat, "Merge dlc data into same files")
+
+    add_command("lang-copy", _cmd_lang_copy, "Get language strings file")
+    add_command("lang-json", _cmd_lang_json, "Convert language strings to json")
+    command = add_command("lang-split", _cmd_lang_split, "Split language strings")
+    command.add_argument("--split-type", choices=["as_is", "list_to_dict", "inverse"], default="as_is")
+    command.add_argument("--langs", nargs="+", metavar="LANG",
+                         help="languages codes (ex: en fr) for 'inverse' split type (default: all)")
+
+    from Source.Images.image_gen_new import GenType
+    command = add_command("images", _cmd_images, "Get unified images (new)")
+    command.add_argument("--dlc", type=_parse_dlc, required=True, help=f"DLC name (ex: VS, MS) or '{COMPOUND}'")
+    command.add_argument("--data-type", type=_parse_data_type, required=True, help="data type (ex: Item, Weapon)")
+    command.add_argument("--scale", type=int, default=1, help="scale factor (default: 1)")
+    command.add_argument("--gens", nargs="+", default=[],
+                         choices=[g.name.lower() for g in GenType.get_types() if g != GenType.IMAGE],
+                         help="additional generations, not available for data type are ignored")
+
+    command = add_command("meta-images", _cmd_meta_images, "Unpack every sprite of texture by its meta file",
+                          is_meta_needed=False)
+    command.add_argument("image", type=Path, help="path to texture (.png)")
+    command.add_argument("--scale", type=int, default=1, help="scale factor (default: 1)")
+
+    command = add_command("meta-anims", _cmd_meta_anims, "Unpack animations of texture by its meta file")
+    command.add_argument("image", type=Path, help="path to texture (.png)")
+    command.add_argument("--scale", type=int, default=1, help="scale factor (default: 1)")
+    command.add_argument("--frame-rate", type=int, default=DEFAULT_ANIMATION_FRAME_RATE,
+                         help=f"frames per second (default: {DEFAULT_ANIMATION_FRAME_RATE})")
+    command.add_argument("--formats", nargs="+", choices=_get_anim_formats(), default=["webp"],
+                         help="animation formats, gif does not support partial transparency (default: webp)")
+
+    command = add_command("audio", _cmd_audio, "Get unified audio")
+    command.add_argument("--names", nargs="+", choices=["code_name", "title_name", "relative_name"],
+                         default=["code_name"], help="naming of saved tracks (default: code_name)")
+
+    command = add_command("tilemap", _cmd_tilemap, "Get stage tilemap")
+    command.add_argument("prefabs", nargs="+", type=Path, help="prefab files of tilemap")
+    command.add_argument("--streaming", action=argparse.BooleanOptionalAction, default=None,
+                         help="render by bands without keeping whole layers in memory (default: for big maps)")
+    command.add_argument("--atlas", action="store_true",
+                         help="also export unique tiles and index grid of every layer")
+    command.add_argument("--images", action=argparse.BooleanOptionalAction, default=True,
+                         help="render images of layers and composites (default: on)")
+    command.add_argument("--pyramid", action="store_true",
+                         help="also cut full map into deep zoom (DZI) tiles for map viewers")
+    command.add_argument("--exclude-layers", nargs="+", type=int, default=[], metavar="LAYER",
+                         help="indexes of layers to skip (from 0)")
+
+    command = add_command("inverse-tilemap", _cmd_inverse_tilemap, "Create inverse tilemap", is_meta_needed=False)
+    command.add_argument("image", type=Path, help="generated tilemap image")
+    command.add_argument("--tint", type=_parse_int, required=True, help="tint as integer (ex: 16777215 or 0xFFFFFF)")
+
+    command = add_command("rip", _cmd_rip, "Rip data automatically with AssetRipper", is_meta_needed=False)
+    command.add_argument("--dlcs", nargs="+", type=_parse_dlc, required=True, help="DLC names (ex: VS MS)")
+
+    command = add_command("build", _cmd_build, "Rebuild data, languages, images, audio and tilemaps, "
+                                               "skipping tasks which inputs did not change")
+    command.add_argument("--dry-run", action="store_true", help="only print tasks that would be run or skipped")
+    command.add_argument("--force", action="store_true", help="run every task even if its inputs did not change")
+    command.add_argument("--workers", type=int, default=None, help="number of tasks run at the same time")
+    command.add_argument("--dlc", type=_parse_dlc, default=COMPOUND_DATA,
+                         help=f"DLC of images: name (ex: VS, MS) or '{COMPOUND}' (default)")
+    command.add_argument("--data-types", nargs="+", type=_parse_data_type, default=None,
+                         help="data types of images (default: every supported)")
+    command.add_argument("--scale", type=int, default=1, help="scale factor of images (default: 1)")
+    command.add_argument("--gens", nargs="+", default=[],
+                         choices=[g.name.lower() for g in GenType.get_types() if g != GenType.IMAGE],
+                         help="additional generations of images, not available for data type are ignored")
+    command.add_argument("--lang-split", nargs="+", choices=["as_is", "list_to_dict", "inverse"], default=["as_is"],
+                         help="split types of languages (default: as_is)")
+    command.add_argument("--no-audio", action="store_true", help="do not generate audio")
+    command.add_argument("--audio-names", nargs="+", choices=["code_name", "title_name", "relative_name"],
+                         default=["code_name"], help="audio name types (default: code_name)")
+    command.add_argument("--tilemaps", nargs="+", type=Path, default=[], help="prefab files of tilemaps")
+
+    return parser
+
+
+def _set_jobs(jobs: int | None) -> None:
+    if jobs is None:
+        return
+    Config.set_override(CfgKey.MULTIPROCESSING, jobs != 1)
+    MultiprocessHandler.set_processes(jobs if jobs > 1 else None)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = get_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    if args.log:
+        sys.stdout = Logger(sys.stdout)
+        sys.stderr = Logger(sys.stderr)
+
+    _set_jobs(args.jobs)
+
+    arguments = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()
+                 if key not in ("func", "is_meta_needed", "summary", "log", "no_progress", "profile",
+                                "profile_sampling")}
+    summary = RunSummary(args.command, json.loads(json.dumps(arguments, default=str)))
+    progress = ConsoleProgress(is_enabled=not args.no_progress)
+
+    if args.profile_sampling and not args.profile:
+        args.profile = TRACE_PATH
+    if args.profile:
+        Profiler.start(is_sampling=args.profile_sampling)
+
+    try:
+        if args.is_meta_needed:
+            from Source.Data.meta_data import MetaDataHandler
+            with summary.step("load_meta"):
+                MetaDataHandler.load(Game[args.game.upper()])
+
+        with summary.step(args.command):
+            summary.output = args.func(args, progress, summary)
+    except PipelineError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        summary.fail("failed", e, EXIT_FAILED)
+    except KeyboardInterrupt as e:
+        MultiprocessHandler.cancel()
+        summary.fail("interrupted", e, EXIT_INTERRUPTED)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        summary.fail("failed", e, EXIT_FAILED)
+    finally:
+        MultiprocessHandler.shutdown()
+
+    print(f"Finished '{args.command}' with status '{summary.status}' {summary.to_dict()["seconds"]:.2f} sec",
+          file=sys.stderr)
+    if summary.output:
+        print(f"Output: {summary.output}", file=sys.stderr)
+
+    if args.profile:
+        Profiler.save(args.profile, {"command": args.command, "status": summary.status})
+
+    if args.summary:
+        summary.save(args.summary)
+
+    return summary.exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())